@@ -67,6 +67,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Batch policy cache invalidations into one delete_many per request
+    "policy.policy_cache.PolicyCacheInvalidationMiddleware",
+    # Write telemetry events queued during a request with one bulk insert
+    "policy.telemetry_signals.TelemetryBatchMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -112,6 +116,11 @@ except Exception:
     # dj-database-url is optional; keep sqlite default if not available
     pass
 
+# Covering-index INCLUDE columns are a Postgres feature. SQLite (dev/tests)
+# builds the indexes without them and warns about it; other backends still do
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
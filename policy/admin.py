@@ -86,6 +86,14 @@ class ThresholdAdmin(admin.ModelAdmin):
     list_display = ('control', 'threshold_type', 'value', 'window_seconds')
 
 
+def _invalidate_violation_owners(queryset):
+    """Bulk updates skip post_save; drop cached violations for every affected user."""
+    from .policy_cache import PolicyCache
+
+    for user_id in queryset.order_by().exclude(user=None).values_list('user_id', flat=True).distinct():
+        PolicyCache.invalidate_user_violations_on_commit(user_id)
+
+
 @admin.register(Violation)
 class ViolationAdmin(admin.ModelAdmin):
     list_display = ('policy', 'control', 'rule', 'timestamp', 'user', 'severity', 'resolved')
@@ -98,6 +106,7 @@ class ViolationAdmin(admin.ModelAdmin):
         from .models import ViolationActionLog
 
         updated = queryset.filter(acknowledged=False).update(acknowledged=True, acknowledged_at=timezone.now(), acknowledged_by=request.user)
+        _invalidate_violation_owners(queryset)
         # Log action to immutable action log
         for v in queryset.filter(acknowledged=True):
             ViolationActionLog.objects.create(
@@ -114,6 +123,7 @@ class ViolationAdmin(admin.ModelAdmin):
         from .models import ViolationActionLog
 
         updated = queryset.filter(resolved=False).update(resolved=True, resolved_at=timezone.now(), resolved_by=request.user)
+        _invalidate_violation_owners(queryset)
         for v in queryset.filter(resolved=True):
             ViolationActionLog.objects.create(
                 violation=v,
@@ -12,6 +12,7 @@ from .services import RuleEngine
 from .risk import RuleBasedScorer
 from typing import Tuple, List
 from django.db import transaction, IntegrityError
+from django.db.models import Prefetch
 import hashlib
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,8 @@ logger = logging.getLogger(__name__)
 class ComplianceEngine:
     def __init__(self, recorder=None):
         self.rule_engine = RuleEngine(recorder=recorder)
+        # control id -> (expression and rule fields it was compiled from, predicate or None)
+        self._expressions: Dict[int, Tuple[Any, Any]] = {}
 
     def _event_to_context(self, event: HumanLayerEvent) -> Dict[str, Any]:
         # Provide predictable dotted-path access to event data for rules
@@ -53,9 +56,16 @@ class ComplianceEngine:
         scorer = RuleBasedScorer()
         risk = scorer.score(event)
         res['risk'] = risk
-        for control in policy.controls.filter(active=True).order_by('order', 'id'):
+        # Rules for every control come from one prefetch query, not one query per control.
+        # Expressions may reference disabled rules (as the interpreter does), so all are loaded
+        all_rules = Prefetch('rules', queryset=Rule.objects.order_by('order', 'id'), to_attr='all_rules')
+        for control in policy.controls.filter(active=True).order_by('order', 'id').prefetch_related(all_rules):
             # If the control defines a composite expression, evaluate it as a whole.
             if control.expression:
+                # Fast path: a passing compiled expression needs no explanation
+                predicate = self._compiled_expression(control, control.all_rules)
+                if predicate is not None and predicate(ctx):
+                    continue
                 try:
                     expr_ok, expr_expl = self._eval_expression(control.expression, control, ctx)
                 except Exception:
@@ -97,7 +107,7 @@ class ComplianceEngine:
                 continue
 
             # Fallback: evaluate individual rules and create per-rule violations as before
-            for rule in control.rules.filter(enabled=True).order_by('order', 'id'):
+            for rule in (r for r in control.all_rules if r.enabled):
                 ok, explanation = self.rule_engine._eval_rule(rule, ctx)
                 if not ok:
                     evidence = {
@@ -219,6 +229,28 @@ class ComplianceEngine:
 
         return results
 
+    def _compiled_expression(self, control: Control, rules: List[Rule]):
+        """Predicate for `control.expression` over the control's `rules`, or None.
+
+        None means only the interpreter can evaluate the expression. Predicates are
+        kept on the engine and reused while the expression and the evaluated fields
+        of every rule are unchanged; `rules` are read fresh for each event, so an
+        edit takes effect on the next evaluation.
+        """
+        from .expr import UncompilableExpression, compile_expression
+        from .policy_cache import _compile_rule, _rule_to_dict
+        key = (control.expression, [(r.id, r.name, r.left_operand, r.operator, r.right_value) for r in rules])
+        cached = self._expressions.get(control.id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            predicate = compile_expression(control.expression, [_compile_rule(_rule_to_dict(r)) for r in rules])
+        except UncompilableExpression as exc:
+            logger.debug(f'Control {control.id} expression left to the interpreter: {exc}')
+            predicate = None
+        self._expressions[control.id] = (key, predicate)
+        return predicate
+
     def _eval_expression(self, expr: Dict[str, Any], control: Control, context: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
         """Recursively evaluate a composite boolean `expr` for the given `control`.
 
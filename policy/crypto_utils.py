@@ -5,53 +5,73 @@ Implements:
 - RFC 3161 timestamp authority integration
 - Key management and rotation
 """
+import functools
 import hashlib
 import hmac
-from typing import Optional
+import os
+from typing import List, Optional, Tuple, Union
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def sign_data(payload: str) -> str:
+@functools.lru_cache(maxsize=8)
+def _load_key(path: str, mtime_ns: int, private: bool):
+    """Parse a PEM key file once; the modification time in the cache key picks up rotated files."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.backends import default_backend
+    
+    with open(path, 'rb') as f:
+        pem = f.read()
+    if private:
+        return serialization.load_pem_private_key(pem, password=None, backend=default_backend())
+    return serialization.load_pem_public_key(pem, backend=default_backend())
+
+
+def _is_ed25519(key) -> bool:
+    from cryptography.hazmat.primitives.asymmetric import ed25519
+    return isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey))
+
+
+def _rsa_pss():
+    """(padding, algorithm) arguments for RSA-PSS over SHA-256."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+    return (
+        padding.PSS(
+            mgf=padding.MGF1(hashes.SHA256()),
+            salt_length=padding.PSS.MAX_LENGTH
+        ),
+        hashes.SHA256()
+    )
+
+
+def sign_data(payload: Union[str, bytes]) -> str:
     """Sign data using configured signing method.
     
     Priority:
-    1. SIGNING_PRIVATE_KEY_PATH (asymmetric RSA/Ed25519)
+    1. SIGNING_PRIVATE_KEY_PATH (asymmetric RSA-PSS or Ed25519, by key type)
     2. EVIDENCE_SIGNING_KEY (symmetric HMAC - deprecated)
     3. Raises error if neither configured
     
     Args:
-        payload: String data to sign
+        payload: Data to sign; strings are UTF-8 encoded
         
     Returns:
         Hexadecimal signature string
     """
+    data = payload if isinstance(payload, bytes) else payload.encode('utf-8')
+    
     # Try asymmetric signing first (production)
     private_key_path = getattr(settings, 'SIGNING_PRIVATE_KEY_PATH', None)
     if private_key_path:
         try:
-            from cryptography.hazmat.primitives import hashes, serialization
-            from cryptography.hazmat.primitives.asymmetric import padding
-            from cryptography.hazmat.backends import default_backend
-            
-            with open(private_key_path, 'rb') as f:
-                private_key = serialization.load_pem_private_key(
-                    f.read(),
-                    password=None,
-                    backend=default_backend()
-                )
-            
-            signature = private_key.sign(
-                payload.encode('utf-8'),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return signature.hex()
+            private_key = _load_key(private_key_path, os.stat(private_key_path).st_mtime_ns, private=True)
+            if _is_ed25519(private_key):
+                # Ed25519 takes no padding/hash parameters and signs far faster than RSA
+                return private_key.sign(data).hex()
+            return private_key.sign(data, *_rsa_pss()).hex()
         except Exception as e:
             logger.error(f'Asymmetric signing failed: {e}')
             raise RuntimeError(f'Failed to sign with private key: {e}')
@@ -62,47 +82,36 @@ def sign_data(payload: str) -> str:
         logger.warning('Using deprecated HMAC signing - configure SIGNING_PRIVATE_KEY_PATH for production')
         return hmac.new(
             symmetric_key.encode('utf-8'),
-            payload.encode('utf-8'),
+            data,
             hashlib.sha256
         ).hexdigest()
     
     raise RuntimeError('No signing key configured (SIGNING_PRIVATE_KEY_PATH or EVIDENCE_SIGNING_KEY)')
 
 
-def verify_signature(payload: str, signature: str) -> bool:
+def verify_signature(payload: Union[str, bytes], signature: str) -> bool:
     """Verify signature using configured verification method.
     
     Args:
-        payload: Original data that was signed
+        payload: Original data that was signed; strings are UTF-8 encoded
         signature: Hexadecimal signature to verify
         
     Returns:
         True if signature is valid, False otherwise
     """
+    data = payload if isinstance(payload, bytes) else payload.encode('utf-8')
+    
     # Try asymmetric verification first
     public_key_path = getattr(settings, 'SIGNING_PUBLIC_KEY_PATH', None)
     if public_key_path:
         try:
-            from cryptography.hazmat.primitives import hashes, serialization
-            from cryptography.hazmat.primitives.asymmetric import padding
-            from cryptography.hazmat.backends import default_backend
             from cryptography.exceptions import InvalidSignature
             
-            with open(public_key_path, 'rb') as f:
-                public_key = serialization.load_pem_public_key(
-                    f.read(),
-                    backend=default_backend()
-                )
-            
-            public_key.verify(
-                bytes.fromhex(signature),
-                payload.encode('utf-8'),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
+            public_key = _load_key(public_key_path, os.stat(public_key_path).st_mtime_ns, private=False)
+            if _is_ed25519(public_key):
+                public_key.verify(bytes.fromhex(signature), data)
+            else:
+                public_key.verify(bytes.fromhex(signature), data, *_rsa_pss())
             return True
         except InvalidSignature:
             return False
@@ -115,7 +124,7 @@ def verify_signature(payload: str, signature: str) -> bool:
     if symmetric_key:
         expected = hmac.new(
             symmetric_key.encode('utf-8'),
-            payload.encode('utf-8'),
+            data,
             hashlib.sha256
         ).hexdigest()
         return hmac.compare_digest(expected, signature)
@@ -170,6 +179,42 @@ def get_tsa_timestamp(data: str) -> Optional[bytes]:
         return None
 
 
+def merkle_tree(leaves: List[str]) -> Tuple[str, List[List[List[str]]]]:
+    """Merkle root over `leaves` and the inclusion path of each leaf.
+    
+    Leaves are hashed with SHA-256; each level hashes adjacent pairs, and an
+    odd node out is paired with itself. A path is a list of [side, sibling_hex]
+    steps from the leaf up, where side says which side the sibling is on.
+    
+    Args:
+        leaves: Non-empty list of strings (e.g. signatures)
+        
+    Returns:
+        (root hex digest, per-leaf paths in input order)
+    """
+    level = [hashlib.sha256(leaf.encode('utf-8')).digest() for leaf in leaves]
+    paths = [[] for _ in leaves]
+    positions = list(range(len(leaves)))
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        for i, pos in enumerate(positions):
+            sibling = pos ^ 1
+            paths[i].append(['left' if sibling < pos else 'right', level[sibling].hex()])
+            positions[i] = pos // 2
+        level = [hashlib.sha256(level[j] + level[j + 1]).digest() for j in range(0, len(level), 2)]
+    return level[0].hex(), paths
+
+
+def merkle_root_from_path(leaf: str, path: List[List[str]]) -> str:
+    """Recompute the Merkle root from a leaf and its path from `merkle_tree`."""
+    node = hashlib.sha256(leaf.encode('utf-8')).digest()
+    for side, sibling_hex in path:
+        sibling = bytes.fromhex(sibling_hex)
+        node = hashlib.sha256(sibling + node if side == 'left' else node + sibling).digest()
+    return node.hex()
+
+
 def generate_keypair(output_dir: str = '.', key_type: str = 'rsa'):
     """Generate RSA or Ed25519 keypair for signing.
     
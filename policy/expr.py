@@ -0,0 +1,149 @@
+"""Compile `Control.expression` trees into plain Python predicates.
+
+`ComplianceEngine._eval_expression` interprets the JSON tree on every call,
+looking rules up and building an explanation for each node. Most evaluations
+pass, and then only the boolean matters, so `compile_expression` turns the
+tree into nested closures once (per engine, until the control or its rules
+change) and evaluation becomes a single function call.
+
+Compiled predicates must agree with the interpreter. Anything the interpreter
+would treat as an error (unknown rule, unsupported op, malformed item) raises
+`UncompilableExpression` instead, and callers keep using the interpreter.
+"""
+import re
+from typing import Any, Callable, Dict, Iterable
+
+from .services import RuleEngine, compile_regex
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class UncompilableExpression(ValueError):
+    """The expression cannot be compiled to match the interpreter exactly."""
+
+
+def _never(ctx: Dict[str, Any]) -> bool:
+    return False
+
+
+def _getter(dotted: str) -> Callable[[Dict[str, Any]], Any]:
+    """Dotted-path lookup equivalent to `RuleEngine._get_value`, split once."""
+    parts = tuple(dotted.split('.'))
+
+    def get(ctx):
+        cur = ctx
+        for part in parts:
+            cur = cur.get(part) if isinstance(cur, dict) else getattr(cur, part, None)
+        return cur
+    return get
+
+
+def compile_rule(rule: Dict[str, Any]) -> Predicate:
+    """Build a predicate for a cached rule dict, specialized on its operator.
+
+    Uses the `_re` / `_set` forms attached by the policy cache when present.
+    """
+    dotted = rule.get('left_operand')
+    if not dotted:
+        return _never
+    get = _getter(dotted)
+    operator = rule.get('operator')
+    right = rule.get('right_value')
+
+    if operator == 'regex':
+        pattern = rule.get('_re')
+        if pattern is None:
+            try:
+                pattern = compile_regex(right)
+            except (re.error, TypeError):
+                return _never
+        search = pattern.search
+
+        def regex_leaf(ctx):
+            try:
+                return bool(search(str(get(ctx))))
+            except Exception:
+                return False
+        return regex_leaf
+
+    if operator in ('in', 'not_in') and '_set' in rule:
+        members = rule['_set']
+        negate = operator == 'not_in'
+
+        def member_leaf(ctx):
+            try:
+                left = get(ctx)
+                try:
+                    found = left in members
+                except TypeError:
+                    # unhashable value: fall back to equality scan like the interpreter
+                    found = left in right
+                return found != negate
+            except Exception:
+                return False
+        return member_leaf
+
+    compare = RuleEngine.OPERATORS.get(operator)
+    if compare is None:
+        return _never
+
+    def compare_leaf(ctx):
+        try:
+            return bool(compare(get(ctx), right))
+        except Exception:
+            return False
+    return compare_leaf
+
+
+def compile_expression(node: Dict[str, Any], rules: Iterable[Dict[str, Any]]) -> Predicate:
+    """Compile an expression tree against the control's rules.
+
+    `rules` are cached rule dicts; items reference them by `rule_id` or `rule` name.
+    """
+    by_id = {}
+    by_name = {}
+    ambiguous = set()
+    for rule in rules:
+        by_id[str(rule['id'])] = rule
+        if rule['name'] in by_name:
+            ambiguous.add(rule['name'])
+        by_name[rule['name']] = rule
+    leaves = {}
+
+    def leaf(rule):
+        if rule['id'] not in leaves:
+            leaves[rule['id']] = compile_rule(rule)
+        return leaves[rule['id']]
+
+    def item(node):
+        if not isinstance(node, dict):
+            raise UncompilableExpression(f'invalid item: {node!r}')
+        if 'rule_id' in node:
+            rule = by_id.get(str(node['rule_id']))
+            if rule is None:
+                raise UncompilableExpression(f'unknown rule id: {node["rule_id"]!r}')
+            return leaf(rule)
+        if 'rule' in node:
+            name = node['rule']
+            if name in ambiguous or name not in by_name:
+                raise UncompilableExpression(f'unknown or ambiguous rule: {name!r}')
+            return leaf(by_name[name])
+        if 'op' in node:
+            return op(node)
+        raise UncompilableExpression(f'unsupported item: {node!r}')
+
+    def op(node):
+        if not isinstance(node, dict):
+            raise UncompilableExpression(f'invalid expression: {node!r}')
+        children = tuple(item(child) for child in node.get('items', []))
+        kind = node.get('op')
+        if kind == 'and':
+            return lambda ctx: all(f(ctx) for f in children)
+        if kind == 'or':
+            return lambda ctx: any(f(ctx) for f in children)
+        if kind == 'not' and len(children) == 1:
+            child = children[0]
+            return lambda ctx: not child(ctx)
+        raise UncompilableExpression(f'unsupported op: {kind!r}')
+
+    return op(node)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0009_alter_control_options_alter_eventmetadata_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['lifecycle', 'active'], name='policy_poli_lifecyc_7ce6be_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0010_policy_lifecycle_active_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['user', 'resolved', 'policy'], name='policy_viol_user_id_5b3df8_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+"""Add JSONB GIN indexes for containment queries on Postgres.
+
+`jsonb_path_ops` GIN indexes serve `@>` containment lookups on Violation.evidence,
+HumanLayerEvent.details and Control.expression at roughly half the size of the
+default operator class. An expression index covers `details->>'remote_addr'`;
+it became unused once 0013 promoted the address to a column, and 0021 drops it.
+The migration is a no-op on non-Postgres databases.
+"""
+from django.db import migrations
+
+
+INDEXES = (
+    ('viol_evidence_gin', 'CREATE INDEX IF NOT EXISTS viol_evidence_gin ON policy_violation '
+                          'USING gin (evidence jsonb_path_ops);'),
+    ('hle_details_gin', 'CREATE INDEX IF NOT EXISTS hle_details_gin ON policy_humanlayerevent '
+                        'USING gin (details jsonb_path_ops);'),
+    ('control_expression_gin', 'CREATE INDEX IF NOT EXISTS control_expression_gin ON policy_control '
+                               'USING gin (expression jsonb_path_ops);'),
+    ('hle_details_remote_addr', "CREATE INDEX IF NOT EXISTS hle_details_remote_addr ON policy_humanlayerevent "
+                                "((details->>'remote_addr'));"),
+)
+
+
+def create_indexes(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != 'postgresql':
+        # Skip for non-Postgres (e.g., SQLite in dev)
+        return
+    with conn.cursor() as cur:
+        for _, sql in INDEXES:
+            cur.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cur:
+        for name, _ in INDEXES:
+            cur.execute(f'DROP INDEX IF EXISTS {name};')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0011_violation_user_resolved_policy_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
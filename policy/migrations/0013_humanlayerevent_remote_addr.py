@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:42
+
+import ipaddress
+
+from django.db import migrations, models
+
+
+def _normalize_ip(value):
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def backfill_remote_addr(apps, schema_editor):
+    """Copy details['remote_addr'] into the new column for existing events.
+
+    HumanLayerEvent is append-only; on Postgres the block trigger from 0006 is
+    disabled for the duration of the backfill only.
+    """
+    HumanLayerEvent = apps.get_model('policy', 'HumanLayerEvent')
+    conn = schema_editor.connection
+    is_postgres = conn.vendor == 'postgresql'
+    if is_postgres:
+        with conn.cursor() as cur:
+            cur.execute('ALTER TABLE policy_humanlayerevent DISABLE TRIGGER humanlayerevent_block_ud;')
+    try:
+        rows = HumanLayerEvent.objects.filter(details__has_key='remote_addr').values_list('id', 'details')
+        for pk, details in rows.iterator(chunk_size=2000):
+            ip = _normalize_ip(details.get('remote_addr')) if isinstance(details, dict) else None
+            if ip:
+                HumanLayerEvent.objects.filter(pk=pk).update(remote_addr=ip)
+    finally:
+        if is_postgres:
+            with conn.cursor() as cur:
+                cur.execute('ALTER TABLE policy_humanlayerevent ENABLE TRIGGER humanlayerevent_block_ud;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0012_jsonb_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='humanlayerevent',
+            name='remote_addr',
+            field=models.GenericIPAddressField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_remote_addr, migrations.RunPython.noop),
+    ]
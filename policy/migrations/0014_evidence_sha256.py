@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:47
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def payload_sha256(value):
+    raw = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def backfill_sha256(apps, schema_editor):
+    """Hash the payload of existing evidence rows.
+
+    Evidence is append-only; on Postgres the block trigger from 0006 is disabled
+    for the duration of the backfill only.
+    """
+    Evidence = apps.get_model('policy', 'Evidence')
+    conn = schema_editor.connection
+    is_postgres = conn.vendor == 'postgresql'
+    if is_postgres:
+        with conn.cursor() as cur:
+            cur.execute('ALTER TABLE policy_evidence DISABLE TRIGGER evidence_block_ud;')
+    try:
+        rows = Evidence.objects.filter(sha256='').values_list('id', 'payload')
+        for pk, payload in rows.iterator(chunk_size=2000):
+            Evidence.objects.filter(pk=pk).update(sha256=payload_sha256(payload))
+    finally:
+        if is_postgres:
+            with conn.cursor() as cur:
+                cur.execute('ALTER TABLE policy_evidence ENABLE TRIGGER evidence_block_ud;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0013_humanlayerevent_remote_addr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidence',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_sha256, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0014_evidence_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['user', 'resolved', 'timestamp'], name='policy_viol_user_id_ace5b8_idx'),
+        ),
+    ]
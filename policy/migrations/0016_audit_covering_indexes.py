@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0015_violation_user_resolved_timestamp_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eventmetadata',
+            index=models.Index(condition=models.Q(('processed', True)), fields=['event'], name='evmeta_processed'),
+        ),
+        migrations.AddIndex(
+            model_name='humanlayerevent',
+            index=models.Index(fields=['event_type', '-timestamp'], name='hle_type_ts'),
+        ),
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['policy', 'control', '-timestamp'], include=('severity', 'resolved'), name='viol_pct'),
+        ),
+    ]
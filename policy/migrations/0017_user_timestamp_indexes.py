@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-15 22:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0016_audit_covering_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='humanlayerevent',
+            index=models.Index(fields=['user', '-timestamp'], name='hle_user_ts'),
+        ),
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['user', '-timestamp'], name='viol_user_ts'),
+        ),
+    ]
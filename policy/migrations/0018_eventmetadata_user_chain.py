@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-15 23:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_user_chain(apps, schema_editor):
+    """Copy each event's user and timestamp onto its existing metadata row."""
+    EventMetadata = apps.get_model('policy', 'EventMetadata')
+    HumanLayerEvent = apps.get_model('policy', 'HumanLayerEvent')
+    events = HumanLayerEvent.objects.filter(pk=OuterRef('event_id'))
+    EventMetadata.objects.update(
+        user_id=Subquery(events.values('user_id')[:1]),
+        event_timestamp=Subquery(events.values('timestamp')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0017_user_timestamp_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventmetadata',
+            name='event_timestamp',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventmetadata',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='eventmetadata',
+            index=models.Index(fields=['user', '-event_timestamp'], include=('signature',), name='evmeta_user_ts'),
+        ),
+        migrations.RunPython(backfill_user_chain, migrations.RunPython.noop),
+    ]
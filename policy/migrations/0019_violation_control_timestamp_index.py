@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-15 23:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0018_eventmetadata_user_chain'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='violation',
+            index=models.Index(fields=['control', '-timestamp'], name='viol_ctrl_ts'),
+        ),
+    ]
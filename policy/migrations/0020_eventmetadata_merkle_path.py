@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-15 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0019_violation_control_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventmetadata',
+            name='merkle_path',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
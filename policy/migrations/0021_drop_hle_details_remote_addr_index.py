@@ -0,0 +1,36 @@
+"""Drop the `details->>'remote_addr'` expression index on Postgres.
+
+Since 0013 the remote address is an indexed HumanLayerEvent column and the risk
+scorer reads that column, so nothing queries the JSON key any more. The index
+from 0012 only added write cost to an append-only table. It is a no-op on
+non-Postgres databases.
+"""
+from django.db import migrations
+
+
+def drop_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cur:
+        cur.execute('DROP INDEX IF EXISTS hle_details_remote_addr;')
+
+
+def create_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cur:
+        cur.execute("CREATE INDEX IF NOT EXISTS hle_details_remote_addr ON policy_humanlayerevent "
+                    "((details->>'remote_addr'));")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policy', '0020_eventmetadata_merkle_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_index, create_index),
+    ]
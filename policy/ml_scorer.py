@@ -20,6 +20,7 @@ import pickle
 import hashlib
 import json
 import numpy as np
+from operator import itemgetter
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -150,7 +151,28 @@ class MLRiskScorer:
             self.feature_names = sorted(features.keys())
         
         # Return as ordered array
-        return np.array([features[name] for name in self.feature_names])
+        return np.atleast_1d(np.array(self._get_feature_getter()(features), dtype=float))
+    
+    @property
+    def feature_names(self):
+        return self._feature_names
+    
+    @feature_names.setter
+    def feature_names(self, names):
+        # A new schema invalidates the getter; assign a new list rather than mutating it
+        self._feature_names = names
+        self._feature_getter = None
+    
+    def _get_feature_getter(self) -> itemgetter:
+        """Return an itemgetter specialized to the current feature order.
+        
+        Built once per feature_names assignment so per-event extraction is a single
+        C-level lookup rather than a Python comprehension; assigning feature_names
+        (e.g. when loading a model trained on different features) rebuilds it.
+        """
+        if self._feature_getter is None:
+            self._feature_getter = itemgetter(*self._feature_names)
+        return self._feature_getter
     
     def train(
         self,
@@ -317,12 +339,11 @@ class MLRiskScorer:
             'metadata': self.metadata
         }
         
-        with open(save_path, 'wb') as f:
-            pickle.dump(bundle, f)
+        data = pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL)
+        model_hash = hashlib.sha256(data).hexdigest()
         
-        # Compute hash
-        with open(save_path, 'rb') as f:
-            model_hash = hashlib.sha256(f.read()).hexdigest()
+        with open(save_path, 'wb') as f:
+            f.write(data)
         
         logger.info(f'Model saved to {save_path} (SHA256: {model_hash[:16]}...)')
         
@@ -332,8 +353,15 @@ class MLRiskScorer:
     def load_model(self, path: Optional[str] = None):
         """Load serialized model from disk.
         
+        The file's SHA256 is checked against the registered ScorerArtifact
+        before anything is unpickled, so a tampered file is never executed.
+        
         Args:
             path: Custom load path. If None, uses default.
+            
+        Raises:
+            FileNotFoundError: If the model file does not exist
+            ValueError: If the file hash does not match a registered artifact
         """
         load_path = path or self.model_path
         
@@ -341,7 +369,10 @@ class MLRiskScorer:
             raise FileNotFoundError(f'Model not found: {load_path}')
         
         with open(load_path, 'rb') as f:
-            bundle = pickle.load(f)
+            data = f.read()
+        
+        self._verify_artifact_hash(data, load_path)
+        bundle = pickle.loads(data)
         
         self.model = bundle['model']
         self.scaler = bundle['scaler']
@@ -350,6 +381,21 @@ class MLRiskScorer:
         
         logger.info(f'Model loaded from {load_path}: {self.metadata.get("algorithm", "unknown")}')
     
+    def _verify_artifact_hash(self, data: bytes, load_path: str):
+        """Ensure serialized model bytes match a registered ScorerArtifact hash."""
+        from policy.models import ScorerArtifact
+        
+        model_hash = hashlib.sha256(data).hexdigest()
+        artifacts = ScorerArtifact.objects.filter(name='ml_risk_scorer')
+        if self.model_version not in ('latest', 'champion'):
+            artifacts = artifacts.filter(version=self.model_version)
+        
+        if not artifacts.filter(sha256=model_hash).exists():
+            raise ValueError(
+                f'Model integrity check failed for {load_path}: '
+                f'SHA256 {model_hash[:16]}... does not match a registered artifact'
+            )
+    
     def _register_model(self, path: str, model_hash: str):
         """Register trained model in database."""
         from policy.models import ScorerArtifact
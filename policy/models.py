@@ -31,6 +31,9 @@ class Policy(models.Model):
                 name='unique_active_policy_per_name'
             )
         ]
+        indexes = [
+            models.Index(fields=['lifecycle', 'active']),
+        ]
 
     def __str__(self):
         return self.name
@@ -161,10 +164,65 @@ class Violation(models.Model):
 
     class Meta:
         ordering = ('-timestamp',)
+        indexes = [
+            models.Index(fields=['user', 'resolved', 'policy']),
+            # user violation listings filter on (user, resolved) and order by timestamp
+            models.Index(fields=['user', 'resolved', 'timestamp']),
+            # audit listings per policy/control; INCLUDE (Postgres only) allows index-only scans
+            models.Index(fields=['policy', 'control', '-timestamp'], name='viol_pct', include=['severity', 'resolved']),
+            # per-user windows for risk scoring (user + timestamp range, any resolved state)
+            models.Index(fields=['user', '-timestamp'], name='viol_user_ts'),
+            # recent violations per control for count thresholds (control + timestamp window)
+            models.Index(fields=['control', '-timestamp'], name='viol_ctrl_ts'),
+        ]
 
     def __str__(self):
         return f"Violation {self.policy.name}:{self.control.name} @ {self.timestamp.isoformat()}"
 
+    def acknowledge(self, user=None):
+        """Acknowledge with one conditional UPDATE; returns True if this call changed the row.
+
+        Skips `save()` (no full-row write, no post_save cascade) and invalidates only
+        the owning user's cached violations.
+        """
+        return self._mark('acknowledged', user)
+
+    def resolve(self, user=None):
+        """Resolve with one conditional UPDATE; returns True if this call changed the row."""
+        return self._mark('resolved', user)
+
+    def _mark(self, state, user):
+        now = timezone.now()
+        actor_id = getattr(user, 'pk', None)
+        updated = Violation.objects.filter(pk=self.pk, **{state: False}).update(
+            **{state: True, f'{state}_at': now, f'{state}_by_id': actor_id}
+        )
+        if not updated:
+            return False
+        setattr(self, state, True)
+        setattr(self, f'{state}_at', now)
+        setattr(self, f'{state}_by_id', actor_id)
+        if self.user_id:
+            from .policy_cache import PolicyCache
+            PolicyCache.invalidate_user_violations_on_commit(self.user_id)
+        return True
+
+
+import hashlib
+import json
+
+
+def payload_sha256(value):
+    """SHA-256 hex digest of `value` serialized as canonical (sorted-key, compact) JSON.
+
+    Always the stdlib encoder: the digest is stored and later re-checked, possibly
+    on another host, so it must not depend on which optional JSON library is
+    installed (orjson formats some floats differently and rejects non-str keys).
+    The payload is serialized into one buffer and hashed in a single call.
+    """
+    raw = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
 
 class Evidence(models.Model):
     """Immutable evidence artifact linked to policies and violations.
@@ -178,6 +236,8 @@ class Evidence(models.Model):
     policy = models.ForeignKey(Policy, null=True, blank=True, on_delete=models.SET_NULL, related_name='evidence')
     violation = models.OneToOneField(Violation, null=True, blank=True, on_delete=models.SET_NULL, related_name='evidence_obj')
     payload = models.JSONField()
+    # Digest of the canonical payload, computed once at creation (see `payload_sha256`)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
@@ -189,6 +249,7 @@ class Evidence(models.Model):
         # Enforce immutability: cannot update an existing record
         if not getattr(self, '_state', None) or not getattr(self._state, 'adding', True):
             raise ValueError('Evidence objects are immutable and cannot be updated')
+        self.sha256 = payload_sha256(self.payload)
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -199,9 +260,20 @@ class Evidence(models.Model):
         return f"Evidence for {target} @ {self.created_at.isoformat()}"
 
 
+import ipaddress
 import uuid
 
 
+def normalize_ip(value):
+    """Return `value` as a normalized IP string, or None if it is not a valid address."""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+
 class HumanLayerEvent(models.Model):
     """Captures human interactions and telemetry for forensic review.
 
@@ -234,15 +306,26 @@ class HumanLayerEvent(models.Model):
     related_policy = models.ForeignKey(Policy, null=True, blank=True, on_delete=models.SET_NULL, related_name='events')
     related_control = models.ForeignKey(Control, null=True, blank=True, on_delete=models.SET_NULL, related_name='events')
     related_violation = models.ForeignKey(Violation, null=True, blank=True, on_delete=models.SET_NULL, related_name='events')
+    # Indexed copy of details['remote_addr'], set on insert, so IP filters avoid JSON key lookups
+    remote_addr = models.GenericIPAddressField(null=True, blank=True, db_index=True, editable=False)
 
     class Meta:
         verbose_name_plural = "Human layer events"
         ordering = ('-timestamp',)
+        indexes = [
+            models.Index(fields=['event_type', '-timestamp'], name='hle_type_ts'),
+            models.Index(fields=['user', '-timestamp'], name='hle_user_ts'),
+        ]
 
     def save(self, *args, **kwargs):
-        # HumanLayerEvent is truly append-only - no updates allowed
-        if self.pk and HumanLayerEvent.objects.filter(pk=self.pk).exists():
+        # HumanLayerEvent is truly append-only - no updates allowed. Instances
+        # loaded from the DB are never `adding`, so this needs no SELECT; new
+        # instances always INSERT (the UUID pk has a default), so a clashing pk
+        # fails with IntegrityError instead of overwriting the existing row.
+        if not self._state.adding:
             raise ValueError('HumanLayerEvent objects are immutable and cannot be updated')
+        if self.remote_addr is None and isinstance(self.details, dict):
+            self.remote_addr = normalize_ip(self.details.get('remote_addr'))
         return super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -259,6 +342,11 @@ class EventMetadata(models.Model):
     from immutable event core data, resolving append-only contradiction.
     """
     event = models.OneToOneField(HumanLayerEvent, on_delete=models.CASCADE, related_name='metadata', primary_key=True)
+    # Copies of event.user / event.timestamp, set when the event is signed, so the
+    # previous signature in a user's chain is found without joining the event table
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                             related_name='+', db_index=False, editable=False)
+    event_timestamp = models.DateTimeField(null=True, blank=True, editable=False)
     processed = models.BooleanField(default=False, db_index=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     # Cryptographic chaining & provenance
@@ -267,11 +355,20 @@ class EventMetadata(models.Model):
     signature_timestamp = models.DateTimeField(null=True, blank=True)
     # TSA timestamp token (RFC 3161)
     tsa_token = models.BinaryField(null=True, blank=True)
+    # When events are signed in a batch the token covers the Merkle root of the batch's
+    # signatures; this is the signature's inclusion path ([side, sibling_hex] steps)
+    merkle_path = models.JSONField(null=True, blank=True)
     
     class Meta:
         verbose_name = "Event metadata"
         verbose_name_plural = "Event metadata"
         db_table = 'policy_eventmetadata'
+        indexes = [
+            # the unprocessed-event queue excludes this set; keep it a small index-only scan
+            models.Index(fields=['event'], condition=models.Q(processed=True), name='evmeta_processed'),
+            # previous signature in a user's chain: an index-only scan on PostgreSQL
+            models.Index(fields=['user', '-event_timestamp'], name='evmeta_user_ts', include=['signature']),
+        ]
         
     def __str__(self):
         return f"Metadata for {self.event_id}"
@@ -339,6 +436,12 @@ class ScorerArtifact(models.Model):
     class Meta:
         unique_together = (('name', 'version'),)
 
+    def save(self, *args, **kwargs):
+        # Callers hashing external artifacts (e.g. model files) set sha256 themselves
+        if not self.sha256 and self.config is not None:
+            self.sha256 = payload_sha256(self.config)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Scorer {self.name} v{self.version} ({self.sha256})"
 
@@ -2,189 +2,750 @@
 
 Implements:
 - Redis-backed policy cache
+- In-process TTL/LRU layer in front of Redis
 - Active policy caching
 - Rule caching
-- Cache invalidation on updates
+- Cache invalidation on updates, deferred to commit and batched per request
 - TTL management
 """
 from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import logging
 import hashlib
 import json
-from typing import List, Optional, Dict, Any
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# orjson is optional; stdlib json produces the same payloads, just more slowly
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+
+    def _canonical_json(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _json_dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def _canonical_json(value: Any) -> bytes:
+        return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+    _json_loads = json.loads
+
 # Cache TTL settings
 POLICY_CACHE_TTL = 3600  # 1 hour
 RULE_CACHE_TTL = 3600
 ACTIVE_POLICIES_TTL = 300  # 5 minutes
+TTL_JITTER_RATIO = 0.1  # spread expiry of entries filled at the same time
+
+# Single-flight rebuild settings (seconds)
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT_SECONDS = 1.0
+REBUILD_POLL_INTERVAL = 0.05
+
+# Counter embedded in every key; clear_all bumps it rather than deleting keys
+GENERATION_KEY = 'policy_cache:gen'
+
+# In-process cache layer
+LOCAL_CACHE_MAXSIZE = 1024
+LOCAL_CACHE_TTL = 30
+
+# XFetch early-refresh aggressiveness; values > 1 favour refreshing earlier
+XFETCH_BETA = 1.0
+
+# Bump when the shape of cached policy/rule dicts changes so stale entries are ignored
+CACHE_SCHEMA_VERSION = 1
+
+# Columns the rule evaluator reads; everything else is deferred on rule loads
+RULE_FIELDS = (
+    'id', 'name', 'left_operand', 'operator', 'right_value', 'enabled',
+    'control', 'control__name', 'control__severity', 'control__policy', 'control__policy__name',
+)
+
+# Columns copied into cached policy trees (see `_load_policy_dicts`)
+POLICY_VALUES = ('id', 'name', 'version', 'lifecycle')
+CONTROL_VALUES = ('id', 'policy_id', 'name', 'severity', 'combination', 'expression')
+RULE_VALUES = ('id', 'control_id', 'name', 'left_operand', 'operator', 'right_value', 'enabled')
+
+# Id sets gating lookups of missing policies/rules
+ID_SET_CACHE_TTL = 300
+
+# Rows fetched per round trip when streaming rules during a cache refill
+LOAD_CHUNK_SIZE = 2000
+
+
+def _encode(value: Any) -> Any:
+    """Serialize cache values to compact JSON bytes.
+
+    Values that are not pure JSON (e.g. model instances) are returned unchanged
+    and fall back to the cache backend's pickling.
+    """
+    try:
+        return _json_dumps(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _decode(raw: Any) -> Any:
+    """Inverse of `_encode`."""
+    if isinstance(raw, bytes):
+        return _json_loads(raw)
+    return raw
+
+
+class _IdSet(frozenset):
+    """Frozenset of ids that also remembers its largest member."""
+
+    def __new__(cls, ids):
+        self = super().__new__(cls, ids)
+        self.max = max(self, default=0)
+        return self
+
+    def may_contain(self, obj_id: int) -> bool:
+        """False only for ids the set rules out; ids above `max` may be newer rows."""
+        return obj_id in self or obj_id > self.max
+
+
+class _LocalTTLCache:
+    """Small thread-safe LRU with per-entry TTL for the in-process cache layer.
+
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Per-process layer in front of the shared cache; short TTL bounds cross-process staleness
+_LOCAL = _LocalTTLCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=LOCAL_CACHE_TTL)
+
+
+def _shared(op: str, default: Any, *args, **kwargs) -> Any:
+    """Call a shared-cache method; a backend error is logged and returns `default`.
+
+    Used for everything except plain reads/writes (see `PolicyCache._get`/`_set`),
+    so a cache outage degrades to DB loads instead of failing every lookup.
+    """
+    try:
+        return getattr(cache, op)(*args, version=CACHE_SCHEMA_VERSION, **kwargs)
+    except Exception as e:
+        logger.warning(f'Cache {op} failed, continuing without the shared cache: {e}')
+        return default
+
+
+# Last generation read from the shared cache, used while it is unreachable
+_last_generation = 0
+
+
+def _should_refresh_early(meta: Dict[str, float]) -> bool:
+    """XFetch test: refresh when now - delta * beta * ln(rand) passes the expiry.
+
+    `delta` is how long the last rebuild took; expensive rebuilds start earlier.
+    """
+    return time.time() - meta['delta'] * XFETCH_BETA * math.log(1.0 - random.random()) >= meta['expiry']
+
+
+def _rule_to_dict(rule) -> Dict[str, Any]:
+    """Flatten a Rule into the fields the evaluator needs."""
+    return {
+        'id': rule.id,
+        'name': rule.name,
+        'left_operand': rule.left_operand,
+        'operator': rule.operator,
+        'right_value': rule.right_value,
+        'enabled': rule.enabled,
+    }
+
+
+def _compile_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach process-local precompiled forms of a rule's right operand.
+
+    - `_re`: compiled pattern for `regex` rules
+    - `_set`: frozenset of members for `in` / `not_in` rules with hashable values
+
+    These keys are added only on the in-process copy; Redis holds plain JSON.
+    """
+    operator = rule.get('operator')
+    right = rule.get('right_value')
+    if operator == 'regex' and isinstance(right, str):
+        try:
+            rule['_re'] = re.compile(right)
+        except re.error:
+            # Leave it to the evaluator to report the invalid pattern
+            pass
+    elif operator in ('in', 'not_in') and isinstance(right, list):
+        try:
+            rule['_set'] = frozenset(right)
+        except TypeError:
+            pass
+    return rule
+
+
+def _compile_policy(policy: Dict[str, Any]) -> Dict[str, Any]:
+    """Precompile every rule of a cached policy dict (see `_compile_rule`)."""
+    for control in policy['controls']:
+        for rule in control['rules']:
+            _compile_rule(rule)
+    return policy
+
+
+def _compile_policies(policies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [_compile_policy(p) for p in policies]
+
+
+def _rule_detail_to_dict(rule) -> Dict[str, Any]:
+    """Rule dict plus the control/policy identifiers needed outside a policy tree."""
+    data = _rule_to_dict(rule)
+    data.update({
+        'control_id': rule.control_id,
+        'control_name': rule.control.name,
+        'severity': rule.control.severity,
+        'policy_id': rule.control.policy_id,
+        'policy_name': rule.control.policy.name,
+    })
+    return data
+
+
+def _load_policy_dicts(policies) -> List[Dict[str, Any]]:
+    """Build cached policy dicts for a Policy queryset without hydrating models.
+
+    Policies, active controls and enabled rules are fetched as column tuples in
+    three bounded queries and stitched together by id; rules are streamed in
+    chunks so large rule sets never materialize as one result list.
+    """
+    from policy.models import Control, Rule
+    result = [dict(p, controls=[]) for p in policies.values(*POLICY_VALUES)]
+    if not result:
+        return result
+    controls_by_policy = {p['id']: p['controls'] for p in result}
+    rules_by_control = {}
+    controls = (
+        Control.objects.filter(policy_id__in=list(controls_by_policy), active=True)
+        .order_by('order', 'id')
+        .values(*CONTROL_VALUES)
+    )
+    for control in controls:
+        control['rules'] = rules_by_control[control['id']] = []
+        controls_by_policy[control.pop('policy_id')].append(control)
+    if rules_by_control:
+        rules = (
+            Rule.objects.filter(control_id__in=list(rules_by_control), enabled=True)
+            .order_by('order', 'id')
+            .values(*RULE_VALUES)
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        for rule in rules:
+            rules_by_control[rule.pop('control_id')].append(rule)
+    return result
 
 
 class PolicyCache:
     """Redis-backed caching for policies and rules."""
     
-    @staticmethod
-    def get_cache_key(prefix: str, identifier: Any) -> str:
-        """Generate cache key."""
+    @classmethod
+    def get_cache_key(cls, prefix: str, identifier: Any) -> str:
+        """Generate cache key scoped to the current cache generation."""
         if isinstance(identifier, (dict, list)):
-            identifier = hashlib.md5(json.dumps(identifier, sort_keys=True).encode()).hexdigest()
-        return f'policy_cache:{prefix}:{identifier}'
+            # Scalars are used verbatim; only composite identifiers are hashed
+            identifier = hashlib.blake2b(_canonical_json(identifier), digest_size=16).hexdigest()
+        return f'policy_cache:g{cls._generation()}:{prefix}:{identifier}'
+    
+    @staticmethod
+    def _generation() -> int:
+        """Current cache generation; bumping it orphans every existing key.
+        
+        The value is mirrored in the local layer so key building normally costs
+        no round-trip; other processes pick up a bump within LOCAL_CACHE_TTL.
+        """
+        global _last_generation
+        generation = _LOCAL.get(GENERATION_KEY)
+        if generation is None:
+            # Seed from the clock so a lost counter never reuses an old generation
+            generation = _shared('get_or_set', None, GENERATION_KEY, lambda: int(time.time()), None)
+            if generation is None:
+                # Not mirrored locally, so the next key build asks the shared cache again
+                return _last_generation
+            _LOCAL.set(GENERATION_KEY, generation)
+            _last_generation = generation
+        return generation
+    
+    @staticmethod
+    def _get(cache_key: str) -> Any:
+        """Read and decode a PolicyCache entry; a cache backend error reads as a miss."""
+        try:
+            raw = cache.get(cache_key, version=CACHE_SCHEMA_VERSION)
+        except Exception as e:
+            logger.warning(f'Cache read failed for {cache_key}, loading from DB: {e}')
+            return None
+        return _decode(raw)
+    
+    @staticmethod
+    def _set(cache_key: str, value: Any, timeout: int):
+        """Encode and write a PolicyCache entry; a cache backend error only skips the write."""
+        try:
+            cache.set(cache_key, _encode(value), timeout, version=CACHE_SCHEMA_VERSION)
+        except Exception as e:
+            logger.warning(f'Cache write failed for {cache_key}: {e}')
     
     @classmethod
-    def get_active_policies(cls):
-        """Get all active policies from cache or DB."""
-        cache_key = cls.get_cache_key('active_policies', 'all')
+    def _get_or_load(
+        cls,
+        cache_key: str,
+        loader: Callable[[], Any],
+        timeout: int,
+        label: str,
+        early_refresh: bool = False,
+        local: bool = True,
+        prepare: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Return a value from the in-process cache, then the shared cache, then the DB.
         
-        cached = cache.get(cache_key)
+        `prepare` runs once when a value enters the in-process layer and may attach
+        process-local derived data (e.g. compiled patterns) that never goes to Redis.
+        """
+        if local:
+            value = _LOCAL.get(cache_key)
+            if value is not None:
+                return value
+        value = cls._get_or_load_shared(cache_key, loader, timeout, label, early_refresh)
+        if value is not None and prepare is not None:
+            value = prepare(value)
+        if local and value is not None:
+            _LOCAL.set(cache_key, value)
+        return value
+    
+    @classmethod
+    def _get_or_load_shared(
+        cls,
+        cache_key: str,
+        loader: Callable[[], Any],
+        timeout: int,
+        label: str,
+        early_refresh: bool = False,
+    ) -> Any:
+        """Return a cached value, rebuilding it with `loader` on a miss.
+        
+        Rebuilds are single-flight: the first worker to miss takes a short-lived
+        lock and reloads from the DB, while concurrent workers poll the cache for
+        its result instead of re-running the same query. If the lock holder is
+        gone or too slow, waiters fall back to loading themselves.
+        
+        With `early_refresh`, hits may also trigger a rebuild shortly before the
+        entry expires (XFetch), with a probability that grows as expiry nears and
+        with how long the last rebuild took, so the entry rarely actually lapses.
+        """
+        meta = None
+        if early_refresh:
+            entries = _shared('get_many', {}, [cache_key, f'{cache_key}:meta'])
+            cached = _decode(entries.get(cache_key))
+            meta = entries.get(f'{cache_key}:meta')
+        else:
+            cached = cls._get(cache_key)
+        
+        lock_key = f'{cache_key}:lock'
         if cached is not None:
-            logger.debug(f'Cache HIT: active_policies')
-            return cached
+            if meta is None or not _should_refresh_early(meta):
+                logger.debug(f'Cache HIT: {label}')
+                return cached
+            # Keep serving the cached value if another worker is already refreshing
+            if not _shared('add', True, lock_key, 1, REBUILD_LOCK_TIMEOUT):
+                return cached
+            logger.debug(f'Cache early refresh: {label}')
+            return cls._rebuild(cache_key, loader, timeout, early_refresh)
         
-        # Load from database
-        from policy.models import Policy
-        policies = list(Policy.objects.filter(lifecycle_state='ACTIVE').prefetch_related('controls', 'controls__rules'))
+        # Without a reachable lock, load directly rather than wait on nobody
+        if not _shared('add', True, lock_key, 1, REBUILD_LOCK_TIMEOUT):
+            deadline = time.monotonic() + REBUILD_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(REBUILD_POLL_INTERVAL)
+                cached = cls._get(cache_key)
+                if cached is not None:
+                    logger.debug(f'Cache HIT after wait: {label}')
+                    return cached
+                if _shared('get', None, lock_key) is None:
+                    break
+            return loader()
         
-        # Cache for 5 minutes
-        cache.set(cache_key, policies, ACTIVE_POLICIES_TTL)
-        logger.debug(f'Cache MISS: active_policies, loaded {len(policies)} policies')
+        logger.debug(f'Cache MISS: {label}')
+        return cls._rebuild(cache_key, loader, timeout, early_refresh)
+    
+    @classmethod
+    def _rebuild(cls, cache_key: str, loader: Callable[[], Any], timeout: int, track_meta: bool) -> Any:
+        """Load a value and cache it; the caller must hold the rebuild lock."""
+        try:
+            started = time.monotonic()
+            value = loader()
+            if value is None:
+                # Missing ids are answered by the id-set gate (see `_existing_ids`), not per-id sentinels
+                return None
+            # Jitter the TTL so entries filled together do not expire together
+            ttl = timeout + random.randint(0, max(1, int(timeout * TTL_JITTER_RATIO)))
+            cls._set(cache_key, value, ttl)
+            if track_meta:
+                meta = {'delta': time.monotonic() - started, 'expiry': time.time() + ttl}
+                _shared('set', None, f'{cache_key}:meta', meta, ttl)
+            return value
+        finally:
+            _shared('delete', None, f'{cache_key}:lock')
+    
+    @classmethod
+    def get_active_policies(cls) -> List[Dict[str, Any]]:
+        """Get all active policies (as dicts) from cache or DB."""
+        def load():
+            from policy.models import Policy
+            return _load_policy_dicts(Policy.objects.filter(lifecycle='active', active=True))
         
-        return policies
+        cache_key = cls.get_cache_key('active_policies', 'all')
+        return cls._get_or_load(
+            cache_key, load, ACTIVE_POLICIES_TTL, 'active_policies', early_refresh=True, prepare=_compile_policies
+        )
     
     @classmethod
-    def get_policy(cls, policy_id: int):
-        """Get single policy from cache or DB."""
-        cache_key = cls.get_cache_key('policy', policy_id)
+    def _existing_ids(cls, prefix: str) -> _IdSet:
+        """Ids of every existing policy or rule, cached as one entry.
         
-        cached = cache.get(cache_key)
-        if cached is not None:
-            logger.debug(f'Cache HIT: policy {policy_id}')
-            return cached
+        Lookups of ids the set rules out return None without touching Redis or the
+        DB, so enumeration of unknown ids cannot fill the cache with sentinels.
+        Ids above the set's max are not ruled out: they may belong to rows created
+        since the set was loaded (by another process, or in a transaction whose
+        deferred invalidation has not run yet) and are looked up normally.
+        The entry is dropped whenever a policy/rule is created or deleted.
+        """
+        def load():
+            from policy.models import Policy, Rule
+            model = {'policy': Policy, 'rule': Rule}[prefix]
+            return list(model.objects.order_by().values_list('id', flat=True))
         
-        # Load from database
-        from policy.models import Policy
-        try:
-            policy = Policy.objects.prefetch_related('controls', 'controls__rules').get(id=policy_id)
-            cache.set(cache_key, policy, POLICY_CACHE_TTL)
-            logger.debug(f'Cache MISS: policy {policy_id}')
-            return policy
-        except Policy.DoesNotExist:
-            # Cache negative result for 1 minute
-            cache.set(cache_key, None, 60)
+        return cls._get_or_load(cls._id_set_key(prefix), load, ID_SET_CACHE_TTL, f'{prefix} ids', prepare=_IdSet)
+    
+    @classmethod
+    def get_policy(cls, policy_id: int) -> Optional[Dict[str, Any]]:
+        """Get single policy (as a dict) from cache or DB."""
+        def load():
+            from policy.models import Policy
+            policies = _load_policy_dicts(Policy.objects.filter(id=policy_id))
+            return policies[0] if policies else None
+        
+        policy_id = int(policy_id)
+        if not cls._existing_ids('policy').may_contain(policy_id):
             return None
+        cache_key = cls.get_cache_key('policy', policy_id)
+        return cls._get_or_load(cache_key, load, POLICY_CACHE_TTL, f'policy {policy_id}', prepare=_compile_policy)
     
     @classmethod
-    def get_rule(cls, rule_id: int):
-        """Get single rule from cache or DB."""
+    def get_rule(cls, rule_id: int) -> Optional[Dict[str, Any]]:
+        """Get single rule (as a dict with its control/policy ids) from cache or DB."""
+        def load():
+            from policy.models import Rule
+            try:
+                obj = Rule.objects.select_related('control', 'control__policy').only(*RULE_FIELDS).get(id=rule_id)
+            except Rule.DoesNotExist:
+                return None
+            return _rule_detail_to_dict(obj)
+        
+        rule_id = int(rule_id)
+        if not cls._existing_ids('rule').may_contain(rule_id):
+            return None
         cache_key = cls.get_cache_key('rule', rule_id)
+        return cls._get_or_load(cache_key, load, RULE_CACHE_TTL, f'rule {rule_id}', prepare=_compile_rule)
+    
+    @classmethod
+    def get_policies(cls, policy_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Batch version of `get_policy`; results align with `policy_ids` (None if missing)."""
+        def load(missing):
+            from policy.models import Policy
+            return {p['id']: p for p in _load_policy_dicts(Policy.objects.filter(id__in=missing))}
         
-        cached = cache.get(cache_key)
-        if cached is not None:
-            logger.debug(f'Cache HIT: rule {rule_id}')
-            return cached
+        return cls._get_many_or_load('policy', policy_ids, load, POLICY_CACHE_TTL, prepare=_compile_policy)
+    
+    @classmethod
+    def get_rules(cls, rule_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Batch version of `get_rule`; results align with `rule_ids` (None if missing)."""
+        def load(missing):
+            from policy.models import Rule
+            rules = Rule.objects.filter(id__in=missing).select_related('control', 'control__policy').only(*RULE_FIELDS)
+            return {r.id: _rule_detail_to_dict(r) for r in rules}
         
-        # Load from database
-        from policy.models import Rule
-        try:
-            rule = Rule.objects.select_related('control', 'control__policy').get(id=rule_id)
-            cache.set(cache_key, rule, RULE_CACHE_TTL)
-            logger.debug(f'Cache MISS: rule {rule_id}')
-            return rule
-        except Rule.DoesNotExist:
-            cache.set(cache_key, None, 60)
-            return None
+        return cls._get_many_or_load('rule', rule_ids, load, RULE_CACHE_TTL, prepare=_compile_rule)
+    
+    @classmethod
+    def _get_many_or_load(
+        cls,
+        prefix: str,
+        ids: List[int],
+        loader: Callable[[List[int]], Dict[int, Any]],
+        timeout: int,
+        prepare: Optional[Callable[[Any], Any]] = None,
+    ) -> List[Any]:
+        """Resolve many ids with one shared-cache round-trip and one DB query for the misses."""
+        ids = [int(i) for i in ids]
+        keys = {i: cls.get_cache_key(prefix, i) for i in ids}
+        found = {}
+        for i, key in keys.items():
+            value = _LOCAL.get(key)
+            if value is not None:
+                found[i] = value
+        
+        remote_keys = [key for i, key in keys.items() if i not in found]
+        if remote_keys:
+            cached = _shared('get_many', {}, remote_keys)
+            for i, key in keys.items():
+                value = _decode(cached.get(key)) if key in cached else None
+                if value is not None:
+                    if prepare is not None:
+                        value = prepare(value)
+                    found[i] = value
+                    _LOCAL.set(key, value)
+        
+        known = cls._existing_ids(prefix)
+        missing = [i for i in keys if i not in found and known.may_contain(i)]
+        if missing:
+            loaded = loader(missing)
+            if loaded:
+                ttl = timeout + random.randint(0, max(1, int(timeout * TTL_JITTER_RATIO)))
+                _shared('set_many', None, {keys[i]: _encode(value) for i, value in loaded.items()}, ttl)
+                for i, value in loaded.items():
+                    if prepare is not None:
+                        value = prepare(value)
+                    found[i] = value
+                    _LOCAL.set(keys[i], value)
+            logger.debug(f'Cache MISS: {len(missing)} of {len(keys)} {prefix} ids')
+        
+        return [found.get(i) for i in ids]
     
     @classmethod
     def get_user_violations(cls, user_id: int, include_resolved: bool = False):
         """Get user violations from cache or DB."""
-        cache_key = cls.get_cache_key('user_violations', f'{user_id}_{include_resolved}')
+        def load():
+            from policy.models import Violation
+            violations = Violation.objects.filter(user_id=user_id)
+            if not include_resolved:
+                violations = violations.filter(resolved=False)
+            return list(violations.select_related('policy', 'rule'))
         
-        cached = cache.get(cache_key)
-        if cached is not None:
-            logger.debug(f'Cache HIT: user_violations {user_id}')
-            return cached
-        
-        # Load from database
-        from policy.models import Violation
-        violations = Violation.objects.filter(user_id=user_id)
-        if not include_resolved:
-            violations = violations.filter(resolved=False)
-        violations = list(violations.select_related('policy', 'rule'))
+        # Cache for 1 minute (violations change frequently); model instances stay out of the local layer
+        cache_key = cls.get_cache_key('user_violations', f'{user_id}_{include_resolved}')
+        return cls._get_or_load(cache_key, load, 60, f'user_violations {user_id}', local=False)
+    
+    @classmethod
+    def get_user_violations_summary(cls, user_id: int) -> List[Dict[str, Any]]:
+        """Get unresolved violation counts per (policy, severity) for a user.
         
-        # Cache for 1 minute (violations change frequently)
-        cache.set(cache_key, violations, 60)
-        logger.debug(f'Cache MISS: user_violations {user_id}, loaded {len(violations)} violations')
+        Cheaper than `get_user_violations` when callers only need counts: one
+        grouped query, no model hydration.
+        """
+        def load():
+            from policy.models import Violation
+            return list(
+                Violation.objects.filter(user_id=user_id, resolved=False)
+                .order_by()
+                .values('policy_id', 'severity')
+                .annotate(count=Count('id'))
+                .order_by('policy_id', 'severity')
+            )
         
-        return violations
+        cache_key = cls.get_cache_key('user_violations_summary', user_id)
+        return cls._get_or_load(cache_key, load, 60, f'user_violations_summary {user_id}', local=False)
+    
+    @classmethod
+    def _policy_keys(cls, policy_id: int) -> List[str]:
+        return [cls.get_cache_key('policy', policy_id), cls.get_cache_key('active_policies', 'all')]
+    
+    @classmethod
+    def _rule_keys(cls, rule_id: int) -> List[str]:
+        return [cls.get_cache_key('rule', rule_id)]
+    
+    @classmethod
+    def _id_set_key(cls, prefix: str) -> str:
+        return cls.get_cache_key('ids', prefix)
+    
+    @classmethod
+    def _user_violation_keys(cls, user_id: int) -> List[str]:
+        return [
+            cls.get_cache_key('user_violations', f'{user_id}_True'),
+            cls.get_cache_key('user_violations', f'{user_id}_False'),
+            cls.get_cache_key('user_violations_summary', user_id),
+        ]
     
     @classmethod
     def invalidate_policy(cls, policy_id: int):
         """Invalidate policy cache."""
-        cache.delete(cls.get_cache_key('policy', policy_id))
-        cache.delete(cls.get_cache_key('active_policies', 'all'))
+        _flush_invalidations(cls._policy_keys(policy_id))
         logger.info(f'Invalidated cache for policy {policy_id}')
     
     @classmethod
     def invalidate_rule(cls, rule_id: int):
         """Invalidate rule cache."""
-        cache.delete(cls.get_cache_key('rule', rule_id))
+        _flush_invalidations(cls._rule_keys(rule_id))
         logger.info(f'Invalidated cache for rule {rule_id}')
     
     @classmethod
     def invalidate_user_violations(cls, user_id: int):
         """Invalidate user violations cache."""
-        cache.delete(cls.get_cache_key('user_violations', f'{user_id}_True'))
-        cache.delete(cls.get_cache_key('user_violations', f'{user_id}_False'))
+        _flush_invalidations(cls._user_violation_keys(user_id))
         logger.info(f'Invalidated violation cache for user {user_id}')
     
+    @classmethod
+    def invalidate_user_violations_on_commit(cls, user_id: int):
+        """Invalidate user violations cache once the current transaction commits.
+        
+        For writes that bypass model signals (e.g. `QuerySet.update`).
+        """
+        _invalidate_on_commit(cls._user_violation_keys(user_id))
+    
+    @classmethod
+    def clear_local(cls):
+        """Clear this process's in-memory layer only."""
+        _LOCAL.clear()
+    
     @classmethod
     def clear_all(cls):
-        """Clear all policy-related caches."""
-        cache.delete_pattern('policy_cache:*')
-        logger.info('Cleared all policy caches')
+        """Clear all policy-related caches.
+        
+        Increments the cache generation instead of scanning the keyspace; old
+        entries become unreachable and expire through their TTLs.
+        """
+        global _last_generation
+        try:
+            generation = cache.incr(GENERATION_KEY, version=CACHE_SCHEMA_VERSION)
+        except ValueError:
+            generation = int(time.time())
+            cache.set(GENERATION_KEY, generation, None, version=CACHE_SCHEMA_VERSION)
+        _LOCAL.clear()
+        _LOCAL.set(GENERATION_KEY, generation)
+        _last_generation = generation
+        logger.info(f'Cleared all policy caches (generation {generation})')
 
 
-# Auto-invalidate cache on model changes
-@receiver(post_save, sender='policy.Policy')
-def invalidate_policy_cache(sender, instance, **kwargs):
-    """Invalidate policy cache when policy is updated."""
-    PolicyCache.invalidate_policy(instance.id)
+# Deferred invalidation: signal receivers queue keys once the transaction commits.
+# Inside a request wrapped by PolicyCacheInvalidationMiddleware the keys are
+# collected and deleted in one delete_many when the response is produced;
+# elsewhere (tasks, management commands) they are deleted on commit.
+_pending = threading.local()
 
 
-@receiver(post_delete, sender='policy.Policy')
-def invalidate_policy_cache_on_delete(sender, instance, **kwargs):
-    """Invalidate policy cache when policy is deleted."""
-    PolicyCache.invalidate_policy(instance.id)
+def _flush_invalidations(keys):
+    """Delete keys from the shared cache in one call and drop local copies."""
+    if not keys:
+        return
+    keys = list(keys)
+    _shared('delete_many', None, keys)
+    for key in keys:
+        _LOCAL.pop(key)
 
 
-@receiver(post_save, sender='policy.Rule')
-def invalidate_rule_cache(sender, instance, **kwargs):
-    """Invalidate rule cache when rule is updated."""
-    PolicyCache.invalidate_rule(instance.id)
-    # Also invalidate parent policy
-    if instance.control and instance.control.policy:
-        PolicyCache.invalidate_policy(instance.control.policy.id)
+def _enqueue_invalidations(keys):
+    batch = getattr(_pending, 'keys', None)
+    if batch is None:
+        _flush_invalidations(keys)
+    else:
+        batch.update(keys)
 
 
-@receiver(post_delete, sender='policy.Rule')
-def invalidate_rule_cache_on_delete(sender, instance, **kwargs):
-    """Invalidate rule cache when rule is deleted."""
-    PolicyCache.invalidate_rule(instance.id)
-    if instance.control and instance.control.policy:
-        PolicyCache.invalidate_policy(instance.control.policy.id)
+def _invalidate_on_commit(keys):
+    transaction.on_commit(lambda: _enqueue_invalidations(keys))
 
 
-@receiver(post_save, sender='policy.Violation')
-def invalidate_violation_cache(sender, instance, **kwargs):
-    """Invalidate violation cache when violation is updated."""
-    if instance.user_id:
-        PolicyCache.invalidate_user_violations(instance.user_id)
+def _drop_id_set(prefix: str):
+    """Drop an id set now as well as on commit, so this transaction's own reads reload it."""
+    key = PolicyCache._id_set_key(prefix)
+    _shared('delete', None, key)
+    _LOCAL.pop(key)
+    return key
 
 
-@receiver(post_delete, sender='policy.Violation')
-def invalidate_violation_cache_on_delete(sender, instance, **kwargs):
-    """Invalidate violation cache when violation is deleted."""
+class PolicyCacheInvalidationMiddleware:
+    """Batch PolicyCache invalidations committed during a request into one delete_many."""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        _pending.keys = set()
+        try:
+            return self.get_response(request)
+        finally:
+            keys, _pending.keys = _pending.keys, None
+            if keys:
+                _flush_invalidations(keys)
+                logger.debug(f'Invalidated {len(keys)} policy cache keys at end of request')
+
+
+# Auto-invalidate cache on model changes
+@receiver([post_save, post_delete], sender='policy.Policy')
+def invalidate_policy_cache(sender, instance, **kwargs):
+    """Invalidate policy cache when a policy is saved or deleted."""
+    keys = PolicyCache._policy_keys(instance.id)
+    # post_delete carries no `created`; creations and deletions both change the id set
+    if kwargs.get('created', True):
+        keys.append(_drop_id_set('policy'))
+    _invalidate_on_commit(keys)
+
+
+@receiver([post_save, post_delete], sender='policy.Control')
+def invalidate_control_cache(sender, instance, **kwargs):
+    """Invalidate the parent policy when one of its controls changes."""
+    _invalidate_on_commit(PolicyCache._policy_keys(instance.policy_id))
+
+
+@receiver([post_save, post_delete], sender='policy.Rule')
+def invalidate_rule_cache(sender, instance, **kwargs):
+    """Invalidate rule cache and its parent policy when a rule changes."""
+    keys = PolicyCache._rule_keys(instance.id)
+    if kwargs.get('created', True):
+        keys.append(_drop_id_set('rule'))
+    try:
+        keys += PolicyCache._policy_keys(instance.control.policy_id)
+    except ObjectDoesNotExist:
+        # Parent control already removed (cascade delete); its own signal covers the policy
+        pass
+    _invalidate_on_commit(keys)
+
+
+@receiver([post_save, post_delete], sender='policy.Violation')
+def invalidate_violation_cache(sender, instance, **kwargs):
+    """Invalidate violation cache when a violation is saved or deleted."""
     if instance.user_id:
-        PolicyCache.invalidate_user_violations(instance.user_id)
+        _invalidate_on_commit(PolicyCache._user_violation_keys(instance.user_id))
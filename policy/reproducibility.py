@@ -4,17 +4,75 @@ Enhanced experiment reproducibility with container tracking.
 Captures Docker image digests, hashed dependencies, and complete environment
 information to ensure experiments can be reproduced exactly.
 """
+import asyncio
 import subprocess
 import platform
 import sys
 import os
+import functools
 import hashlib
 import json
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata as importlib_metadata
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the wait for any single environment probe, in seconds
+PROBE_TIMEOUT = 15
+
+# pygit2 (libgit2 bindings) is optional; without it git metadata comes from the git CLI
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+# HEAD SHA and dirty state in one call; untracked files do not count as dirty
+GIT_STATUS_CMD = ['git', 'status', '--porcelain=v2', '--branch', '--untracked-files=no']
+
+# Recorded with each capture as `dependency_hash_format`. Metadata without it
+# holds the original hash of `pip freeze` output, which verify_reproducibility
+# recomputes for the current environment when it meets such metadata
+DEPENDENCY_HASH_FORMAT = 'distributions-v1'
+
+# verify_reproducibility check name -> metadata section it compares
+VERIFIED_FIELDS = {
+    'git_match': 'git_commit',
+    'docker_match': 'docker_image_digest',
+    'dependencies_match': 'dependency_hash',
+    'platform_match': 'platform',  # warning only, not a critical check
+    'seed_binding_valid': 'seed_binding',
+}
+
+
+async def _run_async(cmd, timeout: float = 5) -> str:
+    """Run `cmd` as an asyncio subprocess and return its stdout; raises on failure or timeout."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return stdout.decode()
+
+
+@functools.lru_cache(maxsize=None)
+def _libgit2_repository(path: str):
+    """Open (once per working directory) the repository containing `path`.
+    
+    The handle is kept for the life of the process, so captures after
+    `invalidate_cache()` re-read HEAD and status without re-discovering and
+    re-opening the repository.
+    """
+    return pygit2.Repository(pygit2.discover_repository(path))
+
 
 class ReproducibilityCapture:
     """
@@ -22,96 +80,201 @@ class ReproducibilityCapture:
     
     Features:
     - Docker image SHA256 digest
-    - Hashed dependency manifest (pip freeze + SHA256)
+    - Hashed dependency manifest (installed distributions + SHA256)
     - Git commit SHA with dirty status
     - Platform and environment information
     - Cryptographic binding of seed to experiment
+    
+    Environment probes are memoized for the life of the process; long-running
+    workers that may see a new checkout or environment call `invalidate_cache()`.
     """
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_git_commit() -> Optional[str]:
-        """Get current Git commit SHA, or None if not in a repo."""
+        """Get current Git commit SHA, or None if not in a repo.
+        
+        A single `git status --porcelain=v2 --branch` call yields both the HEAD
+        SHA (`# branch.oid` header) and the dirty state (any entry line), instead
+        of separate `rev-parse` and `diff-index` processes. Untracked files are
+        ignored, matching `diff-index HEAD`.
+        
+        With pygit2 installed the repository is read in-process and no git
+        process is spawned at all.
+        """
+        if pygit2 is not None:
+            try:
+                return ReproducibilityCapture._get_git_commit_libgit2()
+            except Exception as e:
+                logger.debug(f'pygit2 lookup failed, falling back to git CLI: {e}')
         try:
             result = subprocess.run(
-                ['git', 'rev-parse', 'HEAD'],
+                GIT_STATUS_CMD,
                 capture_output=True,
                 text=True,
                 timeout=5,
                 check=True
             )
-            commit = result.stdout.strip()
-            
-            # Check for uncommitted changes
-            dirty_result = subprocess.run(
-                ['git', 'diff-index', '--quiet', 'HEAD', '--'],
-                capture_output=True,
-                timeout=5
-            )
-            
-            if dirty_result.returncode != 0:
-                commit += '-dirty'
-            
-            return commit
+            return ReproducibilityCapture._parse_git_status(result.stdout)
         except Exception as e:
             logger.warning(f'Failed to capture git commit: {e}')
             return None
     
     @staticmethod
+    def _parse_git_status(output: str) -> Optional[str]:
+        """Commit SHA (with `-dirty` suffix) from `git status --porcelain=v2 --branch` output."""
+        commit = None
+        dirty = False
+        for line in output.splitlines():
+            if line.startswith('# branch.oid '):
+                commit = line[len('# branch.oid '):].strip()
+            elif line and not line.startswith('#'):
+                dirty = True
+        
+        # '(initial)' means the repository has no commits yet
+        if not commit or commit == '(initial)':
+            return None
+        
+        if dirty:
+            commit += '-dirty'
+        
+        return commit
+    
+    @staticmethod
+    def _get_git_commit_libgit2() -> Optional[str]:
+        """`get_git_commit` via libgit2; raises if no repository is found."""
+        repo = _libgit2_repository(os.getcwd())
+        if repo.head_is_unborn:
+            return None
+        commit = str(repo.head.target)
+        ignored = pygit2.GIT_STATUS_WT_NEW | pygit2.GIT_STATUS_IGNORED
+        if any(flags & ~ignored for flags in repo.status().values()):
+            commit += '-dirty'
+        return commit
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_docker_image_digest() -> Optional[str]:
         """
         Get SHA256 digest of current Docker image if running in container.
         
         Returns None if not in a container or unable to determine.
+        
+        Sources are tried cheapest first: the `CONTAINER_IMAGE_DIGEST` environment
+        variable (set by the deployment), podman's `/run/.containerenv`, and only
+        then `docker inspect`, which needs the docker CLI and socket.
         """
+        digest = ReproducibilityCapture._image_digest_without_cli()
+        if digest:
+            return digest
+        
         # Check if running in Docker
         if not os.path.exists('/.dockerenv') and not os.path.exists('/run/.containerenv'):
             return None
         
         try:
-            # Try to get image ID from cgroup
-            with open('/proc/self/cgroup', 'r') as f:
-                cgroup_content = f.read()
+            container_id = ReproducibilityCapture._container_id_from_cgroup()
+            if container_id is None:
+                return None
+            
+            # Try to inspect container to get image digest
+            result = subprocess.run(
+                ['docker', 'inspect', '--format={{.Image}}', container_id],
+                capture_output=True,
+                text=True,
+                timeout=5,
+                check=True
+            )
             
-            # Extract container ID from cgroup path
-            for line in cgroup_content.split('\n'):
-                if 'docker' in line or 'kubepods' in line:
-                    parts = line.split('/')
-                    if len(parts) > 0:
-                        container_id = parts[-1][:12]  # First 12 chars of container ID
-                        
-                        # Try to inspect container to get image digest
-                        result = subprocess.run(
-                            ['docker', 'inspect', '--format={{.Image}}', container_id],
-                            capture_output=True,
-                            text=True,
-                            timeout=5,
-                            check=True
-                        )
-                        
-                        image_id = result.stdout.strip()
-                        
-                        # Get full digest
-                        digest_result = subprocess.run(
-                            ['docker', 'inspect', '--format={{index .RepoDigests 0}}', image_id],
-                            capture_output=True,
-                            text=True,
-                            timeout=5,
-                            check=True
-                        )
-                        
-                        return digest_result.stdout.strip()
+            image_id = result.stdout.strip()
             
-            return None
+            # Get full digest
+            digest_result = subprocess.run(
+                ['docker', 'inspect', '--format={{index .RepoDigests 0}}', image_id],
+                capture_output=True,
+                text=True,
+                timeout=5,
+                check=True
+            )
+            
+            return digest_result.stdout.strip()
         except Exception as e:
             logger.warning(f'Failed to capture Docker image digest: {e}')
             return None
     
     @staticmethod
+    def _image_digest_without_cli() -> Optional[str]:
+        """Image digest from the environment or podman's containerenv, if available."""
+        digest = os.environ.get('CONTAINER_IMAGE_DIGEST')
+        if digest:
+            return digest
+        if os.path.exists('/run/.containerenv'):
+            return ReproducibilityCapture._read_containerenv_image_id()
+        return None
+    
+    @staticmethod
+    def _container_id_from_cgroup() -> Optional[str]:
+        """Short container ID from the first docker/kubepods cgroup path."""
+        with open('/proc/self/cgroup', 'r') as f:
+            cgroup_content = f.read()
+        
+        for line in cgroup_content.split('\n'):
+            if 'docker' in line or 'kubepods' in line:
+                return line.split('/')[-1][:12]  # First 12 chars of container ID
+        return None
+    
+    @staticmethod
+    def _read_containerenv_image_id() -> Optional[str]:
+        """Image ID from podman's `/run/.containerenv` (`imageid="..."`), if present."""
+        try:
+            with open('/run/.containerenv', 'r') as f:
+                for line in f:
+                    key, _, value = line.strip().partition('=')
+                    image_id = value.strip('"')
+                    if key == 'imageid' and image_id:
+                        return f'sha256:{image_id}'
+        except OSError as e:
+            logger.debug(f'Cannot read /run/.containerenv: {e}')
+        return None
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_dependency_hash() -> str:
         """
         Generate SHA256 hash of all installed dependencies.
         
-        Returns hash of pip freeze output for reproducibility verification.
+        Hashes the sorted `name==version` list of installed distributions, read
+        in-process via importlib.metadata rather than by running `pip freeze`.
+        """
+        try:
+            dependencies = {
+                f"{dist.metadata['Name']}=={dist.version}"
+                for dist in importlib_metadata.distributions()
+                if dist.metadata['Name']
+            }
+            
+            # Feed sorted lines to the hash one at a time instead of joining them first;
+            # newlines go between lines only, so the digest equals that of the
+            # newline-joined manifest and matches hashes already stored.
+            # Stays SHA-256 regardless of faster hashes: stored hashes are compared by
+            # verify_reproducibility, so the algorithm must not vary between hosts.
+            hash_obj = hashlib.sha256()
+            separator = b''
+            for line in sorted(dependencies):
+                hash_obj.update(separator)
+                hash_obj.update(line.encode('utf-8'))
+                separator = b'\n'
+            return hash_obj.hexdigest()
+        except Exception as e:
+            logger.warning(f'Failed to capture dependency hash: {e}')
+            return 'unknown'
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def get_legacy_dependency_hash() -> str:
+        """Dependency hash in its original format: SHA256 of the sorted `pip freeze` lines.
+        
+        Only used to verify metadata recorded before `dependency_hash_format` existed.
         """
         try:
             result = subprocess.run(
@@ -121,31 +284,39 @@ class ReproducibilityCapture:
                 timeout=10,
                 check=True
             )
-            
-            dependencies = result.stdout.strip()
-            
-            # Sort dependencies for consistent hashing
-            sorted_deps = '\n'.join(sorted(dependencies.split('\n')))
-            
-            # Generate SHA256 hash
-            hash_obj = hashlib.sha256(sorted_deps.encode('utf-8'))
-            return hash_obj.hexdigest()
+            sorted_deps = '\n'.join(sorted(result.stdout.strip().split('\n')))
+            return hashlib.sha256(sorted_deps.encode('utf-8')).hexdigest()
         except Exception as e:
-            logger.warning(f'Failed to capture dependency hash: {e}')
+            logger.warning(f'Failed to capture legacy dependency hash: {e}')
             return 'unknown'
     
     @staticmethod
     def get_platform_info() -> Dict[str, str]:
         """Get detailed platform and environment information."""
-        return {
-            'system': platform.system(),
-            'release': platform.release(),
-            'version': platform.version(),
-            'machine': platform.machine(),
-            'processor': platform.processor(),
+        return dict(ReproducibilityCapture._platform_info())
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _platform_info() -> Mapping[str, str]:
+        # One uname() call; processor() may shell out to `uname -p` on Linux.
+        # Frozen so the memoized value cannot be mutated through a caller.
+        uname = platform.uname()
+        return MappingProxyType({
+            'system': uname.system,
+            'release': uname.release,
+            'version': uname.version,
+            'machine': uname.machine,
+            'processor': uname.processor,
             'python_version': sys.version,
             'python_implementation': platform.python_implementation(),
-        }
+        })
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """Forget memoized probe results so the next capture re-reads the environment."""
+        for probe in (cls.get_git_commit, cls.get_docker_image_digest, cls.get_dependency_hash,
+                      cls.get_legacy_dependency_hash, cls._platform_info):
+            probe.cache_clear()
     
     @staticmethod
     def bind_seed_to_experiment(experiment_id: str, seed: int) -> str:
@@ -176,13 +347,85 @@ class ReproducibilityCapture:
         Returns:
             Dictionary with all reproducibility metadata
         """
+        # Probes block on subprocess/filesystem I/O and are independent: run them
+        # concurrently so a cold capture takes as long as the slowest one
+        probes = {
+            'git_commit': (cls.get_git_commit, None),
+            'docker_image_digest': (cls.get_docker_image_digest, None),
+            'dependency_hash': (cls.get_dependency_hash, 'unknown'),
+            'platform': (cls.get_platform_info, {}),
+        }
+        pool = ThreadPoolExecutor(max_workers=len(probes))
+        try:
+            futures = {key: pool.submit(probe) for key, (probe, _) in probes.items()}
+            metadata = {}
+            for key, future in futures.items():
+                try:
+                    metadata[key] = future.result(timeout=PROBE_TIMEOUT)
+                except Exception as e:
+                    logger.warning(f'Reproducibility probe {key} failed: {e}')
+                    metadata[key] = probes[key][1]
+        finally:
+            # Do not wait on a probe that overran its timeout
+            pool.shutdown(wait=False)
+        return cls._complete_metadata(metadata, experiment_id, seed)
+    
+    @classmethod
+    async def capture_full_metadata_async(cls, experiment_id: Optional[str] = None,
+                                          seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Async variant of `capture_full_metadata` for async views and tasks.
+        
+        The git and docker probes run as asyncio subprocesses gathered on the
+        event loop rather than in worker threads; in-process probes (dependencies,
+        platform, pygit2) run inline. Results memoized by the sync probes are reused.
+        """
+        git_commit, docker_digest = await asyncio.gather(
+            cls._get_git_commit_async(), cls._get_docker_image_digest_async()
+        )
         metadata = {
-            'git_commit': cls.get_git_commit(),
-            'docker_image_digest': cls.get_docker_image_digest(),
+            'git_commit': git_commit,
+            'docker_image_digest': docker_digest,
             'dependency_hash': cls.get_dependency_hash(),
             'platform': cls.get_platform_info(),
-            'timestamp': None,  # Will be set by caller
         }
+        return cls._complete_metadata(metadata, experiment_id, seed)
+    
+    @classmethod
+    async def _get_git_commit_async(cls) -> Optional[str]:
+        if pygit2 is not None or cls.get_git_commit.cache_info().currsize:
+            return cls.get_git_commit()
+        try:
+            return cls._parse_git_status(await _run_async(GIT_STATUS_CMD))
+        except Exception as e:
+            logger.warning(f'Failed to capture git commit: {e}')
+            return None
+    
+    @classmethod
+    async def _get_docker_image_digest_async(cls) -> Optional[str]:
+        if cls.get_docker_image_digest.cache_info().currsize:
+            return cls.get_docker_image_digest()
+        digest = cls._image_digest_without_cli()
+        if digest:
+            return digest
+        if not os.path.exists('/.dockerenv') and not os.path.exists('/run/.containerenv'):
+            return None
+        try:
+            container_id = cls._container_id_from_cgroup()
+            if container_id is None:
+                return None
+            image_id = (await _run_async(['docker', 'inspect', '--format={{.Image}}', container_id])).strip()
+            return (await _run_async(['docker', 'inspect', '--format={{index .RepoDigests 0}}', image_id])).strip()
+        except Exception as e:
+            logger.warning(f'Failed to capture Docker image digest: {e}')
+            return None
+    
+    @classmethod
+    def _complete_metadata(cls, metadata: Dict[str, Any], experiment_id: Optional[str],
+                           seed: Optional[int]) -> Dict[str, Any]:
+        """Add the run-specific fields shared by the sync and async captures."""
+        metadata['timestamp'] = None  # Will be set by caller
+        metadata['dependency_hash_format'] = DEPENDENCY_HASH_FORMAT
         
         # Add seed binding if provided
         if experiment_id and seed is not None:
@@ -204,8 +447,18 @@ class ReproducibilityCapture:
         else:
             metadata['container_runtime'] = 'none'
         
+        metadata['_fingerprints'] = {
+            field: cls.fingerprint(metadata[field])
+            for field in VERIFIED_FIELDS.values() if field in metadata
+        }
         return metadata
     
+    @staticmethod
+    def fingerprint(value: Any) -> str:
+        """SHA256 of the canonical (sorted-key, compact) JSON form of a metadata section."""
+        canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
     @classmethod
     def verify_reproducibility(cls, original_metadata: Dict[str, Any], 
                                current_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
@@ -219,39 +472,30 @@ class ReproducibilityCapture:
         Returns:
             Dictionary with verification results for each component
         """
-        if current_metadata is None:
+        captured_here = current_metadata is None
+        if captured_here:
             current_metadata = cls.capture_full_metadata()
         
         verification = {}
         
-        # Check git commit
-        if 'git_commit' in original_metadata:
-            verification['git_match'] = (
-                original_metadata['git_commit'] == current_metadata.get('git_commit')
-            )
+        # Compare section fingerprints when both sides carry them (one string compare each);
+        # metadata captured before fingerprints existed falls back to comparing values
+        original_fps = original_metadata.get('_fingerprints') or {}
+        current_fps = current_metadata.get('_fingerprints') or {}
+        for check, field in VERIFIED_FIELDS.items():
+            if field not in original_metadata:
+                continue
+            if field in original_fps and field in current_fps:
+                verification[check] = original_fps[field] == current_fps[field]
+            else:
+                verification[check] = original_metadata[field] == current_metadata.get(field)
         
-        # Check Docker image
-        if 'docker_image_digest' in original_metadata:
-            verification['docker_match'] = (
-                original_metadata['docker_image_digest'] == current_metadata.get('docker_image_digest')
-            )
-        
-        # Check dependencies
-        if 'dependency_hash' in original_metadata:
+        # Dependency hashes recorded in the pip freeze format can only be checked
+        # against this environment, recomputed the same way
+        if ('dependency_hash' in original_metadata and 'dependency_hash_format' not in original_metadata
+                and captured_here):
             verification['dependencies_match'] = (
-                original_metadata['dependency_hash'] == current_metadata.get('dependency_hash')
-            )
-        
-        # Check platform (warning only, not strict requirement)
-        if 'platform' in original_metadata:
-            verification['platform_match'] = (
-                original_metadata['platform'] == current_metadata.get('platform')
-            )
-        
-        # Check seed binding
-        if 'seed_binding' in original_metadata:
-            verification['seed_binding_valid'] = (
-                original_metadata['seed_binding'] == current_metadata.get('seed_binding')
+                original_metadata['dependency_hash'] == cls.get_legacy_dependency_hash()
             )
         
         # Overall verification (all critical checks must pass)
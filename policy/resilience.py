@@ -3,6 +3,7 @@
 Implements:
 - Redis-based rate limiting (per user, per IP, per endpoint)
 - Circuit breaker pattern for external services
+- Retries with exponential backoff for transient failures
 - Metrics collection for monitoring
 """
 from django.core.cache import cache
@@ -12,10 +13,68 @@ from functools import wraps
 from typing import Callable, Optional
 from datetime import datetime, timedelta
 import logging
+import random
 import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Sliding-window counter evaluated server-side in one round trip:
+# trim entries older than the window, record this request, refresh the TTL, count.
+SLIDING_WINDOW_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+_sliding_window = {'client': None, 'script': None}
+
+
+def get_redis_client():
+    """Return the raw redis client behind the default cache, or None if it is not django-redis."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        # django-redis missing or a non-Redis backend (e.g. LocMem in dev/tests)
+        return None
+
+
+def _sliding_window_script(client):
+    """Register the sliding-window script once per client (EVALSHA with EVAL fallback)."""
+    if _sliding_window['client'] is not client:
+        _sliding_window['script'] = client.register_script(SLIDING_WINDOW_SCRIPT)
+        _sliding_window['client'] = client
+    return _sliding_window['script']
+
+
+def incr_window_counter(key: str, window_seconds: int) -> int:
+    """Atomically increment a fixed-window counter whose TTL is set when it is created.
+    
+    On django-redis this is one pipelined round trip (SET NX EX + INCR); other
+    backends use add() + incr(), which is still free of the get/set race.
+    """
+    client = get_redis_client()
+    if client is not None:
+        try:
+            redis_key = cache.make_key(key)
+            pipe = client.pipeline()
+            pipe.set(redis_key, 0, ex=window_seconds, nx=True)
+            pipe.incr(redis_key)
+            _, count = pipe.execute()
+            return int(count)
+        except Exception as e:
+            logger.warning(f'Redis counter increment failed, using cache API: {e}')
+    
+    cache.add(key, 0, timeout=window_seconds)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout=window_seconds)
+        return 1
+
 
 class RateLimiter:
     """Redis-backed rate limiter with sliding window."""
@@ -40,33 +99,29 @@ class RateLimiter:
             (allowed: bool, info: dict with remaining, reset_at)
         """
         key = f'{self.key_prefix}:{identifier}'
-        now = int(time.time())
-        window_start = now - window_seconds
+        now = time.time()
         
-        # Use Redis sorted set for sliding window
-        # Try to use Redis directly if available
-        try:
-            from django.core.cache import caches
-            redis_cache = caches['default']
-            
-            # Clean old entries
-            redis_cache.delete_many([k for k in redis_cache.keys(f'{key}:*') if int(k.split(':')[-1]) < window_start])
-            
-            # Add current request
-            request_key = f'{key}:{now}'
-            redis_cache.set(request_key, 1, timeout=window_seconds + 1)
-            
-            # Count requests in window
-            count = len([k for k in redis_cache.keys(f'{key}:*')])
-            
-        except Exception:
-            # Fallback to simple counter
-            count = cache.get(key, 0) + 1
-            cache.set(key, count, timeout=window_seconds)
+        # Sliding window on a Redis sorted set scored by request time, in one script call
+        count = None
+        client = get_redis_client()
+        if client is not None:
+            try:
+                script = _sliding_window_script(client)
+                member = f'{now:.6f}:{uuid.uuid4().hex[:8]}'
+                count = int(script(
+                    keys=[cache.make_key(f'{key}:window')],
+                    args=[now, now - window_seconds, window_seconds + 1, member],
+                ))
+            except Exception as e:
+                logger.warning(f'Redis rate limit check failed, using cache counter: {e}')
+        
+        if count is None:
+            # Fallback to a fixed-window counter
+            count = incr_window_counter(key, window_seconds)
         
         allowed = count <= limit
         remaining = max(0, limit - count)
-        reset_at = now + window_seconds
+        reset_at = int(now) + window_seconds
         
         return allowed, {
             'limit': limit,
@@ -77,9 +132,7 @@ class RateLimiter:
     
     def record_hit(self, identifier: str, window_seconds: int = 60):
         """Record a request hit."""
-        key = f'{self.key_prefix}:{identifier}'
-        count = cache.get(key, 0)
-        cache.set(key, count + 1, timeout=window_seconds)
+        incr_window_counter(f'{self.key_prefix}:{identifier}', window_seconds)
 
 
 def rate_limit(
@@ -100,6 +153,10 @@ def rate_limit(
         key_func: Function to extract identifier from request (default: uses user ID or IP)
     """
     def decorator(func):
+        limiter = RateLimiter()
+        limit_header = str(limit)
+        retry_after = str(window)
+        
         @wraps(func)
         def wrapper(request, *args, **kwargs):
             # Extract identifier
@@ -111,22 +168,21 @@ def rate_limit(
                 identifier = f'ip:{get_client_ip(request)}'
             
             # Check rate limit
-            limiter = RateLimiter()
             allowed, info = limiter.is_allowed(identifier, limit, window)
             
             if not allowed:
                 logger.warning(f'Rate limit exceeded for {identifier}')
                 response = HttpResponse('Rate limit exceeded', status=429)
-                response['X-RateLimit-Limit'] = str(info['limit'])
+                response['X-RateLimit-Limit'] = limit_header
                 response['X-RateLimit-Remaining'] = '0'
                 response['X-RateLimit-Reset'] = str(info['reset_at'])
-                response['Retry-After'] = str(window)
+                response['Retry-After'] = retry_after
                 return response
             
             # Add rate limit headers
             response = func(request, *args, **kwargs)
             if hasattr(response, '__setitem__'):
-                response['X-RateLimit-Limit'] = str(info['limit'])
+                response['X-RateLimit-Limit'] = limit_header
                 response['X-RateLimit-Remaining'] = str(info['remaining'])
                 response['X-RateLimit-Reset'] = str(info['reset_at'])
             
@@ -140,7 +196,7 @@ def get_client_ip(request) -> str:
     """Extract client IP from request."""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
-        return x_forwarded_for.split(',')[0].strip()
+        return x_forwarded_for.partition(',')[0].strip()
     return request.META.get('REMOTE_ADDR', 'unknown')
 
 
@@ -150,6 +206,10 @@ class CircuitBreaker:
     States: CLOSED (normal) → OPEN (failing) → HALF_OPEN (testing)
     """
     
+    # Seconds call() trusts a CLOSED state it has just read, skipping the cache
+    # round trips; short next to timeout_seconds, and any failure ends it early
+    LOCAL_STATE_TTL = 1.0
+    
     def __init__(
         self,
         name: str,
@@ -172,59 +232,73 @@ class CircuitBreaker:
         self.failure_key = f'circuit:{name}:failures'
         self.success_key = f'circuit:{name}:successes'
         self.opened_at_key = f'circuit:{name}:opened_at'
+        self._closed_until = 0.0
     
-    def get_state(self) -> str:
-        """Get current circuit state: CLOSED, OPEN, or HALF_OPEN."""
-        state = cache.get(self.state_key, 'CLOSED')
+    def _load(self) -> dict:
+        """Fetch all circuit keys in one cache round trip."""
+        return cache.get_many([self.state_key, self.opened_at_key, self.failure_key, self.success_key])
+    
+    def _state_from(self, values: dict) -> str:
+        state = values.get(self.state_key, 'CLOSED')
         
         # Check if should transition OPEN → HALF_OPEN
         if state == 'OPEN':
-            opened_at = cache.get(self.opened_at_key)
+            opened_at = values.get(self.opened_at_key)
             if opened_at and (time.time() - opened_at) >= self.timeout_seconds:
                 self.set_state('HALF_OPEN')
                 return 'HALF_OPEN'
         
         return state
     
+    def get_state(self) -> str:
+        """Get current circuit state: CLOSED, OPEN, or HALF_OPEN."""
+        return self._state_from(self._load())
+    
     def set_state(self, state: str):
         """Set circuit state."""
-        cache.set(self.state_key, state, timeout=None)
         if state == 'OPEN':
-            cache.set(self.opened_at_key, time.time(), timeout=self.timeout_seconds + 10)
-        elif state == 'CLOSED':
-            cache.delete(self.failure_key)
-            cache.delete(self.success_key)
+            # opened_at lives as long as the state so an unobserved OPEN circuit still recovers
+            cache.set_many({self.state_key: state, self.opened_at_key: time.time()}, timeout=None)
+        else:
+            cache.set(self.state_key, state, timeout=None)
+            if state == 'CLOSED':
+                cache.delete_many([self.failure_key, self.success_key])
     
     def record_success(self):
         """Record successful call."""
-        state = self.get_state()
+        values = self._load()
+        state = self._state_from(values)
         
         if state == 'HALF_OPEN':
-            successes = cache.get(self.success_key, 0) + 1
-            cache.set(self.success_key, successes, timeout=60)
+            successes = values.get(self.success_key, 0) + 1
             
             if successes >= self.success_threshold:
                 logger.info(f'Circuit {self.name}: HALF_OPEN → CLOSED (recovered)')
                 self.set_state('CLOSED')
-        elif state == 'CLOSED':
+            else:
+                cache.set(self.success_key, successes, timeout=60)
+        elif state == 'CLOSED' and self.failure_key in values:
             # Reset failure counter on success
             cache.delete(self.failure_key)
     
     def record_failure(self):
         """Record failed call."""
-        state = self.get_state()
+        self._closed_until = 0.0
+        values = self._load()
+        state = self._state_from(values)
         
         if state == 'HALF_OPEN':
             # Immediately open on failure in HALF_OPEN
             logger.warning(f'Circuit {self.name}: HALF_OPEN → OPEN (test failed)')
             self.set_state('OPEN')
         elif state == 'CLOSED':
-            failures = cache.get(self.failure_key, 0) + 1
-            cache.set(self.failure_key, failures, timeout=60)
+            failures = values.get(self.failure_key, 0) + 1
             
             if failures >= self.failure_threshold:
                 logger.error(f'Circuit {self.name}: CLOSED → OPEN ({failures} failures)')
                 self.set_state('OPEN')
+            else:
+                cache.set(self.failure_key, failures, timeout=60)
     
     def call(self, func: Callable, *args, **kwargs):
         """Execute function with circuit breaker protection.
@@ -232,6 +306,14 @@ class CircuitBreaker:
         Raises:
             CircuitOpenError if circuit is open
         """
+        if time.monotonic() < self._closed_until:
+            # Fast path: CLOSED was confirmed moments ago in this process
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                self.record_failure()
+                raise
+        
         state = self.get_state()
         
         if state == 'OPEN':
@@ -240,6 +322,8 @@ class CircuitBreaker:
         try:
             result = func(*args, **kwargs)
             self.record_success()
+            if state == 'CLOSED':
+                self._closed_until = time.monotonic() + self.LOCAL_STATE_TTL
             return result
         except Exception as e:
             self.record_failure()
@@ -270,6 +354,36 @@ def circuit_breaker(name: str, failure_threshold: int = 5, timeout: int = 60):
     return decorator
 
 
+def retry_with_backoff(exceptions=(Exception,), max_tries: int = 3, base: float = 0.1,
+                       max_delay: float = 2.0):
+    """Decorator retrying transient failures with exponential backoff and full jitter.
+    
+    Attempt n (from 0) that raises one of `exceptions` is followed by a sleep
+    drawn uniformly from [0, min(max_delay, base * 2**n)]; the last failure
+    is re-raised after `max_tries` attempts.
+    
+    Usage:
+        @retry_with_backoff(DatabaseError, max_tries=5, base=0.05)
+        def write_batch():
+            ...
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_tries):
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as e:
+                    if attempt == max_tries - 1:
+                        raise
+                    delay = random.uniform(0, min(max_delay, base * 2 ** attempt))
+                    logger.warning(f'{func.__name__} failed ({e}); retry {attempt + 1}/{max_tries - 1} in {delay:.3f}s')
+                    time.sleep(delay)
+        
+        return wrapper
+    return decorator
+
+
 # Middleware for global rate limiting
 class RateLimitMiddleware:
     """Global rate limiting middleware."""
@@ -277,16 +391,17 @@ class RateLimitMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.limiter = RateLimiter(key_prefix='global_ratelimit')
+        # Settings are fixed once the process has started
+        self.limit = getattr(settings, 'GLOBAL_RATE_LIMIT', 1000)
+        self.window = getattr(settings, 'GLOBAL_RATE_LIMIT_WINDOW', 60)
+        self.limit_header = str(self.limit)
+        self.retry_after = str(self.window)
     
     def __call__(self, request):
         # Skip rate limiting for static files and admin
-        if request.path.startswith('/static/') or request.path.startswith('/admin/'):
+        if request.path.startswith(('/static/', '/admin/')):
             return self.get_response(request)
         
-        # Get rate limit settings from config
-        limit = getattr(settings, 'GLOBAL_RATE_LIMIT', 1000)
-        window = getattr(settings, 'GLOBAL_RATE_LIMIT_WINDOW', 60)
-        
         # Identifier
         if request.user.is_authenticated:
             identifier = f'user:{request.user.id}'
@@ -294,12 +409,12 @@ class RateLimitMiddleware:
             identifier = f'ip:{get_client_ip(request)}'
         
         # Check limit
-        allowed, info = self.limiter.is_allowed(identifier, limit, window)
+        allowed, info = self.limiter.is_allowed(identifier, self.limit, self.window)
         
         if not allowed:
             logger.warning(f'Global rate limit exceeded: {identifier}')
             response = HttpResponse('Too many requests', status=429)
-            response['Retry-After'] = str(window)
+            response['Retry-After'] = self.retry_after
             return response
         
         # Process request
@@ -307,7 +422,7 @@ class RateLimitMiddleware:
         
         # Add headers
         if hasattr(response, '__setitem__'):
-            response['X-RateLimit-Limit'] = str(info['limit'])
+            response['X-RateLimit-Limit'] = self.limit_header
             response['X-RateLimit-Remaining'] = str(info['remaining'])
         
         return response
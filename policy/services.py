@@ -9,13 +9,96 @@ Design goals:
 - Produce `Violation` records (audit-ready)
 """
 import re
+import json
 import logging
-from typing import Any, Dict, Tuple, List
+import functools
+import numpy as np
+from datetime import timedelta
+from typing import Any, Callable, Dict, Tuple, List, NamedTuple, Union
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 from django.utils import timezone
-from .models import Policy, Control, Rule, Threshold, Violation
+from .models import Policy, Control, Rule, Violation, Evidence, payload_sha256
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when evaluate_policy flushes buffered violations
+VIOLATION_BATCH_SIZE = 500
+
+# Comparisons `evaluate_rules_batch` runs column-wise over all contexts for numeric rules
+NUMERIC_OPERATORS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+}
+# Larger integers lose precision as float64 and are compared in Python instead
+EXACT_FLOAT_INT = 2 ** 53
+
+
+def _is_plain_number(value) -> bool:
+    """int or float (not bool or other subclasses) that float64 represents exactly."""
+    if type(value) is float:
+        return True
+    return type(value) is int and -EXACT_FLOAT_INT <= value <= EXACT_FLOAT_INT
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_cached(pattern: str) -> 're.Pattern':
+    return re.compile(pattern)
+
+
+def compile_regex(pattern) -> 're.Pattern':
+    """`re.compile` memoized per pattern string, so rule patterns compile once per process."""
+    if isinstance(pattern, str):
+        return _compile_cached(pattern)
+    return re.compile(pattern)  # raises the usual TypeError for non-string patterns
+
+
+def path_getter(parts: Tuple[str, ...], fallback: Callable[[Any, Tuple[str, ...]], Tuple[bool, Any]]):
+    """Specialize a split dotted path into a function of the context returning (found, value).
+
+    Plain dicts all the way down (the usual JSON-shaped context) are walked with
+    direct `.get` calls; any other layout restarts through `fallback(context, parts)`,
+    which carries the attribute-access semantics of `RuleEngine._get_value`.
+    """
+    if len(parts) == 1:
+        (a,) = parts
+
+        def get(context):
+            if type(context) is dict:
+                return True, context.get(a)
+            return fallback(context, parts)
+    elif len(parts) == 2:
+        a, b = parts
+
+        def get(context):
+            if type(context) is dict:
+                cur = context.get(a)
+                if type(cur) is dict:
+                    return True, cur.get(b)
+            return fallback(context, parts)
+    else:
+        def get(context):
+            cur = context
+            for p in parts:
+                if type(cur) is not dict:
+                    return fallback(context, parts)
+                cur = cur.get(p)
+            return True, cur
+    return get
+
+
+RuleEvaluator = Callable[[Dict[str, Any]], Tuple[bool, Dict[str, Any]]]
+
+
+class CompiledControl(NamedTuple):
+    """An active control with its enabled rules, each paired with its evaluator."""
+    control: Control
+    rules: Tuple[Tuple[Rule, RuleEvaluator], ...]
+
 
 class RuleEngine:
     OPERATORS = {
@@ -29,25 +112,61 @@ class RuleEngine:
         'not_in': lambda a, b: a not in b if b is not None else False,
     }
 
-    def __init__(self, recorder=None):
+    def __init__(self, recorder=None, fail_fast: bool = False):
         """`recorder` should implement `record_violation(violation_data)`.
 
-        By default the engine will create `Violation` DB records when violations occur.
+        By default the engine will create `Violation` DB records when violations occur;
+        `evaluate_policy` then buffers them and inserts each batch with `bulk_create`.
+
+        With `fail_fast`, `evaluate_policy` stops evaluating a control's rules at its
+        first violation (which is still recorded); its `rules` list is then partial.
         """
         self.recorder = recorder or self._default_recorder
+        self._bulk_record = recorder is None
+        self.fail_fast = fail_fast
+        # (policy id, policy updated_at) -> compiled controls; lives as long as the engine
+        self._compiled: Dict[Tuple[int, Any], List[CompiledControl]] = {}
+        # rule id -> (evaluated fields, evaluator); shared by compile_policy and _eval_rule
+        self._evaluators: Dict[int, Tuple[Tuple[Any, ...], RuleEvaluator]] = {}
 
     def _default_recorder(self, data: Dict[str, Any]):
         # Persist a Violation to the DB (audit trail)
         Violation.objects.create(**data)
 
-    def _get_value(self, context: Dict[str, Any], dotted: str):
+    def _record_many(self, pending: List[Dict[str, Any]]):
+        """Insert buffered violations with `bulk_create` and do the work of their post_save receivers.
+
+        `bulk_create` sends no signals, so the Evidence rows and cache invalidation that
+        `Violation` receivers provide for single saves are done here explicitly.
+        """
+        if not pending:
+            return
+        from .policy_cache import PolicyCache
+        try:
+            with transaction.atomic():
+                violations = Violation.objects.bulk_create(
+                    [Violation(**data) for data in pending], batch_size=VIOLATION_BATCH_SIZE
+                )
+                Evidence.objects.bulk_create([
+                    Evidence(policy=v.policy, violation=v, payload=v.evidence, sha256=payload_sha256(v.evidence))
+                    for v in violations
+                ], batch_size=VIOLATION_BATCH_SIZE)
+        except Exception as e:
+            logger.exception('Failed to record %d violations: %s', len(pending), e)
+        else:
+            for user_id in {v.user_id for v in violations if v.user_id}:
+                PolicyCache.invalidate_user_violations_on_commit(user_id)
+        pending.clear()
+
+    def _get_value(self, context: Dict[str, Any], dotted: Union[str, Tuple[str, ...]]):
         """Extract value from context using dotted path, return (found, value).
 
         This function never raises; missing paths return (False, None) to keep evaluation deterministic.
+        `dotted` may also be the path already split into a tuple (see `compile_rule`).
         """
-        if dotted is None or dotted == '':
+        if not dotted:
             return False, None
-        parts = dotted.split('.')
+        parts = dotted.split('.') if isinstance(dotted, str) else dotted
         cur = context
         try:
             for p in parts:
@@ -64,51 +183,129 @@ class RuleEngine:
 
         Returns (result, explanation) where explanation is an audit-friendly dict.
         """
-        found, left_val = self._get_value(context, rule.left_operand)
-        right_val = rule.right_value
-        explanation = {
-            'rule_id': rule.id,
-            'rule_name': rule.name,
-            'left_operand': rule.left_operand,
-            'left_found': found,
-            'left_value': left_val,
-            'operator': rule.operator,
-            'right_value': right_val,
-        }
+        return self._rule_evaluator(rule)(context)
+    
+    def _rule_evaluator(self, rule: Rule) -> RuleEvaluator:
+        """`compile_rule(rule)`, reused while the rule's evaluated fields are unchanged."""
+        fields = (rule.name, rule.left_operand, rule.operator, type(rule.right_value), rule.right_value)
+        cached = self._evaluators.get(rule.id)
+        if cached is not None and cached[0] == fields:
+            return cached[1]
+        evaluate = self.compile_rule(rule)
+        if rule.id is not None:
+            self._evaluators[rule.id] = (fields, evaluate)
+        return evaluate
 
-        if not found:
-            explanation['result'] = False
-            explanation['reason'] = 'left_operand_not_found'
-            return False, explanation
+    def compile_rule(self, rule: Rule) -> RuleEvaluator:
+        """Specialize `rule` into a function of the context returning (result, explanation).
 
-        if rule.operator == 'regex':
-            try:
-                pattern = re.compile(right_val)
-                match = bool(pattern.search(str(left_val)))
-                explanation['result'] = match
-                explanation['reason'] = 'regex_match' if match else 'regex_no_match'
-                return match, explanation
-            except Exception as e:
-                explanation['result'] = False
-                explanation['reason'] = f'regex_error: {str(e)}'
-                return False, explanation
+        The operator is resolved and a regex compiled once here, not on every evaluation.
+        """
+        rule_id, rule_name, dotted = rule.id, rule.name, rule.left_operand
+        operator, right_val = rule.operator, rule.right_value
 
-        # binary operators
-        op = rule.operator
-        if op in self.OPERATORS:
+        def explain(found, left_val, result, reason):
+            return {
+                'rule_id': rule_id,
+                'rule_name': rule_name,
+                'left_operand': dotted,
+                'left_found': found,
+                'left_value': left_val,
+                'operator': operator,
+                'right_value': right_val,
+                'result': result,
+                'reason': reason,
+            }
+
+        if operator == 'regex':
             try:
-                res = self.OPERATORS[op](left_val, right_val)
-                explanation['result'] = bool(res)
-                explanation['reason'] = 'comparison'
-                return bool(res), explanation
+                search = compile_regex(right_val).search
             except Exception as e:
-                explanation['result'] = False
-                explanation['reason'] = f'operator_error: {str(e)}'
-                return False, explanation
+                error = f'regex_error: {str(e)}'
+
+                def check(left_val):
+                    return False, error
+            else:
+                def check(left_val):
+                    try:
+                        match = bool(search(str(left_val)))
+                    except Exception as e:
+                        return False, f'regex_error: {str(e)}'
+                    return match, 'regex_match' if match else 'regex_no_match'
+        elif operator in self.OPERATORS:
+            # binary operators
+            compare = self.OPERATORS[operator]
+
+            def check(left_val):
+                try:
+                    return bool(compare(left_val, right_val)), 'comparison'
+                except Exception as e:
+                    return False, f'operator_error: {str(e)}'
+        else:
+            def check(left_val):
+                return False, 'unsupported_operator'
+
+        # Split the path and pick its accessor once per compiled rule rather than once per evaluation
+        if dotted:
+            get_value = path_getter(tuple(dotted.split('.')), self._get_value)
+        else:
+            def get_value(context):
+                return False, None
+
+        def evaluate(context):
+            found, left_val = get_value(context)
+            if not found:
+                return False, explain(found, left_val, False, 'left_operand_not_found')
+            result, reason = check(left_val)
+            return result, explain(found, left_val, result, reason)
+        return evaluate
 
-        explanation['result'] = False
-        explanation['reason'] = 'unsupported_operator'
-        return False, explanation
+    def compile_policy(self, policy: Policy) -> List[CompiledControl]:
+        """Load a policy's active controls, thresholds and enabled rules once and compile the rules.
+
+        Cached on the engine by (policy id, updated_at); create a new engine to pick up
+        control or rule edits, which do not touch the policy row.
+        """
+        key = (policy.id, policy.updated_at)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            rules = Rule.objects.filter(enabled=True).order_by('order', 'id')
+            controls = (
+                policy.controls.filter(active=True).order_by('order', 'id')
+                .select_related('threshold')
+                .prefetch_related(Prefetch('rules', queryset=rules))
+            )
+            compiled = self._compiled[key] = [
+                CompiledControl(control, tuple((rule, self._rule_evaluator(rule)) for rule in control.rules.all()))
+                for control in controls
+            ]
+        return compiled
+
+    def evaluate_rules_batch(self, policy: Policy, contexts: List[Dict[str, Any]]) -> Tuple[List[Rule], np.ndarray]:
+        """Evaluate every enabled rule of `policy` against many contexts, recording nothing.
+
+        Returns the rules in evaluation order and a boolean matrix of shape
+        (len(contexts), len(rules)) holding the results `_eval_rule` would give.
+        Numeric comparison rules run as one NumPy operation over all contexts;
+        other rules, and contexts whose operand is missing or not a plain number,
+        go through the compiled per-rule evaluator.
+        """
+        compiled = [pair for _, rules in self.compile_policy(policy) for pair in rules]
+        results = np.zeros((len(contexts), len(compiled)), dtype=bool)
+        for j, (rule, evaluate) in enumerate(compiled):
+            compare = NUMERIC_OPERATORS.get(rule.operator)
+            if compare is None or not rule.left_operand or not _is_plain_number(rule.right_value):
+                for i, context in enumerate(contexts):
+                    results[i, j] = evaluate(context)[0]
+                continue
+            get_value = path_getter(tuple(rule.left_operand.split('.')), self._get_value)
+            lefts = [get_value(context)[1] for context in contexts]
+            numeric = np.fromiter((_is_plain_number(v) for v in lefts), dtype=bool, count=len(lefts))
+            values = np.array([v if ok else 0.0 for v, ok in zip(lefts, numeric)], dtype=float)
+            results[:, j] = compare(values, rule.right_value) & numeric
+            for i in np.flatnonzero(~numeric):
+                results[i, j] = evaluate(contexts[i])[0]
+        return [rule for rule, _ in compiled], results
 
     def evaluate_policy(self, policy: Policy, context: Dict[str, Any], user=None) -> Dict[str, Any]:
         """Evaluate an entire `Policy` object and return structured, explainable results.
@@ -119,71 +316,116 @@ class RuleEngine:
         - `violations`: list of recorded violations (audit-friendly summaries)
         """
         results = {'policy_id': policy.id, 'policy_name': policy.name, 'controls': [], 'violations': []}
-        for control in policy.controls.filter(active=True).order_by('order', 'id'):
+        # One timestamp for the whole evaluation: evidence, violation rows and threshold windows
+        now = timezone.now()
+        now_iso = now.isoformat()
+        snapshot = []
+
+        def context_snapshot():
+            # Serialized once per call, on the first violation, and shared by all of them:
+            # JSON-safe (non-JSON values become strings) and detached from later mutation
+            if not snapshot:
+                snapshot.append(json.loads(json.dumps(context, default=str)))
+            return snapshot[0]
+
+        pending = []
+
+        def record(violation_data, failure_message):
+            if self._bulk_record:
+                pending.append(violation_data)
+                return
+            try:
+                self.recorder(violation_data)
+            except Exception as e:
+                logger.exception(failure_message, e)
+
+        evaluated = []
+        for control, rules in self.compile_policy(policy):
             cres = {'control_id': control.id, 'control_name': control.name, 'severity': control.severity, 'rules': []}
+            violations = []
             # Evaluate rules in order
-            for rule in control.rules.filter(enabled=True).order_by('order', 'id'):
-                ok, explanation = self._eval_rule(rule, context)
+            for rule, evaluate in rules:
+                ok, explanation = evaluate(context)
                 cres['rules'].append(explanation)
                 if not ok:
                     # violation: record with evidence
-                    evidence = {
-                        'timestamp': timezone.now().isoformat(),
-                        'policy': policy.name,
-                        'control': control.name,
-                        'rule': rule.name,
-                        'explanation': explanation,
-                        'context_snapshot': context,
-                    }
-                    violation_data = {
-                        'timestamp': timezone.now(),
-                        'user': user,
-                        'policy': policy,
-                        'control': control,
-                        'rule': rule,
-                        'severity': control.severity,
-                        'evidence': evidence,
-                    }
-                    try:
-                        self.recorder(violation_data)
-                    except Exception as e:
-                        logger.exception('Failed to record violation: %s', e)
-                    results['violations'].append(evidence)
+                    evidence, violation_data = self._make_violation(
+                        policy, control, rule, explanation, now, now_iso, context_snapshot(), user
+                    )
+                    record(violation_data, 'Failed to record violation: %s')
+                    violations.append(evidence)
+                    if self.fail_fast:
+                        break
+            evaluated.append((control, cres, violations))
+
+        # Count thresholds are checked once every rule violation of this call has been
+        # recorded (so counts include them, as before), with one query for all controls
+        self._record_many(pending)
+        try:
+            recent_counts = self._recent_violation_counts((control for control, _, _ in evaluated), now)
+        except Exception:
+            logger.exception('Error while counting recent violations for policy %s', policy)
+            recent_counts = {}
+
+        for control, cres, violations in evaluated:
             # Deterministic threshold checks
             try:
                 thr = getattr(control, 'threshold', None)
                 if thr is not None:
                     # Example: count threshold — count violations for this control in the past window_seconds
                     if thr.threshold_type == 'count' and thr.window_seconds:
-                        window_start = timezone.now() - timezone.timedelta(seconds=thr.window_seconds)
-                        recent_count = Violation.objects.filter(control=control, timestamp__gte=window_start).count()
+                        recent_count = recent_counts[control.id]
                         cres['threshold_check'] = {'type': 'count', 'value': thr.value, 'window_seconds': thr.window_seconds, 'recent_count': recent_count}
                         if recent_count >= thr.value:
                             # threshold breached -> produce synthesized violation evidence
-                            evidence = {
-                                'timestamp': timezone.now().isoformat(),
-                                'policy': policy.name,
-                                'control': control.name,
-                                'rule': None,
-                                'explanation': {'reason': 'threshold_breached', 'recent_count': recent_count, 'threshold': thr.value},
-                                'context_snapshot': context,
-                            }
-                            violation_data = {
-                                'timestamp': timezone.now(),
-                                'user': user,
-                                'policy': policy,
-                                'control': control,
-                                'rule': None,
-                                'severity': control.severity,
-                                'evidence': evidence,
-                            }
-                            try:
-                                self.recorder(violation_data)
-                            except Exception as e:
-                                logger.exception('Failed to record threshold violation: %s', e)
-                            results['violations'].append(evidence)
+                            explanation = {'reason': 'threshold_breached', 'recent_count': recent_count, 'threshold': thr.value}
+                            evidence, violation_data = self._make_violation(
+                                policy, control, None, explanation, now, now_iso, context_snapshot(), user
+                            )
+                            record(violation_data, 'Failed to record threshold violation: %s')
+                            violations.append(evidence)
             except Exception:
                 logger.exception('Error while evaluating threshold for control %s', control)
             results['controls'].append(cres)
+            results['violations'].extend(violations)
+        self._record_many(pending)
 
         return results
+
+    def _make_violation(self, policy, control, rule, explanation, now, now_iso, snapshot, user):
+        """Build (evidence, violation_data) for a failed rule, or a breached threshold when `rule` is None."""
+        evidence = {
+            'timestamp': now_iso,
+            'policy': policy.name,
+            'control': control.name,
+            'rule': rule.name if rule is not None else None,
+            'explanation': explanation,
+            'context_snapshot': snapshot,
+        }
+        violation_data = {
+            'timestamp': now,
+            'user': user,
+            'policy': policy,
+            'control': control,
+            'rule': rule,
+            'severity': control.severity,
+            'evidence': evidence,
+        }
+        return evidence, violation_data
+
+    def _recent_violation_counts(self, controls, now) -> Dict[int, int]:
+        """Violations per control inside its count threshold's window ending at `now`, in one query."""
+        windows = {}
+        for control in controls:
+            thr = getattr(control, 'threshold', None)
+            if thr is not None and thr.threshold_type == 'count' and thr.window_seconds:
+                windows[control.id] = now - timedelta(seconds=thr.window_seconds)
+        if not windows:
+            return {}
+        counts = Violation.objects.filter(
+            control_id__in=list(windows), timestamp__gte=min(windows.values())
+        ).aggregate(**{
+            f'c{control_id}': Count('id', filter=Q(control_id=control_id, timestamp__gte=window_start))
+            for control_id, window_start in windows.items()
+        })
+        return {control_id: counts[f'c{control_id}'] for control_id in windows}
@@ -10,7 +10,6 @@ This module provides `sign_bytes(payload: bytes) -> str` which returns a hex dig
 from typing import Optional
 from django.conf import settings
 import hmac
-import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +19,8 @@ def _local_sign(payload: bytes) -> str:
     key = getattr(settings, 'EVIDENCE_SIGNING_KEY', None)
     if not key:
         raise RuntimeError('No local signing key configured (EVIDENCE_SIGNING_KEY)')
-    return hmac.new(key.encode('utf-8'), payload, hashlib.sha256).hexdigest()
+    # One-shot C implementation (OpenSSL), no Python-level HMAC object
+    return hmac.digest(key.encode('utf-8'), payload, 'sha256').hex()
 
 
 def _aws_kms_sign(payload: bytes) -> str:
@@ -20,8 +20,10 @@ Usage:
 from django.db.models.signals import pre_save, pre_delete
 from django.dispatch import receiver
 from django.core.exceptions import PermissionDenied
-from django.db import connection
+from django.db import DEFAULT_DB_ALIAS, connections
+import functools
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +36,7 @@ class ImmutabilityEnforcer:
     all database operations before they execute.
     """
     
-    IMMUTABLE_MODELS = ['Evidence', 'HumanLayerEvent']
+    IMMUTABLE_MODELS = frozenset({'Evidence', 'HumanLayerEvent'})
     
     @classmethod
     def is_immutable_model(cls, model_name: str) -> bool:
@@ -79,13 +81,18 @@ class ImmutabilityEnforcer:
         )
 
 
+@functools.lru_cache(maxsize=None)
+def _is_sqlite(alias: str = DEFAULT_DB_ALIAS) -> bool:
+    """Whether the database behind `alias` is SQLite (settings are fixed per process)."""
+    return 'sqlite' in connections[alias].settings_dict['ENGINE']
+
+
 # Signal handlers for pre-save and pre-delete
 @receiver(pre_save, sender='policy.Evidence')
 def prevent_evidence_update(sender, instance, **kwargs):
     """Prevent updates to Evidence records (SQLite)."""
     if instance.pk is not None:  # This is an update, not a create
-        from django.db import connection
-        if 'sqlite' in connection.settings_dict['ENGINE']:
+        if _is_sqlite(kwargs.get('using', DEFAULT_DB_ALIAS)):
             ImmutabilityEnforcer.check_mutation_allowed(
                 'Evidence',
                 'UPDATE',
@@ -98,8 +105,7 @@ def prevent_evidence_update(sender, instance, **kwargs):
 def prevent_event_update(sender, instance, **kwargs):
     """Prevent updates to HumanLayerEvent records (SQLite)."""
     if instance.pk is not None:  # This is an update, not a create
-        from django.db import connection
-        if 'sqlite' in connection.settings_dict['ENGINE']:
+        if _is_sqlite(kwargs.get('using', DEFAULT_DB_ALIAS)):
             ImmutabilityEnforcer.check_mutation_allowed(
                 'HumanLayerEvent',
                 'UPDATE',
@@ -111,8 +117,7 @@ def prevent_event_update(sender, instance, **kwargs):
 @receiver(pre_delete, sender='policy.Evidence')
 def prevent_evidence_delete(sender, instance, **kwargs):
     """Prevent deletion of Evidence records (SQLite)."""
-    from django.db import connection
-    if 'sqlite' in connection.settings_dict['ENGINE']:
+    if _is_sqlite(kwargs.get('using', DEFAULT_DB_ALIAS)):
         ImmutabilityEnforcer.check_mutation_allowed(
             'Evidence',
             'DELETE',
@@ -124,8 +129,7 @@ def prevent_evidence_delete(sender, instance, **kwargs):
 @receiver(pre_delete, sender='policy.HumanLayerEvent')
 def prevent_event_delete(sender, instance, **kwargs):
     """Prevent deletion of HumanLayerEvent records (SQLite)."""
-    from django.db import connection
-    if 'sqlite' in connection.settings_dict['ENGINE']:
+    if _is_sqlite(kwargs.get('using', DEFAULT_DB_ALIAS)):
         ImmutabilityEnforcer.check_mutation_allowed(
             'HumanLayerEvent',
             'DELETE',
@@ -168,6 +172,22 @@ class ImmutabilityCheckMiddleware:
         return None
 
 
+# Table name -> model name for every immutable model
+_IMMUTABLE_TABLES = {f'policy_{model.lower()}': model for model in sorted(ImmutabilityEnforcer.IMMUTABLE_MODELS)}
+
+# Token separator: whitespace or SQL comments, which the database also treats as whitespace
+_SEP = r'(?:\s|(?s:/\*.*?\*/)|--[^\n]*(?:\n|$))'
+
+# UPDATE [OR <conflict>] / DELETE FROM, then Postgres' optional ONLY, then an
+# immutable table, optionally schema-qualified; either part may be quoted ("x", 'x', `x`, [x])
+_SCHEMA = r'(?:"[^"]*"|\'[^\']*\'|`[^`]*`|\[[^\]]*\]|\w+)'
+_IMMUTABLE_SQL_RE = re.compile(
+    rf'\b(UPDATE(?:{_SEP}+OR{_SEP}+\w+)?|DELETE{_SEP}+FROM)(?:{_SEP}+ONLY)?(?:{_SEP}+|(?=["\'`\[]))'
+    rf'(?:{_SCHEMA}{_SEP}*\.{_SEP}*)?["\'`\[]?(' + '|'.join(_IMMUTABLE_TABLES) + r')\b',
+    re.IGNORECASE,
+)
+
+
 def validate_raw_sql(sql: str) -> None:
     """
     Validate raw SQL doesn't mutate immutable models.
@@ -178,21 +198,15 @@ def validate_raw_sql(sql: str) -> None:
     Raises:
         PermissionDenied: If SQL attempts to mutate immutable models
     """
-    sql_upper = sql.upper()
-    
-    # Check for UPDATE/DELETE on immutable tables
-    for model in ImmutabilityEnforcer.IMMUTABLE_MODELS:
-        table_name = f'policy_{model.lower()}'
-        
-        if 'UPDATE' in sql_upper and table_name.upper() in sql_upper:
-            raise PermissionDenied(
-                f'Cannot UPDATE {model}: model is immutable'
-            )
-        
-        if 'DELETE FROM' in sql_upper and table_name.upper() in sql_upper:
-            raise PermissionDenied(
-                f'Cannot DELETE FROM {model}: model is immutable'
-            )
+    # One case-insensitive pass; only statements that target an immutable table match
+    match = _IMMUTABLE_SQL_RE.search(sql)
+    if match is None:
+        return
+    operation = 'UPDATE' if match.group(1).upper().startswith('UPDATE') else 'DELETE FROM'
+    model = _IMMUTABLE_TABLES[match.group(2).lower()]
+    raise PermissionDenied(
+        f'Cannot {operation} {model}: model is immutable'
+    )
 
 
 class ImmutableQuerySet:
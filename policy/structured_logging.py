@@ -3,13 +3,71 @@ Structured JSON logging for log aggregation integration.
 
 Provides JSON-formatted logging suitable for ELK, Splunk, CloudWatch, etc.
 """
+import itertools
 import logging
 import json
+import os
+import secrets
+import threading
 import traceback
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Dict, Optional
 from django.conf import settings
 
+# orjson is optional; without it records are encoded with the stdlib json module
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+# Reused stdlib encoder (json.dumps with default= builds a new one per call);
+# non-ASCII is kept as-is, like orjson's UTF-8 output
+_encode = json.JSONEncoder(default=str, separators=(',', ':'), ensure_ascii=False).encode
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """Compact JSON for one log line; non-JSON values are rendered with str()."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits, which the stdlib encoder accepts
+    return _encode(data)
+
+
+# `extra=` fields copied into the JSON output when present on a record
+EXTRA_FIELDS = ('user_id', 'request_id', 'ip_address', 'event_type', 'policy', 'severity')
+
+# Fields stamped on every record from the current request's log context
+CONTEXT_FIELDS = ('request_id', 'user_id', 'ip_address')
+
+# Log context of the current request (or task); each thread and asyncio task sees its own
+_log_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar('log_context', default=None)
+
+_base_record_factory = logging.getLogRecordFactory()
+_factory_lock = threading.Lock()
+_factory_installed = False
+
+
+def _context_record_factory(*args, **kwargs) -> logging.LogRecord:
+    record = _base_record_factory(*args, **kwargs)
+    context = _log_context.get()
+    if context:
+        record.__dict__.update(context)
+    return record
+
+
+def install_log_context():
+    """Install, once per process, the record factory that stamps records with the log context."""
+    global _base_record_factory, _factory_installed
+    with _factory_lock:
+        if not _factory_installed:
+            _base_record_factory = logging.getLogRecordFactory()
+            logging.setLogRecordFactory(_context_record_factory)
+            _factory_installed = True
+
 
 class JSONFormatter(logging.Formatter):
     """
@@ -18,6 +76,14 @@ class JSONFormatter(logging.Formatter):
     Output format compatible with ELK, Splunk, CloudWatch, and other log aggregators.
     """
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Environment info is fixed for the life of the process
+        self._base = {
+            'environment': getattr(settings, 'ENVIRONMENT', 'production'),
+            'service': 'awareness-portal',
+        }
+    
     def format(self, record: logging.LogRecord) -> str:
         """
         Format log record as JSON.
@@ -48,25 +114,16 @@ class JSONFormatter(logging.Formatter):
                 'traceback': traceback.format_exception(*record.exc_info)
             }
         
-        # Add extra fields from record
-        if hasattr(record, 'user_id'):
-            log_data['user_id'] = record.user_id
-        if hasattr(record, 'request_id'):
-            log_data['request_id'] = record.request_id
-        if hasattr(record, 'ip_address'):
-            log_data['ip_address'] = record.ip_address
-        if hasattr(record, 'event_type'):
-            log_data['event_type'] = record.event_type
-        if hasattr(record, 'policy'):
-            log_data['policy'] = record.policy
-        if hasattr(record, 'severity'):
-            log_data['severity'] = record.severity
+        # Add extra fields from record (`extra=` values live in the record's __dict__)
+        fields = record.__dict__
+        for name in EXTRA_FIELDS:
+            if name in fields:
+                log_data[name] = fields[name]
         
         # Add environment info
-        log_data['environment'] = getattr(settings, 'ENVIRONMENT', 'production')
-        log_data['service'] = 'awareness-portal'
+        log_data.update(self._base)
         
-        return json.dumps(log_data, default=str)
+        return _dumps(log_data)
 
 
 class StructuredLogger:
@@ -86,6 +143,7 @@ class StructuredLogger:
             name: Logger name (usually __name__)
         """
         self.logger = logging.getLogger(name)
+        install_log_context()
     
     def _log(self, level: int, message: str, **kwargs):
         """
@@ -97,12 +155,20 @@ class StructuredLogger:
             **kwargs: Additional structured fields
         """
         extra = {k: v for k, v in kwargs.items() if k not in ['exc_info']}
-        self.logger.log(
-            level,
-            message,
-            extra=extra,
-            exc_info=kwargs.get('exc_info')
-        )
+        # Context fields are stamped by the record factory, so explicit values go through
+        # the log context too (passing them as `extra` would collide with the stamped ones)
+        explicit = {k: extra.pop(k) for k in CONTEXT_FIELDS if k in extra}
+        token = _log_context.set({**(_log_context.get() or {}), **explicit}) if explicit else None
+        try:
+            self.logger.log(
+                level,
+                message,
+                extra=extra,
+                exc_info=kwargs.get('exc_info')
+            )
+        finally:
+            if token is not None:
+                _log_context.reset(token)
     
     def debug(self, message: str, **kwargs):
         """Log debug message with structured fields."""
@@ -146,50 +212,57 @@ def get_audit_logger() -> StructuredLogger:
     return StructuredLogger('audit')
 
 
+_request_counter = itertools.count(1)
+_request_id_prefix = (None, '')
+
+
+def new_request_id() -> str:
+    """Correlation ID unique across processes: random per-process prefix, pid and a counter.
+
+    Only the first call in each (possibly forked) process touches the OS random source.
+    """
+    global _request_id_prefix
+    pid = os.getpid()
+    if _request_id_prefix[0] != pid:
+        _request_id_prefix = (pid, f'{secrets.token_hex(6)}-{pid:x}')
+    return f'{_request_id_prefix[1]}-{next(_request_counter):x}'
+
+
 # Middleware to add request context to logs
 class LoggingMiddleware:
     """
     Django middleware to add request context to all logs.
     
-    Adds request_id, user_id, and ip_address to log context.
+    Adds request_id, user_id, and ip_address to log context. The context lives in
+    a ContextVar read by one process-wide record factory, so concurrent requests
+    never share it. Place after AuthenticationMiddleware so user_id is known.
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
+        install_log_context()
     
     def __call__(self, request):
         # Generate request ID if not present
         if not hasattr(request, 'request_id'):
-            import uuid
-            request.request_id = str(uuid.uuid4())
+            request.request_id = new_request_id()
         
         # Add to logging context
-        import logging
-        old_factory = logging.getLogRecordFactory()
-        
-        def record_factory(*args, **kwargs):
-            record = old_factory(*args, **kwargs)
-            record.request_id = request.request_id
-            if hasattr(request, 'user') and request.user.is_authenticated:
-                record.user_id = request.user.id
-            record.ip_address = self._get_client_ip(request)
-            return record
-        
-        logging.setLogRecordFactory(record_factory)
-        
-        response = self.get_response(request)
-        
-        # Restore old factory
-        logging.setLogRecordFactory(old_factory)
-        
-        return response
+        context = {'request_id': request.request_id, 'ip_address': self._get_client_ip(request)}
+        if hasattr(request, 'user') and request.user.is_authenticated:
+            context['user_id'] = request.user.id
+        token = _log_context.set(context)
+        try:
+            return self.get_response(request)
+        finally:
+            _log_context.reset(token)
     
     @staticmethod
     def _get_client_ip(request):
         """Extract client IP address from request."""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
+            ip = x_forwarded_for.partition(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
@@ -7,16 +7,35 @@ Tasks:
 - Report generation
 - Signature cleanup
 """
+import functools
 import logging
 from datetime import timedelta
+import numpy as np
 from celery import shared_task
 from django.utils import timezone
 from django.db import transaction
 from django.core.mail import send_mail
 from django.conf import settings
+from django.test.signals import setting_changed
+from django.dispatch import receiver
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming large reports to disk
+REPORT_CHUNK_SIZE = 2000
+
+
+@functools.lru_cache(maxsize=1)
+def _admin_emails():
+    """Recipient addresses from settings.ADMINS, resolved once per process."""
+    return tuple(email for _, email in getattr(settings, 'ADMINS', ()) or ())
+
+
+@receiver(setting_changed)
+def _reset_admin_emails(setting, **kwargs):
+    if setting == 'ADMINS':
+        _admin_emails.cache_clear()
+
 
 @shared_task(bind=True, max_retries=3)
 def evaluate_compliance_async(self, event_id):
@@ -81,25 +100,25 @@ def train_ml_model_async(self, algorithm='random_forest', experiment_id=None):
     try:
         logger.info(f"[CELERY] Starting ML training: {algorithm}")
         
-        # Get labeled data
+        # Get labeled data: just (event id, label) pairs
+        labels = GroundTruthLabel.objects.all()
         if experiment_id:
-            labels = GroundTruthLabel.objects.filter(
-                experiment_id=experiment_id
-            ).select_related('event')
-        else:
-            labels = GroundTruthLabel.objects.all().select_related('event')
+            labels = labels.filter(experiment_id=experiment_id)
+        rows = list(labels.values_list('event_id', 'is_violation'))
         
-        if labels.count() < 10:
-            logger.warning(f"[CELERY] Insufficient training data: {labels.count()} samples")
-            return {'status': 'skipped', 'reason': 'insufficient_data', 'samples': labels.count()}
+        if len(rows) < 10:
+            logger.warning(f"[CELERY] Insufficient training data: {len(rows)} samples")
+            return {'status': 'skipped', 'reason': 'insufficient_data', 'samples': len(rows)}
         
-        # Prepare data
-        events = [label.event for label in labels]
-        true_labels = [label.is_violation for label in labels]
+        # Prepare data: hydrate the labelled events with one IN query
+        event_ids, is_violation = zip(*rows)
+        events_by_id = HumanLayerEvent.objects.in_bulk(set(event_ids))
+        events = [events_by_id[event_id] for event_id in event_ids]
+        true_labels = np.fromiter(is_violation, dtype=np.int8, count=len(rows))
         
         # Train model
         scorer = MLRiskScorer()
-        metrics = scorer.train(events, true_labels, algorithm=algorithm, tune_hyperparameters=True)
+        metrics = scorer.train(list(zip(events, true_labels)), algorithm=algorithm, tune_hyperparameters=True)
         
         # Save model
         version = f"v{timezone.now().strftime('%Y%m%d_%H%M%S')}"
@@ -113,7 +132,7 @@ def train_ml_model_async(self, algorithm='random_forest', experiment_id=None):
         logger.info(f"[CELERY] ML training complete: {version}, F1={metrics.get('f1', 0):.3f}")
         
         # Send notification to admins
-        if hasattr(settings, 'ADMINS') and settings.ADMINS:
+        if _admin_emails():
             send_mail(
                 subject=f'ML Model Training Complete: {version}',
                 message=f"""
@@ -128,7 +147,7 @@ ROC AUC: {metrics.get('roc_auc', 0):.3f}
 The model is ready for production use.
                 """.strip(),
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email for _, email in settings.ADMINS],
+                recipient_list=list(_admin_emails()),
                 fail_silently=True,
             )
         
@@ -158,9 +177,15 @@ def retrain_ml_model_if_needed():
     from policy.ml_scorer import get_ml_scorer
     
     try:
-        # Check if we have recent labels (last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
-        new_labels = GroundTruthLabel.objects.filter(created_at__gte=week_ago).count()
+        # Check if we have recent labels (last 7 days): counted by the label post_save
+        # receiver, falling back to the table when the cache has no running count
+        from django.core.cache import cache
+        from policy.telemetry_signals import RECENT_LABELS_CACHE_KEY
+        new_labels = cache.get(RECENT_LABELS_CACHE_KEY)
+        if new_labels is None:
+            week_ago = timezone.now() - timedelta(days=7)
+            # Only whether there are at least 10 matters; LIMIT lets the scan stop early
+            new_labels = len(GroundTruthLabel.objects.filter(created_at__gte=week_ago).values_list('pk', flat=True)[:10])
         
         if new_labels < 10:
             logger.info(f"[CELERY] Skipping ML retrain: only {new_labels} new labels")
@@ -197,32 +222,31 @@ def generate_weekly_compliance_report():
     from django.db.models import Count, Q
     
     try:
-        week_ago = timezone.now() - timedelta(days=7)
+        now = timezone.now()
+        week_ago = now - timedelta(days=7)
         
         # Gather statistics
         total_events = HumanLayerEvent.objects.filter(timestamp__gte=week_ago).count()
-        violations = ComplianceViolation.objects.filter(
-            created_at__gte=week_ago
-        ).count()
+        recent_violations = ComplianceViolation.objects.filter(created_at__gte=week_ago)
         
-        # Critical violations
-        critical = ComplianceViolation.objects.filter(
-            created_at__gte=week_ago,
-            severity='critical'
-        ).count()
+        # Total and critical violations in one pass
+        counts = recent_violations.aggregate(
+            total=Count('id'),
+            critical=Count('id', filter=Q(severity='critical')),
+        )
+        violations = counts['total']
+        critical = counts['critical']
         
         # Most violated policies
-        top_policies = ComplianceViolation.objects.filter(
-            created_at__gte=week_ago
-        ).values('policy__name').annotate(
+        top_policies = recent_violations.values('policy__name').annotate(
             count=Count('id')
-        ).order_by('-count')[:5]
+        ).order_by('-count').values_list('policy__name', 'count')[:5]
         
         # Build report
         report = f"""
 Weekly Compliance Report
 ========================
-Period: {week_ago.strftime('%Y-%m-%d')} to {timezone.now().strftime('%Y-%m-%d')}
+Period: {week_ago.strftime('%Y-%m-%d')} to {now.strftime('%Y-%m-%d')}
 
 Summary:
 - Total Events: {total_events}
@@ -232,18 +256,18 @@ Summary:
 
 Top 5 Violated Policies:
 """
-        for i, policy_data in enumerate(top_policies, 1):
-            report += f"{i}. {policy_data['policy__name']}: {policy_data['count']} violations\n"
+        for i, (policy_name, count) in enumerate(top_policies, 1):
+            report += f"{i}. {policy_name}: {count} violations\n"
         
         logger.info("[CELERY] Generated weekly compliance report")
         
         # Email to admins
-        if hasattr(settings, 'ADMINS') and settings.ADMINS:
+        if _admin_emails():
             send_mail(
-                subject=f'Weekly Compliance Report - {timezone.now().strftime("%Y-%m-%d")}',
+                subject=f'Weekly Compliance Report - {now.strftime("%Y-%m-%d")}',
                 message=report,
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email for _, email in settings.ADMINS],
+                recipient_list=list(_admin_emails()),
                 fail_silently=True,
             )
         
@@ -292,6 +316,11 @@ def generate_report(report_type, start_date, end_date, user_id):
     """
     Generate custom report and save to file.
     
+    Rows are streamed from the database in chunks and written straight to
+    a temporary CSV file, so memory use does not grow with the date range.
+    The file is local to the worker and is removed before the task returns,
+    whether or not it succeeded; only the summary and preview are returned.
+    
     Args:
         report_type: 'violations', 'policy_effectiveness', 'user_activity'
         start_date: ISO date string
@@ -299,10 +328,13 @@ def generate_report(report_type, start_date, end_date, user_id):
         user_id: User requesting the report
     
     Returns:
-        str: Path to generated report file
+        dict: Row count, size and a 1KB preview of the generated report
     """
+    import contextlib
     import csv
-    import io
+    import os
+    import tempfile
+    from django.db.models import Count, Q
     from policy.models import ComplianceViolation, Policy
     
     try:
@@ -313,61 +345,74 @@ def generate_report(report_type, start_date, end_date, user_id):
         start = datetime.fromisoformat(start_date)
         end = datetime.fromisoformat(end_date)
         
-        output = io.StringIO()
-        
-        if report_type == 'violations':
-            # Violation report
-            violations = ComplianceViolation.objects.filter(
-                created_at__range=(start, end)
-            ).select_related('policy', 'event', 'control')
-            
-            writer = csv.writer(output)
-            writer.writerow(['Timestamp', 'Policy', 'Control', 'Severity', 'Event ID', 'Status'])
-            
-            for v in violations:
-                writer.writerow([
-                    v.created_at.isoformat(),
-                    v.policy.name,
-                    v.control.name if v.control else 'N/A',
-                    v.severity,
-                    v.event.event_id,
-                    v.status,
-                ])
-        
-        elif report_type == 'policy_effectiveness':
-            # Policy effectiveness report
-            policies = Policy.objects.filter(is_active=True)
+        row_count = 0
+        output = tempfile.NamedTemporaryFile(
+            mode='w', newline='', prefix=f'{report_type}-', suffix='.csv', delete=False
+        )
+        try:
+            with output:
+                writer = csv.writer(output)
+                
+                if report_type == 'violations':
+                    # Violation report
+                    # Only the columns written to the CSV, from each joined table
+                    violations = ComplianceViolation.objects.filter(
+                        created_at__range=(start, end)
+                    ).select_related('policy', 'event', 'control').only(
+                        'created_at', 'severity', 'status', 'policy__name', 'control__name', 'event__event_id'
+                    )
+                
+                    writer.writerow(['Timestamp', 'Policy', 'Control', 'Severity', 'Event ID', 'Status'])
+                
+                    # Server-side cursor on PostgreSQL; only one chunk of rows is held at a time
+                    for v in violations.iterator(chunk_size=REPORT_CHUNK_SIZE):
+                        writer.writerow([
+                            v.created_at.isoformat(),
+                            v.policy.name,
+                            v.control.name if v.control_id is not None else 'N/A',
+                            v.severity,
+                            v.event.event_id,
+                            v.status,
+                        ])
+                        row_count += 1
+                
+                elif report_type == 'policy_effectiveness':
+                    # Policy effectiveness report: one grouped query for every policy's counts
+                    severities = ('critical', 'high', 'medium', 'low')
+                    counts = {
+                        row['policy_id']: row
+                        for row in ComplianceViolation.objects.filter(
+                            created_at__range=(start, end)
+                        ).values('policy_id').annotate(
+                            total=Count('id'),
+                            **{level: Count('id', filter=Q(severity=level)) for level in severities}
+                        )
+                    }
+                
+                    writer.writerow(['Policy', 'Total Violations', 'Critical', 'High', 'Medium', 'Low'])
+                
+                    for policy_id, name in Policy.objects.filter(is_active=True).values_list('id', 'name').iterator():
+                        row = counts.get(policy_id, {})
+                        writer.writerow([name, row.get('total', 0)] + [row.get(level, 0) for level in severities])
+                        row_count += 1
             
-            writer = csv.writer(output)
-            writer.writerow(['Policy', 'Total Violations', 'Critical', 'High', 'Medium', 'Low'])
+            # In production, upload the file to S3/storage backend here, before it is removed
+            size_bytes = os.path.getsize(output.name)
+            with open(output.name, newline='') as report_file:
+                preview = report_file.read(1000)  # First 1KB for preview
+            logger.info(f"[CELERY] Report generation complete: {size_bytes} bytes, {row_count} rows")
             
-            for policy in policies:
-                violations = ComplianceViolation.objects.filter(
-                    policy=policy,
-                    created_at__range=(start, end)
-                )
-                
-                writer.writerow([
-                    policy.name,
-                    violations.count(),
-                    violations.filter(severity='critical').count(),
-                    violations.filter(severity='high').count(),
-                    violations.filter(severity='medium').count(),
-                    violations.filter(severity='low').count(),
-                ])
-        
-        report_content = output.getvalue()
-        
-        # In production, save to S3/storage backend
-        # For now, return content
-        logger.info(f"[CELERY] Report generation complete: {len(report_content)} bytes")
-        
-        return {
-            'status': 'success',
-            'report_type': report_type,
-            'size_bytes': len(report_content),
-            'content': report_content[:1000],  # First 1KB for preview
-        }
+            return {
+                'status': 'success',
+                'report_type': report_type,
+                'row_count': row_count,
+                'size_bytes': size_bytes,
+                'content': preview,
+            }
+        finally:
+            # Never leave the file behind, including after a partial write
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(output.name)
         
     except Exception as exc:
         logger.exception(f"[CELERY] Failed to generate {report_type} report")
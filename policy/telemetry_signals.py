@@ -3,14 +3,18 @@
 This module registers receivers for authentication events, violation persistence
 and (if available) quiz/training model saves. It is imported from AppConfig.ready().
 """
+import json
 import logging
+import struct
+import threading
 from django.utils import timezone
 from django.apps import apps
+from django.db import transaction
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
-from django.forms.models import model_to_dict
 from django.conf import settings
+from django.core.cache import cache
 import hmac
 import hashlib
 from .models import HumanLayerEvent
@@ -19,65 +23,190 @@ logger = logging.getLogger(__name__)
 
 
 def _safe_dict(obj):
+    # Same keys and values as model_to_dict (editable concrete fields, FKs as ids)
+    # read straight off the instance: no forms machinery and no M2M queries
     try:
-        return model_to_dict(obj)
+        return {f.name: getattr(obj, f.attname) for f in obj._meta.concrete_fields if f.editable}
     except Exception:
         return {'repr': str(obj)}
 
 
+def _previous_signature(ev):
+    """Signature of the user's most recent signed event other than `ev`, for chaining."""
+    from .models import EventMetadata
+    return EventMetadata.objects.filter(
+        user_id=ev.user_id
+    ).exclude(event_id=ev.pk).order_by('-event_timestamp').values_list('signature', flat=True).first()
+
+
+# Field separator in event signature payloads; it cannot occur in the
+# timestamp, event type, hex prev_hash or (escaped) JSON details
+_PAYLOAD_SEP = b'\x1f'
+
+
+def event_signature_payload(ev, prev_hash) -> bytes:
+    """Canonical bytes signed for `ev` chained to `prev_hash`.
+
+    Details are serialized as sorted, compact JSON so the payload does not
+    depend on dict insertion order or on Python's repr of the values.
+    """
+    return _PAYLOAD_SEP.join([
+        ev.id.bytes,
+        ev.timestamp.isoformat().encode(),
+        struct.pack('>q', -1 if ev.user_id is None else ev.user_id),
+        ev.event_type.encode(),
+        (prev_hash or '').encode(),
+        json.dumps(ev.details, sort_keys=True, separators=(',', ':'), default=str).encode(),
+    ])
+
+
+def _signed_metadata(ev, prev_hash, timestamp=True):
+    """Unsaved EventMetadata carrying the signature of `ev` chained to `prev_hash`.
+
+    With `timestamp=False` the TSA token is left for the caller to fill in.
+    """
+    from .crypto_utils import sign_data, get_tsa_timestamp
+    from .models import EventMetadata
+
+    # Sign with private key
+    sig = sign_data(event_signature_payload(ev, prev_hash))
+    
+    # Get TSA timestamp if configured
+    tsa_token = get_tsa_timestamp(sig) if timestamp and hasattr(settings, 'TSA_URL') else None
+    
+    # Metadata record (mutable table, separate from immutable event)
+    return EventMetadata(
+        event=ev,
+        user_id=ev.user_id,
+        event_timestamp=ev.timestamp,
+        prev_hash=prev_hash,
+        signature=sig,
+        signature_timestamp=timezone.now(),
+        tsa_token=tsa_token
+    )
+
+
 def _sign_event(ev):
     """Sign event and store signature in EventMetadata table."""
     try:
-        from .crypto_utils import sign_data, get_tsa_timestamp
-        from .models import EventMetadata
-        
-        # Get previous event for chaining
-        prev = None
-        if ev.user_id is not None:
-            prev_meta = EventMetadata.objects.filter(
-                event__user=ev.user
-            ).exclude(event_id=ev.pk).order_by('-event__timestamp').first()
-            prev = prev_meta.event if prev_meta else None
-        
-        prev_hash = prev_meta.signature if (prev and hasattr(prev, 'metadata')) else None
-        payload = f"{ev.id}|{ev.timestamp.isoformat()}|{ev.user_id}|{ev.event_type}|{prev_hash}|{ev.details}"
-        
-        # Sign with private key
-        sig = sign_data(payload)
-        
-        # Get TSA timestamp if configured
-        tsa_token = get_tsa_timestamp(sig) if hasattr(settings, 'TSA_URL') else None
-        
-        # Create metadata record (mutable table, separate from immutable event)
-        EventMetadata.objects.create(
-            event=ev,
-            prev_hash=prev_hash,
-            signature=sig,
-            signature_timestamp=timezone.now(),
-            tsa_token=tsa_token
-        )
+        prev_hash = _previous_signature(ev) if ev.user_id is not None else None
+        _signed_metadata(ev, prev_hash).save(force_insert=True)
     except Exception:
         logger.exception('Failed to sign HumanLayerEvent %s', getattr(ev, 'pk', None))
 
 
+# Deferred event recording: receivers queue event fields once the transaction
+# commits. Inside a request wrapped by TelemetryBatchMiddleware the events are
+# collected and written with bulk_create when the response is produced (or
+# every EVENT_BATCH_SIZE events); elsewhere they are written on commit.
+EVENT_BATCH_SIZE = 500
+_pending = threading.local()
+
+
+def _record_events(events):
+    """Insert queued events, then sign them and insert their metadata, in bulk."""
+    if not events:
+        return
+    from .models import EventMetadata, normalize_ip
+
+    rows = []
+    for fields in events:
+        ev = HumanLayerEvent(**fields)
+        # bulk_create bypasses HumanLayerEvent.save(), which fills remote_addr
+        if isinstance(ev.details, dict):
+            ev.remote_addr = normalize_ip(ev.details.get('remote_addr'))
+        rows.append(ev)
+    try:
+        HumanLayerEvent.objects.bulk_create(rows, batch_size=EVENT_BATCH_SIZE)
+    except Exception:
+        logger.exception('Failed to record %d HumanLayerEvents', len(rows))
+        return
+
+    # Chain each user's events in queue order, continuing from the stored chain
+    last_signature = {}
+    metadata = []
+    for ev in rows:
+        try:
+            prev_hash = None
+            if ev.user_id is not None:
+                if ev.user_id not in last_signature:
+                    last_signature[ev.user_id] = _previous_signature(ev)
+                prev_hash = last_signature[ev.user_id]
+            meta = _signed_metadata(ev, prev_hash, timestamp=False)
+        except Exception:
+            logger.exception('Failed to sign HumanLayerEvent %s', ev.pk)
+            continue
+        if ev.user_id is not None:
+            last_signature[ev.user_id] = meta.signature
+        metadata.append(meta)
+    if metadata and hasattr(settings, 'TSA_URL'):
+        _timestamp_batch(metadata)
+    try:
+        EventMetadata.objects.bulk_create(metadata, batch_size=EVENT_BATCH_SIZE)
+    except Exception:
+        logger.exception('Failed to store signatures for %d HumanLayerEvents', len(metadata))
+
+
+def _timestamp_batch(metadata):
+    """Get one TSA token for the Merkle root of the batch's signatures and share it."""
+    from .crypto_utils import get_tsa_timestamp, merkle_tree
+
+    root, paths = merkle_tree([meta.signature for meta in metadata])
+    tsa_token = get_tsa_timestamp(root)
+    for meta, path in zip(metadata, paths):
+        meta.tsa_token = tsa_token
+        meta.merkle_path = path
+
+
+def _enqueue_event(fields):
+    batch = getattr(_pending, 'events', None)
+    if batch is None:
+        _record_events([fields])
+        return
+    batch.append(fields)
+    if len(batch) >= EVENT_BATCH_SIZE:
+        events, batch[:] = batch[:], []
+        _record_events(events)
+
+
+def _queue_event(**fields):
+    """Record a HumanLayerEvent (and its signature) after the current transaction commits."""
+    # Stamp the event now rather than when the batch is written
+    fields.setdefault('timestamp', timezone.now())
+    transaction.on_commit(lambda: _enqueue_event(fields))
+
+
+class TelemetryBatchMiddleware:
+    """Write the telemetry events committed during a request with one bulk insert."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _pending.events = []
+        try:
+            return self.get_response(request)
+        finally:
+            events, _pending.events = _pending.events, None
+            if events:
+                _record_events(events)
+
+
 @receiver(user_logged_in)
 def _on_user_logged_in(sender, request, user, **kwargs):
     try:
-        from .models import HumanLayerEvent
-
         details = {
             'remote_addr': request.META.get('REMOTE_ADDR'),
             'user_agent': request.META.get('HTTP_USER_AGENT'),
             'session_key': getattr(request.session, 'session_key', None),
         }
-        ev = HumanLayerEvent.objects.create(
+        _queue_event(
             user=user,
             event_type='auth',
             source='auth.login',
             summary='user_logged_in',
             details=details,
         )
-        _sign_event(ev)
     except Exception:
         logger.exception('Failed to record user_logged_in telemetry')
 
@@ -85,20 +214,17 @@ def _on_user_logged_in(sender, request, user, **kwargs):
 @receiver(user_logged_out)
 def _on_user_logged_out(sender, request, user, **kwargs):
     try:
-        from .models import HumanLayerEvent
-
         details = {
             'remote_addr': request.META.get('REMOTE_ADDR') if request is not None else None,
             'session_key': getattr(request.session, 'session_key', None) if request is not None else None,
         }
-        ev = HumanLayerEvent.objects.create(
+        _queue_event(
             user=user,
             event_type='auth',
             source='auth.logout',
             summary='user_logged_out',
             details=details,
         )
-        _sign_event(ev)
     except Exception:
         logger.exception('Failed to record user_logged_out telemetry')
 
@@ -106,24 +232,39 @@ def _on_user_logged_out(sender, request, user, **kwargs):
 @receiver(user_login_failed)
 def _on_user_login_failed(sender, credentials, request, **kwargs):
     try:
-        from .models import HumanLayerEvent
-
         details = {
             'username': credentials.get('username') if isinstance(credentials, dict) else str(credentials),
             'remote_addr': request.META.get('REMOTE_ADDR') if request is not None else None,
         }
-        ev = HumanLayerEvent.objects.create(
+        _queue_event(
             event_type='auth',
             source='auth.login_failed',
             summary='user_login_failed',
             details=details,
         )
-        _sign_event(ev)
     except Exception:
         logger.exception('Failed to record user_login_failed telemetry')
 
 
-@receiver(post_save, sender=apps.get_model('policy', 'Violation'))
+# Running count of ground-truth labels created in the current window, read by
+# the periodic retraining check instead of scanning the label table
+RECENT_LABELS_CACHE_KEY = 'ml:recent_labels'
+RECENT_LABELS_WINDOW = 7 * 24 * 3600
+
+
+@receiver(post_save, sender='policy.GroundTruthLabel')
+def _on_label_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        # add() only starts a window when none is running; the expiry ends it
+        cache.add(RECENT_LABELS_CACHE_KEY, 0, RECENT_LABELS_WINDOW)
+        cache.incr(RECENT_LABELS_CACHE_KEY)
+    except Exception:
+        logger.exception('Failed to count new GroundTruthLabel %s', instance.pk)
+
+
+@receiver(post_save, sender='policy.Violation')
 def _on_violation_saved(sender, instance, created, **kwargs):
     # When a Violation is created, persist its `evidence` into an immutable Evidence record
     if not created:
@@ -139,56 +280,42 @@ def _on_violation_saved(sender, instance, created, **kwargs):
 
 
 def _connect_optional_model_signals():
-    """Attempt to connect post_save handlers for quiz and training models if they exist.
+    """Connect post_save handlers for quiz and training models if their apps are installed.
 
-    This avoids import-time failures when those apps are not present.
+    Senders are given as lazy 'app_label.Model' references, resolved by the
+    dispatcher, so nothing is looked up in the app registry at import time.
     """
-    try:
-        QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
-    except Exception:
-        QuizAttempt = None
-    try:
-        TrainingProgress = apps.get_model('training', 'TrainingProgress')
-    except Exception:
-        TrainingProgress = None
-
-    if QuizAttempt is not None:
-        @receiver(post_save, sender=QuizAttempt)
+    if apps.is_installed('quizzes'):
+        @receiver(post_save, sender='quizzes.QuizAttempt')
         def _on_quiz_attempt(sender, instance, created, **kwargs):
             try:
-                from .models import HumanLayerEvent
-
                 details = {
                     'quiz_attempt': _safe_dict(instance),
                 }
-                ev = HumanLayerEvent.objects.create(
+                _queue_event(
                     user=getattr(instance, 'user', None),
                     event_type='quiz',
                     source='quizzes.QuizAttempt',
                     summary='quiz_attempt_saved',
                     details=details,
                 )
-                _sign_event(ev)
             except Exception:
                 logger.exception('Failed to record quiz attempt telemetry')
 
-    if TrainingProgress is not None:
-        @receiver(post_save, sender=TrainingProgress)
+    if apps.is_installed('training'):
+        @receiver(post_save, sender='training.TrainingProgress')
         def _on_training_progress(sender, instance, created, **kwargs):
             try:
-                from .models import HumanLayerEvent
-
                 details = {
                     'training_progress': _safe_dict(instance),
                 }
-                ev = HumanLayerEvent.objects.create(
+                _queue_event(
                     user=getattr(instance, 'user', None),
                     event_type='training',
                     source='training.TrainingProgress',
                     summary='training_progress_saved',
                     details=details,
                 )
-                _sign_event(ev)
             except Exception:
                 logger.exception('Failed to record training telemetry')
 
@@ -200,21 +327,18 @@ def _connect_optional_model_signals():
         @receiver(post_save, sender=LogEntry)
         def _on_admin_logentry(sender, instance, created, **kwargs):
             try:
-                from .models import HumanLayerEvent
-
                 details = {
                     'action': instance.get_change_message(),
                     'object_repr': instance.object_repr,
                     'content_type_id': instance.content_type_id,
                 }
-                ev = HumanLayerEvent.objects.create(
+                _queue_event(
                     user=getattr(instance, 'user', None),
                     event_type='admin',
                     source='admin.LogEntry',
                     summary='admin_action',
                     details=details,
                 )
-                _sign_event(ev)
             except Exception:
                 logger.exception('Failed to record admin LogEntry telemetry')
     except Exception:
@@ -25,7 +25,15 @@ class TelemetrySignalsTests(TestCase):
         req = self.factory.get('/')
         # simulate session key presence
         req.session = {}
-        user_logged_in.send(sender=self.User, request=req, user=self.user)
+        # events are written once the surrounding transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            user_logged_in.send(sender=self.User, request=req, user=self.user)
         ev = HumanLayerEvent.objects.filter(user=self.user, event_type='auth', source='auth.login').first()
         self.assertIsNotNone(ev)
         self.assertIn('user_agent', ev.details)
+
+    def test_safe_dict_matches_model_to_dict(self):
+        from django.forms.models import model_to_dict
+        from policy.telemetry_signals import _safe_dict
+        v = Violation(id=7, timestamp=timezone.now(), user=self.user, policy=self.policy, control=self.ctrl, severity='low', evidence={'k': 'v'})
+        self.assertEqual(_safe_dict(v), model_to_dict(v))
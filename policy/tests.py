@@ -34,10 +34,133 @@ class PolicyEngineTests(TestCase):
         thr = Threshold.objects.create(control=self.control, threshold_type='count', value=3, window_seconds=60)
         # Create historical violations for this control
         now = timezone.now()
-        for i in range(3):
-            Violation.objects.create(timestamp=now, user=self.user, policy=self.policy, control=self.control, rule=None, severity='high', evidence={'test': i})
+        Violation.objects.bulk_create([
+            Violation(timestamp=now, user=self.user, policy=self.policy, control=self.control, rule=None, severity='high', evidence={'test': i})
+            for i in range(3)
+        ])
         engine = RuleEngine()
         ctx = {'file': {'size': 500}}
         result = engine.evaluate_policy(self.policy, ctx, user=self.user)
         # threshold is breached; expect synthesized violation evidence
         self.assertTrue(any(v['explanation'].get('reason') == 'threshold_breached' for v in result['violations']))
+
+    def test_regex_pattern_compiled_once(self):
+        from policy.services import _compile_cached
+        rule = Rule.objects.create(control=self.control, name='Doc name', left_operand='file.name', operator='regex', right_value=r'^report-\d+\.pdf$')
+        engine = RuleEngine()
+        _compile_cached.cache_clear()
+        results = [engine._eval_rule(rule, {'file': {'name': name}})[0] for name in ('report-1.pdf', 'notes.txt', 'report-22.pdf')]
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(_compile_cached.cache_info().misses, 1)
+        rule.right_value = ['not', 'a', 'pattern']
+        ok, explanation = engine._eval_rule(rule, {'file': {'name': 'x'}})
+        self.assertFalse(ok)
+        self.assertTrue(explanation['reason'].startswith('regex_error'))
+
+    def test_compiled_policy_reused_by_engine(self):
+        engine = RuleEngine()
+        ctx = {'file': {'size': 2000}}
+        with self.assertNumQueries(2):  # controls with thresholds, enabled rules
+            first = engine.evaluate_policy(self.policy, ctx, user=self.user)
+        with self.assertNumQueries(0):
+            second = engine.evaluate_policy(self.policy, ctx, user=self.user)
+        self.assertEqual(first, second)
+        self.assertEqual(second['controls'][0]['rules'][0]['reason'], 'comparison')
+
+    def test_threshold_counts_use_one_query(self):
+        other = Control.objects.create(policy=self.policy, name='Second Control', severity='low')
+        Threshold.objects.create(control=self.control, threshold_type='count', value=2, window_seconds=60)
+        Threshold.objects.create(control=other, threshold_type='count', value=5, window_seconds=3600)
+        Violation.objects.create(timestamp=timezone.now(), user=self.user, policy=self.policy, control=other, rule=None, severity='low', evidence={})
+        engine = RuleEngine()
+        engine.compile_policy(self.policy)
+        ctx = {'file': {'size': 2000}}
+        with self.assertNumQueries(1):
+            result = engine.evaluate_policy(self.policy, ctx, user=self.user)
+        checks = {c['control_name']: c['threshold_check']['recent_count'] for c in result['controls']}
+        self.assertEqual(checks, {'File Size Control': 0, 'Second Control': 1})
+
+    def test_violations_share_one_context_snapshot(self):
+        Rule.objects.create(control=self.control, name='Small file', left_operand='file.size', operator='<', right_value=100)
+        ctx = {'file': {'size': 500}, 'seen_at': timezone.now()}
+        result = RuleEngine().evaluate_policy(self.policy, ctx, user=self.user)
+        first, second = result['violations']
+        self.assertIs(first['context_snapshot'], second['context_snapshot'])
+        ctx['file']['size'] = 1
+        self.assertEqual(first['context_snapshot']['file']['size'], 500)
+        self.assertIsInstance(first['context_snapshot']['seen_at'], str)
+        self.assertEqual(Violation.objects.filter(control=self.control).count(), 2)
+
+    def test_default_recorder_bulk_inserts_violations_with_evidence(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from policy.models import Evidence, payload_sha256
+        Rule.objects.create(control=self.control, name='Small file', left_operand='file.size', operator='<', right_value=100)
+        with CaptureQueriesContext(connection) as queries:
+            RuleEngine().evaluate_policy(self.policy, {'file': {'size': 500}}, user=self.user)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "policy_violation"')]
+        self.assertEqual(len(inserts), 1)
+        evidence = Evidence.objects.filter(violation__control=self.control)
+        self.assertEqual(evidence.count(), 2)
+        for item in evidence:
+            self.assertEqual(item.sha256, payload_sha256(item.payload))
+
+    def test_rules_batch_matches_single_evaluation(self):
+        Rule.objects.create(control=self.control, name='Owner', left_operand='file.owner', operator='==', right_value='root')
+        Rule.objects.create(control=self.control, name='Exact', left_operand='file.size', operator='==', right_value=1000.0)
+        engine = RuleEngine()
+        contexts = [
+            {'file': {'size': 2000, 'owner': 'root'}},
+            {'file': {'size': 1000, 'owner': 'bob'}},
+            {'file': {'size': True}},
+            {'file': {'size': '5000'}},
+            {'file': {'size': 2 ** 60}},
+            {'file': {'size': float('nan')}},
+            {},
+        ]
+        rules, matrix = engine.evaluate_rules_batch(self.policy, contexts)
+        self.assertEqual(matrix.shape, (len(contexts), 3))
+        for i, ctx in enumerate(contexts):
+            self.assertEqual(list(matrix[i]), [engine._eval_rule(rule, ctx)[0] for rule in rules])
+        self.assertFalse(Violation.objects.exists())
+
+    def test_fail_fast_stops_at_first_violation(self):
+        Rule.objects.create(control=self.control, name='Small file', left_operand='file.size', operator='<', right_value=100)
+        ctx = {'file': {'size': 500}}
+        result = RuleEngine(fail_fast=True).evaluate_policy(self.policy, ctx, user=self.user)
+        self.assertEqual(len(result['violations']), 1)
+        self.assertEqual([r['rule_name'] for r in result['controls'][0]['rules']], ['Large file'])
+        self.assertEqual(len(RuleEngine().evaluate_policy(self.policy, ctx, user=self.user)['violations']), 2)
+
+    def test_path_getter_matches_get_value(self):
+        from collections import defaultdict
+        from types import SimpleNamespace
+        from policy.services import path_getter
+        engine = RuleEngine()
+        contexts = [
+            {'file': {'meta': {'owner': 'root'}}},
+            {'file': SimpleNamespace(meta={'owner': 'bob'})},
+            {'file': defaultdict(dict)},
+            {'file': None},
+            {'file': 'text'},
+            SimpleNamespace(file={'meta': {'owner': 'eve'}}),
+            {},
+        ]
+        for dotted in ('file', 'file.meta', 'file.meta.owner'):
+            parts = tuple(dotted.split('.'))
+            get = path_getter(parts, engine._get_value)
+            for ctx in contexts:
+                self.assertEqual(get(ctx), engine._get_value(ctx, dotted))
+        self.assertEqual(dict(contexts[2]['file']), {})
+
+    def test_eval_rule_reuses_compiled_evaluator_until_edited(self):
+        from unittest.mock import patch
+        engine = RuleEngine()
+        ctx = {'file': {'size': 2000}}
+        with patch.object(engine, 'compile_rule', wraps=engine.compile_rule) as compile_rule:
+            self.assertTrue(engine._eval_rule(self.rule, ctx)[0])
+            self.assertTrue(engine._eval_rule(Rule.objects.get(pk=self.rule.pk), ctx)[0])
+            self.assertEqual(compile_rule.call_count, 1)
+            self.rule.right_value = 5000
+            self.assertFalse(engine._eval_rule(self.rule, ctx)[0])
+            self.assertEqual(compile_rule.call_count, 2)
@@ -8,7 +8,7 @@ Tests system behavior under failure conditions:
 - Resource exhaustion
 - Cascading failures
 
-Run with: python manage.py test policy.tests.test_chaos_resilience
+Run with: python manage.py test policy.tests_chaos_resilience
 """
 import unittest
 from unittest.mock import patch, Mock
@@ -22,9 +22,12 @@ import threading
 class DatabaseFailureTest(TransactionTestCase):
     """Test system resilience to database failures."""
     
+    # Only these apps' tables are flushed after each test, instead of every table
+    available_apps = ['django.contrib.contenttypes', 'django.contrib.auth', 'policy']
+    
     def test_database_connection_failure(self):
         """Test handling of database connection failures."""
-        from policy.compliance_engine import ComplianceEngine
+        from policy.compliance import ComplianceEngine
         from policy.models import HumanLayerEvent
         
         engine = ComplianceEngine()
@@ -67,8 +70,6 @@ class DatabaseFailureTest(TransactionTestCase):
         from django.db import transaction
         from policy.models import Policy
         
-        initial_count = Policy.objects.count()
-        
         try:
             with transaction.atomic():
                 Policy.objects.create(
@@ -80,61 +81,38 @@ class DatabaseFailureTest(TransactionTestCase):
         except Exception:
             pass
         
-        # Count should not have changed
-        final_count = Policy.objects.count()
-        self.assertEqual(initial_count, final_count)
+        # The row created inside the rolled-back block must not exist
+        self.assertFalse(Policy.objects.filter(name='Test Policy').exists())
 
 
 class RedisFailureTest(TestCase):
     """Test system resilience to Redis failures."""
     
-    def test_cache_unavailable(self):
-        """Test handling when Redis is unavailable."""
-        from policy.policy_cache import PolicyCache
-        from policy.models import Policy
-        
-        # Create test policy
-        policy = Policy.objects.create(
-            name='Test Policy',
-            lifecycle='active'
-        )
-        
-        cache_manager = PolicyCache()
-        
-        # Simulate Redis failure
-        with patch('django.core.cache.cache.get') as mock_get:
-            mock_get.side_effect = Exception('Redis unavailable')
-            
-            # Should fall back to database
-            try:
-                result = cache_manager.get_policy(policy.id)
-                # Should either return None or fall back to DB
-                self.assertTrue(result is None or result.id == policy.id)
-            except Exception:
-                # Acceptable to raise, as long as it doesn't crash the app
-                pass
+    # Every backend operation PolicyCache may call, including the lock and generation helpers
+    CACHE_OPS = ['get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many', 'get_or_set', 'incr']
     
-    def test_cache_write_failure(self):
-        """Test handling when cache writes fail."""
+    def test_cache_outage_falls_back_to_db(self):
+        """Test that reads load from the DB when every cache operation fails."""
+        from contextlib import ExitStack
+        from django.core.cache.backends.locmem import LocMemCache
         from policy.policy_cache import PolicyCache
-        from policy.models import Policy
-        
-        policy = Policy.objects.create(
-            name='Test Policy',
-            lifecycle='active'
-        )
-        
-        # Simulate cache write failure
-        with patch('django.core.cache.cache.set') as mock_set:
-            mock_set.side_effect = Exception('Redis write failed')
-            
-            # Application should continue without caching
-            try:
-                cache_manager = PolicyCache()
-                # Should not crash
-                self.assertIsNotNone(cache_manager)
-            except Exception:
-                pass
+        from policy.models import Control, Policy, Rule
+        
+        policy = Policy.objects.create(name='Test Policy', lifecycle='active')
+        control = Control.objects.create(policy=policy, name='Test Control')
+        rule = Rule.objects.create(control=control, name='Test Rule', left_operand='x', operator='==', right_value=1)
+        # Nothing mirrored in-process, so the generation must come from the failing backend too
+        PolicyCache.clear_local()
+        
+        with ExitStack() as stack:
+            for op in self.CACHE_OPS:
+                stack.enter_context(patch.object(LocMemCache, op, side_effect=ConnectionError('Redis unavailable')))
+            self.assertEqual(PolicyCache.get_policy(policy.id)['id'], policy.id)
+            self.assertEqual([p['id'] for p in PolicyCache.get_active_policies()], [policy.id])
+            self.assertEqual(PolicyCache.get_policies([policy.id])[0]['name'], 'Test Policy')
+            self.assertEqual(PolicyCache.get_rule(rule.id)['name'], 'Test Rule')
+            with self.captureOnCommitCallbacks(execute=True):
+                policy.save()
 
 
 class NetworkFailureTest(TestCase):
@@ -181,27 +159,27 @@ class NetworkFailureTest(TestCase):
         user = User.objects.create_user('test', 'test@example.com', 'pass')
         policy = Policy.objects.create(name='Test', lifecycle='review')
         
-        # Simulate email failure
-        with patch('policy.workflow_views.send_mail') as mock_send:
+        # Simulate email failure (send_mail is imported when the notification is sent)
+        with patch('django.core.mail.send_mail') as mock_send:
             mock_send.side_effect = Exception('SMTP server unavailable')
             
-            # Should handle gracefully
-            try:
-                _send_approval_notification(policy, user, approved=True)
-            except Exception:
-                # Should log error but not crash
-                pass
+            # Should log the error but not crash
+            _send_approval_notification(policy, user, approved=True)
 
 
 class ResourceExhaustionTest(TestCase):
     """Test system behavior under resource exhaustion."""
     
+    @classmethod
+    def setUpTestData(cls):
+        from policy.compliance_reporting import ComplianceReportGenerator
+        cls.soc2_generator = ComplianceReportGenerator(framework='soc2')
+    
     def test_memory_intensive_operation(self):
         """Test handling of memory-intensive operations."""
-        from policy.compliance_reporting import ComplianceReportGenerator
         from datetime import datetime, timedelta
         
-        generator = ComplianceReportGenerator(framework='soc2')
+        generator = self.soc2_generator
         
         # Generate report for large time period
         end_date = datetime.now()
@@ -216,57 +194,57 @@ class ResourceExhaustionTest(TestCase):
     
     def test_large_batch_processing(self):
         """Test handling of large batch operations."""
+        import os
         from policy.models import HumanLayerEvent
         
         # Create many events
-        events = []
-        for i in range(100):
-            events.append(HumanLayerEvent(
-                event_type='batch_test',
-                source='chaos_test',
-                summary=f'Batch event {i}'
-            ))
-        
-        # Bulk create should handle efficiently
+        events = [
+            HumanLayerEvent(event_type='batch_test', source='chaos_test', summary=f'Batch event {i}', details={})
+            for i in range(100)
+        ]
+        
+        # Bulk create should handle efficiently: one INSERT for the whole batch by default
+        batch_size = int(os.environ.get('TEST_BULK_BATCH', '1000'))
         try:
-            HumanLayerEvent.objects.bulk_create(events, batch_size=50)
+            HumanLayerEvent.objects.bulk_create(events, batch_size=batch_size, ignore_conflicts=True)
             created_count = HumanLayerEvent.objects.filter(
                 event_type='batch_test'
             ).count()
             self.assertEqual(created_count, 100)
         except Exception as e:
             self.fail(f'Batch processing failed: {e}')
+
+
+class ConcurrentWriteTest(TransactionTestCase):
+    """Test many concurrent writes.
+    
+    The writes run on another thread's connection, outside any test
+    transaction, so the tables are flushed afterwards instead.
+    """
+    
+    available_apps = ['django.contrib.contenttypes', 'django.contrib.auth', 'policy']
     
     def test_concurrent_writes(self):
         """Test handling of many concurrent writes."""
+        import asyncio
         from policy.models import Policy
-        import threading
         
-        def create_policy(index):
-            try:
-                Policy.objects.create(
-                    name=f'Concurrent Policy {index}',
-                    lifecycle='draft'
-                )
-            except Exception:
-                pass  # Some may fail due to race conditions
-        
-        # Create 50 concurrent threads
-        threads = []
-        for i in range(50):
-            thread = threading.Thread(target=create_policy, args=(i,))
-            threads.append(thread)
-            thread.start()
-        
-        # Wait for all threads
-        for thread in threads:
-            thread.join(timeout=5)
-        
-        # At least some should succeed
-        created = Policy.objects.filter(
-            name__startswith='Concurrent Policy'
-        ).count()
-        self.assertGreater(created, 0)
+        policies = [Policy(name=f'Concurrent Policy {i}', lifecycle='draft') for i in range(50)]
+        batches = [policies[i::8] for i in range(8)]
+        
+        async def main():
+            # Bound in-flight writes so only a few DB connections are ever live
+            limit = asyncio.Semaphore(8)
+            
+            async def create_batch(batch):
+                async with limit:
+                    await Policy.objects.abulk_create(batch)
+            
+            await asyncio.wait_for(asyncio.gather(*(create_batch(b) for b in batches)), timeout=5)
+        
+        asyncio.run(main())
+        
+        self.assertEqual(Policy.objects.filter(name__startswith='Concurrent Policy').count(), 50)
 
 
 class CircuitBreakerTest(TestCase):
@@ -278,7 +256,7 @@ class CircuitBreakerTest(TestCase):
         
         failure_count = 0
         
-        @circuit_breaker(failure_threshold=3, timeout=5)
+        @circuit_breaker('chaos_opens', failure_threshold=3, timeout=5)
         def failing_function():
             nonlocal failure_count
             failure_count += 1
@@ -306,11 +284,11 @@ class CircuitBreakerTest(TestCase):
     def test_circuit_breaker_half_open(self):
         """Test circuit breaker transitions to half-open state."""
         from policy.resilience import circuit_breaker
-        import time
         
+        cache.clear()
         call_count = 0
         
-        @circuit_breaker(failure_threshold=2, timeout=1)
+        @circuit_breaker('chaos_half_open', failure_threshold=2, timeout=1)
         def recovering_function():
             nonlocal call_count
             call_count += 1
@@ -318,18 +296,21 @@ class CircuitBreakerTest(TestCase):
                 raise Exception('Still failing')
             return 'Success'
         
-        # Fail twice to open circuit
-        for i in range(2):
-            try:
-                recovering_function()
-            except Exception:
-                pass
-        
-        # Wait for timeout
-        time.sleep(1.5)
-        
-        # Circuit should transition to half-open and allow retry
-        # This may succeed or fail depending on implementation
+        # The breaker times its OPEN state with time.time(); drive that clock
+        # by hand (from the real time, so cache expiries stay consistent)
+        now = [time.time()]
+        with patch('policy.resilience.time.time', side_effect=lambda: now[0]):
+            # Fail twice to open circuit
+            for i in range(2):
+                with self.assertRaises(Exception):
+                    recovering_function()
+            
+            # Step past the timeout instead of sleeping through it
+            now[0] += 2
+            
+            # Circuit should transition to half-open and allow retry
+            self.assertEqual(recovering_function(), 'Success')
+        self.assertEqual(call_count, 3)
 
 
 class CascadingFailureTest(TestCase):
@@ -337,7 +318,7 @@ class CascadingFailureTest(TestCase):
     
     def test_multiple_service_failures(self):
         """Test handling when multiple services fail simultaneously."""
-        from policy.compliance_engine import ComplianceEngine
+        from policy.compliance import ComplianceEngine
         
         engine = ComplianceEngine()
         
@@ -377,9 +358,7 @@ class RecoveryTest(TestCase):
     
     def test_automatic_retry(self):
         """Test automatic retry mechanisms."""
-        from policy.transaction_safe import TransactionSafeEngine
-        
-        engine = TransactionSafeEngine()
+        from policy.resilience import retry_with_backoff
         
         # Simulate transient failure
         call_count = 0
@@ -391,14 +370,10 @@ class RecoveryTest(TestCase):
                 raise DatabaseError('Transient error')
             return True
         
-        # Should retry and succeed
-        with patch('django.db.transaction.atomic', side_effect=transient_failure):
-            try:
-                # Implementation should retry on transient errors
-                pass
-            except:
-                # Acceptable if retry not implemented
-                pass
+        # Should retry and succeed; sub-millisecond backoff keeps the test fast
+        retrying = retry_with_backoff(DatabaseError, max_tries=5, base=0.001)(transient_failure)
+        self.assertIs(retrying(), True)
+        self.assertEqual(call_count, 2)
     
     def test_graceful_degradation(self):
         """Test graceful degradation of features."""
@@ -25,3 +25,15 @@ class ComplianceEngineTests(TestCase):
         self.assertTrue(len(res['violations']) >= 1)
         # violation created in DB
         self.assertTrue(Violation.objects.filter(control=self.ctrl).exists())
+
+    def test_rules_for_all_controls_loaded_in_one_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        other = Control.objects.create(policy=self.policy, name='Source Control', severity='low')
+        Rule.objects.create(control=other, name='Expect known source', left_operand='event.source', operator='==', right_value='auth.login')
+        ev = HumanLayerEvent.objects.create(user=self.user, event_type='quiz', source='auth.login', summary='ok', details={})
+        with CaptureQueriesContext(connection) as queries:
+            res = ComplianceEngine().evaluate_event(ev, self.policy)
+        self.assertEqual(res['violations'], [])
+        rule_queries = [q for q in queries.captured_queries if 'FROM "policy_rule"' in q['sql']]
+        self.assertEqual(len(rule_queries), 1)
@@ -40,3 +40,47 @@ class ExpressionEvaluationTests(TestCase):
         res = engine.evaluate_event(ev, self.policy)
         self.assertTrue(len(res['violations']) >= 1)
         self.assertTrue(Violation.objects.filter(control=self.ctrl).exists())
+
+    def test_compiled_expression_matches_interpreter(self):
+        from policy.expr import compile_expression
+        from policy.policy_cache import PolicyCache
+        PolicyCache.clear_all()
+        expr = {'op': 'and', 'items': [{'rule': 'Rule A'}, {'op': 'not', 'items': [{'rule_id': self.rule_c.id}]}]}
+        rules = PolicyCache.get_policy(self.policy.id)['controls'][0]['rules']
+        predicate = compile_expression(expr, rules)
+        engine = ComplianceEngine()
+        for event_type, agent in (('auth', 'bot'), ('quiz', 'bot'), ('quiz', 'browser')):
+            ctx = {'event': {'type': event_type}, 'detail': {'user_agent': agent}}
+            expected, _ = engine._eval_expression(expr, self.ctrl, ctx)
+            self.assertEqual(predicate(ctx), expected)
+
+    def test_rule_edit_reaches_compiled_expression(self):
+        self.ctrl.expression = {'op': 'and', 'items': [{'rule': 'Rule A'}]}
+        self.ctrl.save()
+        engine = ComplianceEngine()
+        first = HumanLayerEvent.objects.create(user=self.user, event_type='quiz', source='svc', summary='a', details={})
+        self.assertEqual(engine.evaluate_event(first, self.policy)['violations'], [])
+
+        # Same expression, edited rule: the engine must not reuse the old predicate
+        self.rule_a.right_value = 'quiz'
+        self.rule_a.save()
+        second = HumanLayerEvent.objects.create(user=self.user, event_type='quiz', source='svc', summary='b', details={})
+        self.assertEqual(len(engine.evaluate_event(second, self.policy)['violations']), 1)
+
+    def test_expression_may_reference_disabled_rule(self):
+        # The interpreter resolves disabled rules too; the compiled path must agree
+        self.rule_a.enabled = False
+        self.rule_a.save()
+        self.ctrl.expression = {'op': 'and', 'items': [{'rule': 'Rule A'}]}
+        self.ctrl.save()
+        engine = ComplianceEngine()
+        self.assertIsNotNone(engine._compiled_expression(self.ctrl, list(self.ctrl.rules.all())))
+        ev = HumanLayerEvent.objects.create(user=self.user, event_type='auth', source='svc', summary='c', details={})
+        self.assertEqual(len(engine.evaluate_event(ev, self.policy)['violations']), 1)
+
+    def test_unknown_rule_is_not_compiled(self):
+        from policy.expr import UncompilableExpression, compile_expression
+        with self.assertRaises(UncompilableExpression):
+            compile_expression({'op': 'and', 'items': [{'rule': 'Missing'}]}, [])
+        with self.assertRaises(UncompilableExpression):
+            compile_expression({'op': 'xor', 'items': []}, [])
@@ -229,6 +229,40 @@ class FailureInjectionTestCase(TestCase):
         event.refresh_from_db()
         self.assertEqual(event.summary, 'Immutability test')
     
+    def test_event_update_rejected_without_query(self):
+        """Updating a stored event is refused before touching the database."""
+        event = HumanLayerEvent.objects.create(user=self.user, event_type='auth', summary='Stored', details={})
+        event.summary = 'modified'
+        with self.assertNumQueries(0):
+            with self.assertRaises(ValueError):
+                event.save()
+        
+        # Re-inserting an existing pk cannot overwrite the stored row
+        clone = HumanLayerEvent(id=event.id, event_type='auth', summary='clone', details={})
+        with self.assertRaises(IntegrityError):
+            clone.save()
+    
+    def test_event_remote_addr_column_populated(self):
+        """details['remote_addr'] is copied to the indexed column when valid."""
+        event = HumanLayerEvent.objects.create(event_type='auth', details={'remote_addr': ' 10.0.0.1 '})
+        self.assertEqual(event.remote_addr, '10.0.0.1')
+        invalid = HumanLayerEvent.objects.create(event_type='auth', details={'remote_addr': 'unknown'})
+        self.assertIsNone(invalid.remote_addr)
+    
+    def test_evidence_sha256_computed_on_create(self):
+        """Evidence stores the digest of its canonical payload; key order does not matter."""
+        import hashlib
+        ev = Evidence.objects.create(payload={'b': 2, 'a': 'é'})
+        expected = hashlib.sha256('{"a":"é","b":2}'.encode('utf-8')).hexdigest()
+        self.assertEqual(ev.sha256, expected)
+    
+    def test_evidence_sha256_is_encoder_independent(self):
+        """The digest uses the stdlib encoding even where orjson would differ or fail."""
+        import hashlib
+        from policy.models import payload_sha256
+        self.assertEqual(payload_sha256({'x': 1e20}), hashlib.sha256(b'{"x":1e+20}').hexdigest())
+        self.assertEqual(payload_sha256({1: 'a'}), hashlib.sha256(b'{"1":"a"}').hexdigest())
+    
     def test_evidence_immutability(self):
         """Test Evidence cannot be updated or deleted."""
         ev = Evidence.objects.create(payload={'test': 'data'})
@@ -346,3 +380,38 @@ class PerformanceBenchmarkTestCase(TestCase):
         
         self.assertLess(avg_latency, 0.05, f'Risk scoring too slow: {avg_latency*1000:.1f}ms')
         # Risk scoring latency logged
+    
+    def test_risk_features_from_single_aggregate(self):
+        """Event features come from one aggregate query plus the violation count."""
+        for addr in ('10.0.0.1', '10.0.0.1', '10.0.0.2'):
+            HumanLayerEvent.objects.create(user=self.user, event_type='auth', source='portal',
+                                           summary='user_login_failed', details={'remote_addr': addr})
+        event = HumanLayerEvent.objects.create(user=self.user, event_type='quiz', source='mobile', summary='x',
+                                                details={})
+        
+        with self.assertNumQueries(2):
+            features = RuleBasedScorer().extract_features(event)
+        
+        self.assertEqual(features['total_recent_events'], 4)
+        self.assertEqual(features['distinct_ip_count_24h'], 2)
+        self.assertEqual(features['recent_failed_logins_1h'], 3)
+        self.assertEqual(features['source_novelty'], 0)
+    
+    def test_risk_score_batch_matches_single_scores(self):
+        """score_batch agrees with score() and needs a fixed number of queries."""
+        other = User.objects.create_user(username='perftest2', password='test')
+        for addr in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            HumanLayerEvent.objects.create(user=self.user, event_type='auth', source='portal',
+                                           summary='user_login_failed', details={'remote_addr': addr})
+        Violation.objects.create(user=self.user, policy=self.policy, control=self.control, evidence={})
+        events = [
+            HumanLayerEvent.objects.create(user=self.user, event_type='quiz', source='portal', summary='a', details={}),
+            HumanLayerEvent.objects.create(user=other, event_type='quiz', source='mobile', summary='b', details={}),
+            HumanLayerEvent.objects.create(event_type='system', source='cron', summary='c', details={}),
+        ]
+        scorer = RuleBasedScorer()
+        
+        with self.assertNumQueries(3):
+            batch = scorer.score_batch(events)
+        
+        self.assertEqual(list(batch), [scorer.score(e)['score'] for e in events])
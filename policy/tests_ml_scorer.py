@@ -0,0 +1,39 @@
+import os
+import tempfile
+from django.test import TestCase
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from policy.ml_scorer import MLRiskScorer
+
+
+class MLScorerPersistenceTests(TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.td.name, 'model.pkl')
+        scorer = MLRiskScorer(model_path=self.path)
+        scorer.model = RandomForestClassifier(n_estimators=2, random_state=0).fit([[0], [1]], [0, 1])
+        scorer.scaler = StandardScaler().fit([[0], [1]])
+        scorer.feature_names = ['hour']
+        scorer.save_model(version='test')
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_load_registered_model(self):
+        scorer = MLRiskScorer(model_path=self.path)
+        self.assertEqual(scorer.feature_names, ['hour'])
+        self.assertEqual(scorer.metadata.get('version'), 'test')
+
+    def test_tampered_model_rejected(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'tampered')
+        with self.assertRaises(ValueError):
+            MLRiskScorer(model_path=self.path)
+
+    def test_feature_getter_follows_feature_names(self):
+        scorer = MLRiskScorer(model_path=self.path)
+        getter = scorer._get_feature_getter()
+        self.assertIs(scorer._get_feature_getter(), getter)
+        self.assertEqual(getter({'hour': 3, 'other': 1}), 3)
+        scorer.feature_names = ['hour', 'other']
+        self.assertEqual(scorer._get_feature_getter()({'hour': 3, 'other': 1}), (3, 1))
@@ -0,0 +1,230 @@
+from django.core.cache import cache
+from django.test import TestCase
+from policy.models import Policy, Control, Rule
+from policy.policy_cache import PolicyCache
+
+
+class PolicyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        PolicyCache.clear_local()
+        self.policy = Policy.objects.create(name='Cached Policy', lifecycle='active')
+        self.draft = Policy.objects.create(name='Draft Policy')
+        self.control = Control.objects.create(policy=self.policy, name='Cached Control')
+        self.rule = Rule.objects.create(control=self.control, name='Cached Rule', left_operand='file.size',
+                                        operator='>', right_value=10)
+
+    def test_active_policies_only_include_active_lifecycle(self):
+        policies = PolicyCache.get_active_policies()
+        self.assertEqual([p['id'] for p in policies], [self.policy.id])
+
+    def test_active_policies_served_from_cache(self):
+        PolicyCache.get_active_policies()
+        with self.assertNumQueries(0):
+            policies = PolicyCache.get_active_policies()
+        self.assertEqual(len(policies), 1)
+
+    def test_policy_save_invalidates_active_policies(self):
+        PolicyCache.get_active_policies()
+        self.draft.lifecycle = 'active'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.save()
+        ids = {p['id'] for p in PolicyCache.get_active_policies()}
+        self.assertEqual(ids, {self.policy.id, self.draft.id})
+
+    def test_policy_prefetches_active_controls_and_enabled_rules(self):
+        Control.objects.create(policy=self.policy, name='Inactive Control', active=False)
+        Rule.objects.create(control=self.control, name='Disabled Rule', left_operand='x', operator='==', enabled=False)
+        policy = PolicyCache.get_policy(self.policy.id)
+        self.assertEqual([c['id'] for c in policy['controls']], [self.control.id])
+        self.assertEqual([r['id'] for r in policy['controls'][0]['rules']], [self.rule.id])
+
+    def test_get_rule_returns_flat_dict(self):
+        rule = PolicyCache.get_rule(self.rule.id)
+        self.assertEqual(rule['operator'], '>')
+        self.assertEqual(rule['right_value'], 10)
+        self.assertEqual(rule['policy_name'], 'Cached Policy')
+        with self.assertNumQueries(0):
+            self.assertEqual(PolicyCache.get_rule(self.rule.id), rule)
+
+    def test_entries_stored_as_json_bytes(self):
+        from policy.policy_cache import CACHE_SCHEMA_VERSION
+        policy = PolicyCache.get_policy(self.policy.id)
+        raw = cache.get(PolicyCache.get_cache_key('policy', self.policy.id), version=CACHE_SCHEMA_VERSION)
+        self.assertIsInstance(raw, bytes)
+        self.assertEqual(PolicyCache.get_policy(self.policy.id), policy)
+
+    def test_concurrent_rebuild_falls_back_to_db_when_lock_held(self):
+        from unittest.mock import patch
+        from policy.policy_cache import CACHE_SCHEMA_VERSION
+        lock_key = PolicyCache.get_cache_key('active_policies', 'all') + ':lock'
+        cache.add(lock_key, 1, 10, version=CACHE_SCHEMA_VERSION)
+        with patch('policy.policy_cache.REBUILD_WAIT_SECONDS', 0.1):
+            policies = PolicyCache.get_active_policies()
+        self.assertEqual([p['id'] for p in policies], [self.policy.id])
+
+    def test_rebuild_releases_lock(self):
+        from policy.policy_cache import CACHE_SCHEMA_VERSION
+        PolicyCache.get_policy(self.policy.id)
+        lock_key = PolicyCache.get_cache_key('policy', self.policy.id) + ':lock'
+        self.assertIsNone(cache.get(lock_key, version=CACHE_SCHEMA_VERSION))
+
+    def test_active_policies_refreshed_early_near_expiry(self):
+        from policy.policy_cache import CACHE_SCHEMA_VERSION
+        PolicyCache.get_active_policies()
+        PolicyCache.clear_local()
+        meta_key = PolicyCache.get_cache_key('active_policies', 'all') + ':meta'
+        meta = cache.get(meta_key, version=CACHE_SCHEMA_VERSION)
+        self.assertIn('delta', meta)
+        Policy.objects.filter(pk=self.draft.pk).update(lifecycle='active')
+        # Entry is still cached but already past its recorded expiry -> rebuilt in band
+        cache.set(meta_key, {'delta': meta['delta'], 'expiry': 0}, 60, version=CACHE_SCHEMA_VERSION)
+        ids = {p['id'] for p in PolicyCache.get_active_policies()}
+        self.assertEqual(ids, {self.policy.id, self.draft.id})
+
+    def test_local_layer_skips_shared_cache(self):
+        from unittest.mock import patch
+        policy = PolicyCache.get_policy(self.policy.id)
+        with patch('policy.policy_cache.cache') as shared:
+            self.assertEqual(PolicyCache.get_policy(self.policy.id), policy)
+        shared.get.assert_not_called()
+
+    def test_clear_all_bumps_generation(self):
+        PolicyCache.get_policy(self.policy.id)
+        old_key = PolicyCache.get_cache_key('policy', self.policy.id)
+        PolicyCache.clear_all()
+        self.assertNotEqual(PolicyCache.get_cache_key('policy', self.policy.id), old_key)
+        # id set, policy, controls and rules are reloaded from the DB
+        with self.assertNumQueries(4):
+            PolicyCache.get_policy(self.policy.id)
+
+    def test_get_rules_batches_misses(self):
+        other = Rule.objects.create(control=self.control, name='Other Rule', left_operand='file.name',
+                                    operator='==', right_value='a')
+        PolicyCache.get_rule(self.rule.id)
+        PolicyCache.clear_local()
+        with self.assertNumQueries(1):
+            rules = PolicyCache.get_rules([self.rule.id, other.id, 999999])
+        self.assertEqual([r['id'] for r in rules[:2]], [self.rule.id, other.id])
+        self.assertIsNone(rules[2])
+        with self.assertNumQueries(0):
+            self.assertEqual(PolicyCache.get_rules([other.id])[0]['name'], 'Other Rule')
+
+    def test_get_policies_matches_get_policy(self):
+        policies = PolicyCache.get_policies([self.policy.id, self.draft.id])
+        self.assertEqual(policies[0], PolicyCache.get_policy(self.policy.id))
+        self.assertEqual(policies[1]['name'], 'Draft Policy')
+
+    def test_composite_cache_key_is_order_independent(self):
+        key = PolicyCache.get_cache_key('query', {'b': 1, 'a': [1, 2]})
+        self.assertEqual(key, PolicyCache.get_cache_key('query', {'a': [1, 2], 'b': 1}))
+        self.assertTrue(PolicyCache.get_cache_key('rule', 5).endswith(':rule:5'))
+
+    def test_user_violations_summary_counts_unresolved(self):
+        from django.contrib.auth import get_user_model
+        from policy.models import Violation
+        user = get_user_model().objects.create_user('summary', 's@example.com', 'pw')
+        for resolved in (False, False, True):
+            Violation.objects.create(user=user, policy=self.policy, control=self.control, severity='high',
+                                     evidence={}, resolved=resolved)
+        summary = PolicyCache.get_user_violations_summary(user.id)
+        self.assertEqual(summary, [{'policy_id': self.policy.id, 'severity': 'high', 'count': 2}])
+
+    def test_rules_precompiled_in_process_only(self):
+        import re
+        from policy.policy_cache import CACHE_SCHEMA_VERSION
+        regex = Rule.objects.create(control=self.control, name='Regex Rule', left_operand='file.name',
+                                    operator='regex', right_value=r'\.exe$')
+        members = Rule.objects.create(control=self.control, name='In Rule', left_operand='file.ext',
+                                      operator='in', right_value=['exe', 'bat'])
+        rules = {r['id']: r for r in PolicyCache.get_policy(self.policy.id)['controls'][0]['rules']}
+        self.assertIsInstance(rules[regex.id]['_re'], re.Pattern)
+        self.assertEqual(rules[members.id]['_set'], frozenset({'exe', 'bat'}))
+        raw = cache.get(PolicyCache.get_cache_key('policy', self.policy.id), version=CACHE_SCHEMA_VERSION)
+        self.assertNotIn(b'_re', raw)
+
+    def test_invalidations_batched_until_end_of_request(self):
+        from unittest.mock import patch
+        from policy.policy_cache import PolicyCacheInvalidationMiddleware
+
+        def view(request):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    Rule.objects.create(control=self.control, name=f'Bulk {i}', left_operand='x', operator='==')
+            return 'response'
+
+        with patch('policy.policy_cache.cache.delete_many') as delete_many:
+            self.assertEqual(PolicyCacheInvalidationMiddleware(view)(None), 'response')
+        delete_many.assert_called_once()
+        self.assertIn(PolicyCache.get_cache_key('policy', self.policy.id), delete_many.call_args[0][0])
+
+    def test_control_change_invalidates_policy(self):
+        PolicyCache.get_policy(self.policy.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Control.objects.create(policy=self.policy, name='New Control')
+        names = [c['name'] for c in PolicyCache.get_policy(self.policy.id)['controls']]
+        self.assertIn('New Control', names)
+
+    def test_active_policies_loaded_in_three_queries(self):
+        other = Control.objects.create(policy=self.policy, name='Second Control', order=1)
+        Rule.objects.create(control=other, name='Second Rule', left_operand='x', operator='==', right_value=1)
+        with self.assertNumQueries(3):
+            policies = PolicyCache.get_active_policies()
+        controls = policies[0]['controls']
+        self.assertEqual([c['id'] for c in controls], [self.control.id, other.id])
+        self.assertEqual(controls[1]['rules'][0]['name'], 'Second Rule')
+        self.assertNotIn('control_id', controls[1]['rules'][0])
+
+    def test_unknown_ids_answered_without_cache_writes(self):
+        from unittest.mock import patch
+        gone = self.draft.id
+        self.draft.delete()
+        Policy.objects.create(name='Newest Policy')
+        PolicyCache.get_policy(self.policy.id)
+        with patch('policy.policy_cache.cache.set') as set_, patch('policy.policy_cache.cache.set_many') as set_many:
+            with self.assertNumQueries(0):
+                self.assertIsNone(PolicyCache.get_policy(gone))
+                self.assertEqual(PolicyCache.get_policies([gone]), [None])
+            # Ids above the known max may be newer rows, so they go to the DB
+            self.assertIsNone(PolicyCache.get_policy(999999))
+        set_.assert_not_called()
+        set_many.assert_not_called()
+
+    def test_policy_created_in_request_readable_before_commit(self):
+        from policy.policy_cache import PolicyCacheInvalidationMiddleware
+        PolicyCache.get_policy(self.policy.id)
+
+        def view(request):
+            with self.captureOnCommitCallbacks(execute=True):
+                created = Policy.objects.create(name='Request Policy')
+                return PolicyCache.get_policy(created.id)
+
+        self.assertEqual(PolicyCacheInvalidationMiddleware(view)(None)['name'], 'Request Policy')
+
+    def test_stale_id_set_does_not_hide_new_policy(self):
+        PolicyCache.get_policy(self.policy.id)
+        # Another process created the row; its invalidation has not reached this one
+        created = Policy.objects.bulk_create([Policy(name='Elsewhere')])[0]
+        self.assertEqual(PolicyCache.get_policy(created.id)['name'], 'Elsewhere')
+        self.assertEqual(PolicyCache.get_policy(str(created.id))['name'], 'Elsewhere')
+        self.assertEqual(PolicyCache.get_policies([str(self.policy.id)])[0]['id'], self.policy.id)
+
+    def test_created_policy_visible_after_commit(self):
+        PolicyCache.get_policy(self.policy.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Policy.objects.create(name='Fresh Policy')
+        self.assertEqual(PolicyCache.get_policy(created.id)['name'], 'Fresh Policy')
+
+    def test_violation_resolve_is_single_update_and_invalidates_owner(self):
+        from django.contrib.auth import get_user_model
+        from policy.models import Violation
+        user = get_user_model().objects.create_user('resolver', 'r@example.com', 'pw')
+        violation = Violation.objects.create(user=user, policy=self.policy, control=self.control, evidence={})
+        self.assertEqual(len(PolicyCache.get_user_violations_summary(user.id)), 1)
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            self.assertTrue(violation.resolve(user))
+        self.assertFalse(violation.resolve(user))
+        violation.refresh_from_db()
+        self.assertTrue(violation.resolved)
+        self.assertEqual(violation.resolved_by_id, user.id)
+        self.assertEqual(PolicyCache.get_user_violations_summary(user.id), [])
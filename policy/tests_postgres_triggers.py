@@ -1,4 +1,5 @@
-from django.test import TestCase
+from django.core.exceptions import PermissionDenied
+from django.test import SimpleTestCase, TestCase
 from unittest import skipIf
 from django.db import connection, transaction, IntegrityError, DatabaseError
 from policy.models import Evidence, HumanLayerEvent
@@ -18,3 +19,34 @@ class PostgresTriggerTests(TestCase):
         ev = HumanLayerEvent.objects.create(details={'a': 1}, event_type='other')
         with self.assertRaises(DatabaseError):
             ev.delete()
+
+
+class RawSqlValidationTests(SimpleTestCase):
+    def test_mutations_of_immutable_tables_rejected(self):
+        from policy.sqlite_immutability import validate_raw_sql
+        for sql in ('UPDATE "policy_evidence" SET payload = 1',
+                    'delete from policy_humanlayerevent where id = 1',
+                    'UPDATE OR IGNORE main.policy_evidence SET sha256 = NULL',
+                    # comments separate tokens like whitespace
+                    'UPDATE/**/policy_evidence SET x=1',
+                    'DELETE FROM/**/policy_evidence',
+                    'DELETE -- note\nFROM main . "policy_humanlayerevent"',
+                    'UPDATE"policy_evidence"SET x=1',
+                    'UPDATE ONLY policy_evidence SET x=1',
+                    'DELETE FROM ONLY/**/"policy_evidence"',
+                    "DELETE FROM 'policy_evidence'",
+                    "UPDATE 'main'.'policy_humanlayerevent' SET x=1",
+                    'DELETE FROM "audit log".policy_evidence'):
+            with self.assertRaises(PermissionDenied):
+                validate_raw_sql(sql)
+
+    def test_reads_and_other_tables_allowed(self):
+        from policy.sqlite_immutability import validate_raw_sql
+        validate_raw_sql('SELECT * FROM policy_evidence')
+        validate_raw_sql('UPDATE policy_violation SET resolved = 1 WHERE id IN (SELECT violation_id FROM policy_evidence)')
+
+    def test_immutable_model_lookup(self):
+        from policy.sqlite_immutability import ImmutabilityEnforcer
+        self.assertTrue(ImmutabilityEnforcer.is_immutable_model('Evidence'))
+        self.assertTrue(ImmutabilityEnforcer.is_immutable_model('HumanLayerEvent'))
+        self.assertFalse(ImmutabilityEnforcer.is_immutable_model('Violation'))
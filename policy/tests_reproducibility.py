@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+
+from policy.reproducibility import ReproducibilityCapture
+
+
+class VerifyReproducibilityTests(SimpleTestCase):
+    def setUp(self):
+        self.original = ReproducibilityCapture.capture_full_metadata('exp-1', seed=7)
+
+    def test_matching_environment_verifies_by_fingerprint(self):
+        current = ReproducibilityCapture.capture_full_metadata('exp-1', seed=7)
+        self.assertEqual(set(current['_fingerprints']), {
+            field for field in ('git_commit', 'docker_image_digest', 'dependency_hash', 'platform', 'seed_binding')
+            if field in current
+        })
+        result = ReproducibilityCapture.verify_reproducibility(self.original, current)
+        self.assertTrue(result['reproducible'])
+        self.assertTrue(result['seed_binding_valid'])
+
+    def test_changed_section_is_detected(self):
+        current = ReproducibilityCapture.capture_full_metadata('exp-1', seed=8)
+        result = ReproducibilityCapture.verify_reproducibility(self.original, current)
+        self.assertFalse(result['seed_binding_valid'])
+
+    def test_metadata_without_fingerprints_compares_values(self):
+        legacy = {k: v for k, v in self.original.items() if k != '_fingerprints'}
+        result = ReproducibilityCapture.verify_reproducibility(legacy, self.original)
+        self.assertTrue(result['dependencies_match'])
+        self.assertTrue(result['platform_match'])
+
+
+class DependencyHashTests(SimpleTestCase):
+    def test_digest_is_newline_joined_manifest(self):
+        import hashlib
+        from importlib import metadata
+        ReproducibilityCapture.invalidate_cache()
+        manifest = '\n'.join(sorted({
+            f"{dist.metadata['Name']}=={dist.version}" for dist in metadata.distributions() if dist.metadata['Name']
+        }))
+        expected = hashlib.sha256(manifest.encode('utf-8')).hexdigest()
+        self.assertEqual(ReproducibilityCapture.get_dependency_hash(), expected)
+
+    def test_pip_freeze_hash_verified_in_its_own_format(self):
+        from unittest.mock import patch
+        original = ReproducibilityCapture.capture_full_metadata('exp-1', seed=7)
+        legacy = {k: v for k, v in original.items() if k not in ('_fingerprints', 'dependency_hash_format')}
+        legacy['dependency_hash'] = 'f' * 64
+        with patch.object(ReproducibilityCapture, 'get_legacy_dependency_hash', return_value='f' * 64):
+            self.assertTrue(ReproducibilityCapture.verify_reproducibility(legacy)['dependencies_match'])
+        with patch.object(ReproducibilityCapture, 'get_legacy_dependency_hash', return_value='0' * 64):
+            self.assertFalse(ReproducibilityCapture.verify_reproducibility(legacy)['dependencies_match'])
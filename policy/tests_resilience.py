@@ -0,0 +1,117 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from policy.resilience import CircuitBreaker, RateLimiter, RateLimitMiddleware, incr_window_counter, retry_with_backoff
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_redis_window_uses_one_script_call(self):
+        client = MagicMock()
+        client.register_script.return_value.return_value = 3
+        with patch('policy.resilience.get_redis_client', return_value=client):
+            allowed, info = RateLimiter().is_allowed('user:1', limit=2, window_seconds=60)
+        self.assertFalse(allowed)
+        self.assertEqual(info['current'], 3)
+        script = client.register_script.return_value
+        script.assert_called_once()
+        self.assertEqual(script.call_args.kwargs['keys'], [cache.make_key('ratelimit:user:1:window')])
+        client.keys.assert_not_called()
+
+    def test_falls_back_to_cache_counter_without_redis(self):
+        limiter = RateLimiter()
+        results = [limiter.is_allowed('ip:10.0.0.1', limit=2)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+    def test_record_hit_increments_shared_counter(self):
+        limiter = RateLimiter()
+        limiter.record_hit('user:7')
+        limiter.record_hit('user:7')
+        self.assertEqual(cache.get('ratelimit:user:7'), 2)
+
+    def test_counter_uses_one_redis_pipeline(self):
+        client = MagicMock()
+        client.pipeline.return_value.execute.return_value = [True, 1]
+        with patch('policy.resilience.get_redis_client', return_value=client):
+            self.assertEqual(incr_window_counter('ratelimit:user:8', 60), 1)
+        pipe = client.pipeline.return_value
+        pipe.set.assert_called_once_with(cache.make_key('ratelimit:user:8'), 0, ex=60, nx=True)
+        pipe.execute.assert_called_once()
+
+    @override_settings(GLOBAL_RATE_LIMIT=1, GLOBAL_RATE_LIMIT_WINDOW=30)
+    def test_middleware_reads_limits_at_startup(self):
+        middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+        request = RequestFactory().get('/dashboard/')
+        request.user = AnonymousUser()
+        with override_settings(GLOBAL_RATE_LIMIT=100):
+            first = middleware(request)
+            second = middleware(request)
+        self.assertEqual(first['X-RateLimit-Limit'], '1')
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(second['Retry-After'], '30')
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker('tests', failure_threshold=2, timeout_seconds=60, success_threshold=2)
+
+    def test_opens_after_threshold_and_recovers(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.get_state(), 'CLOSED')
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.get_state(), 'OPEN')
+        cache.set(self.breaker.opened_at_key, time.time() - 61, timeout=None)
+        self.assertEqual(self.breaker.get_state(), 'HALF_OPEN')
+        self.breaker.record_success()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.get_state(), 'CLOSED')
+        self.assertIsNone(cache.get(self.breaker.failure_key))
+
+    def test_state_read_is_one_round_trip(self):
+        with patch('policy.resilience.cache') as mocked:
+            mocked.get_many.return_value = {}
+            self.breaker.record_success()
+        mocked.get_many.assert_called_once()
+        mocked.get.assert_not_called()
+        mocked.delete.assert_not_called()
+
+    def test_call_skips_cache_while_recently_closed(self):
+        with patch('policy.resilience.cache') as mocked:
+            mocked.get_many.return_value = {}
+            self.assertEqual(self.breaker.call(lambda: 1), 1)
+            self.assertEqual(self.breaker.call(lambda: 2), 2)
+            self.assertEqual(mocked.get_many.call_count, 2)  # get_state + record_success, first call only
+            with self.assertRaises(ZeroDivisionError):
+                self.breaker.call(lambda: 1 / 0)
+            self.breaker.call(lambda: 3)
+        self.assertEqual(mocked.get_many.call_count, 5)  # failure ends the fast path
+
+
+class RetryWithBackoffTests(SimpleTestCase):
+    def test_retries_until_success_then_gives_up(self):
+        calls = []
+
+        @retry_with_backoff(ValueError, max_tries=3, base=0.5)
+        def flaky(fail_times):
+            calls.append(1)
+            if len(calls) <= fail_times:
+                raise ValueError('transient')
+            return 'ok'
+
+        with patch('policy.resilience.time.sleep') as sleep:
+            self.assertEqual(flaky(2), 'ok')
+            self.assertEqual(len(calls), 3)
+            self.assertEqual(sleep.call_count, 2)
+            self.assertTrue(all(0 <= c.args[0] <= 0.5 * 2 ** i for i, c in enumerate(sleep.call_args_list)))
+            calls.clear()
+            with self.assertRaises(ValueError):
+                flaky(5)
+            self.assertEqual(len(calls), 3)
@@ -47,3 +47,138 @@ class SigningTests(TestCase):
                 from policy import signing
                 res = signing.sign_text('payload')
                 self.assertEqual(res, raw_mac.hex())
+
+    def test_local_sign_matches_hmac_sha256(self):
+        import hashlib
+        import hmac
+        from policy import signing
+        with override_settings(EVIDENCE_SIGNING_KEY='first'):
+            self.assertEqual(signing.sign_bytes(b'data'), hmac.new(b'first', b'data', hashlib.sha256).hexdigest())
+        with override_settings(EVIDENCE_SIGNING_KEY='second'):
+            self.assertEqual(signing.sign_bytes(b'data'), hmac.new(b'second', b'data', hashlib.sha256).hexdigest())
+
+    def test_event_signatures_chain_per_user(self):
+        from datetime import timedelta
+        from django.contrib.auth import get_user_model
+        from django.utils import timezone
+        from policy.models import EventMetadata, HumanLayerEvent
+        from policy.telemetry_signals import _sign_event
+        user = get_user_model().objects.create_user('chainer', 'c@example.com', 'pass')
+        now = timezone.now()
+        with override_settings(EVIDENCE_SIGNING_KEY='testkey', SIGNING_PRIVATE_KEY_PATH=None):
+            first = HumanLayerEvent.objects.create(user=user, timestamp=now - timedelta(minutes=1), details={})
+            _sign_event(first)
+            second = HumanLayerEvent.objects.create(user=user, timestamp=now, details={})
+            with self.assertNumQueries(2):  # previous signature, metadata insert
+                _sign_event(second)
+        first_meta = EventMetadata.objects.get(event=first)
+        second_meta = EventMetadata.objects.get(event=second)
+        self.assertIsNone(first_meta.prev_hash)
+        self.assertEqual(second_meta.prev_hash, first_meta.signature)
+        self.assertEqual((second_meta.user_id, second_meta.event_timestamp), (user.id, now))
+
+    def test_queued_events_bulk_insert_with_chained_signatures(self):
+        from django.contrib.auth import get_user_model
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from policy import telemetry_signals
+        from policy.models import EventMetadata, HumanLayerEvent
+        user = get_user_model().objects.create_user('batcher', 'b@example.com', 'pass')
+        middleware = telemetry_signals.TelemetryBatchMiddleware(lambda request: None)
+
+        def view(request):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    telemetry_signals._queue_event(user=user, event_type='auth', source='test',
+                                                   summary=f'event {i}', details={'remote_addr': '10.0.0.1'})
+            self.assertFalse(HumanLayerEvent.objects.exists())
+
+        middleware.get_response = view
+        with override_settings(EVIDENCE_SIGNING_KEY='testkey', SIGNING_PRIVATE_KEY_PATH=None):
+            with CaptureQueriesContext(connection) as queries:
+                middleware(None)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "policy_humanlayerevent"')]
+        self.assertEqual(len(inserts), 1)
+        metadata = list(EventMetadata.objects.filter(user=user).order_by('event_timestamp'))
+        self.assertEqual([m.event.summary for m in metadata], ['event 0', 'event 1', 'event 2'])
+        self.assertEqual([m.prev_hash for m in metadata], [None, metadata[0].signature, metadata[1].signature])
+        self.assertEqual(HumanLayerEvent.objects.filter(remote_addr='10.0.0.1').count(), 3)
+
+    def test_asymmetric_sign_and_verify_by_key_type(self):
+        import os
+        import tempfile
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+        from policy import crypto_utils
+        for private_key in (ed25519.Ed25519PrivateKey.generate(),
+                            rsa.generate_private_key(public_exponent=65537, key_size=2048)):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                private_path = os.path.join(tmpdir, 'private.pem')
+                public_path = os.path.join(tmpdir, 'public.pem')
+                with open(private_path, 'wb') as f:
+                    f.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                                      serialization.NoEncryption()))
+                with open(public_path, 'wb') as f:
+                    f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                                  serialization.PublicFormat.SubjectPublicKeyInfo))
+                with override_settings(SIGNING_PRIVATE_KEY_PATH=private_path, SIGNING_PUBLIC_KEY_PATH=public_path):
+                    sig = crypto_utils.sign_data('payload')
+                    self.assertTrue(crypto_utils.verify_signature('payload', sig))
+                    self.assertFalse(crypto_utils.verify_signature('tampered', sig))
+                    sig = crypto_utils.sign_data(b'\x1fpayload')
+                    self.assertTrue(crypto_utils.verify_signature(b'\x1fpayload', sig))
+                    self.assertFalse(crypto_utils.verify_signature(b'\x1ftampered', sig))
+
+    def test_event_signature_payload_is_canonical(self):
+        import uuid
+        from django.utils import timezone
+        from policy.models import HumanLayerEvent
+        from policy.telemetry_signals import event_signature_payload
+        event_id, now = uuid.uuid4(), timezone.now()
+        first = HumanLayerEvent(id=event_id, timestamp=now, event_type='auth', details={'a': 1, 'b': [1, 2]})
+        second = HumanLayerEvent(id=event_id, timestamp=now, event_type='auth', details={'b': [1, 2], 'a': 1})
+        self.assertEqual(event_signature_payload(first, 'abc'), event_signature_payload(second, 'abc'))
+        self.assertNotEqual(event_signature_payload(first, 'abc'), event_signature_payload(first, None))
+        with override_settings(EVIDENCE_SIGNING_KEY='testkey', SIGNING_PRIVATE_KEY_PATH=None):
+            from policy.crypto_utils import sign_data
+            self.assertEqual(sign_data(b'payload'), sign_data('payload'))
+
+    def test_event_signature_round_trip(self):
+        import uuid
+        from django.utils import timezone
+        from policy.crypto_utils import sign_data, verify_signature
+        from policy.models import HumanLayerEvent
+        from policy.telemetry_signals import event_signature_payload
+        ev = HumanLayerEvent(id=uuid.uuid4(), timestamp=timezone.now(), user_id=3, event_type='auth', details={'a': 1})
+        payload = event_signature_payload(ev, 'abc')
+        with override_settings(EVIDENCE_SIGNING_KEY='testkey', SIGNING_PRIVATE_KEY_PATH=None, SIGNING_PUBLIC_KEY_PATH=None):
+            sig = sign_data(payload)
+            self.assertTrue(verify_signature(payload, sig))
+            self.assertFalse(verify_signature(event_signature_payload(ev, None), sig))
+
+    def test_merkle_paths_rebuild_root(self):
+        from policy.crypto_utils import merkle_root_from_path, merkle_tree
+        for n in range(1, 8):
+            leaves = [f'sig-{i}' for i in range(n)]
+            root, paths = merkle_tree(leaves)
+            for leaf, path in zip(leaves, paths):
+                self.assertEqual(merkle_root_from_path(leaf, path), root)
+            self.assertNotEqual(merkle_root_from_path('forged', paths[0]), root)
+
+    def test_batched_events_share_one_tsa_token(self):
+        from django.contrib.auth import get_user_model
+        from policy import telemetry_signals
+        from policy.crypto_utils import merkle_root_from_path
+        from policy.models import EventMetadata
+        user = get_user_model().objects.create_user('tsa', 'tsa@example.com', 'pass')
+        events = [dict(user=user, event_type='auth', source='test', summary=f'e{i}', details={}) for i in range(5)]
+        with override_settings(EVIDENCE_SIGNING_KEY='testkey', SIGNING_PRIVATE_KEY_PATH=None, TSA_URL='http://tsa.test'):
+            with patch('policy.crypto_utils.get_tsa_timestamp', return_value=b'token') as tsa:
+                telemetry_signals._record_events(events)
+        self.assertEqual(tsa.call_count, 1)
+        root = tsa.call_args.args[0]
+        metadata = EventMetadata.objects.filter(user=user)
+        self.assertEqual(len(metadata), 5)
+        for meta in metadata:
+            self.assertEqual(bytes(meta.tsa_token), b'token')
+            self.assertEqual(merkle_root_from_path(meta.signature, meta.merkle_path), root)
@@ -0,0 +1,70 @@
+import json
+import logging
+
+from django.test import SimpleTestCase
+
+from policy.structured_logging import JSONFormatter
+
+
+class JSONFormatterTests(SimpleTestCase):
+    def _record(self, **extra):
+        record = logging.LogRecord('policy.test', logging.WARNING, __file__, 10, 'blocked %s', ('login',), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_formats_compact_json_with_extra_fields(self):
+        line = JSONFormatter().format(self._record(user_id=7, policy={1: 'p'}, unrelated='x'))
+        self.assertNotIn(', "', line)
+        data = json.loads(line)
+        self.assertEqual(data['message'], 'blocked login')
+        self.assertEqual(data['user_id'], 7)
+        self.assertEqual(data['policy'], {'1': 'p'})
+        self.assertNotIn('unrelated', data)
+        self.assertEqual(data['service'], 'awareness-portal')
+
+    def test_exception_traceback_included(self):
+        try:
+            raise ValueError('bad input')
+        except ValueError:
+            import sys
+            record = self._record()
+            record.exc_info = sys.exc_info()
+        data = json.loads(JSONFormatter().format(record))
+        self.assertEqual(data['exception']['type'], 'ValueError')
+        self.assertTrue(data['exception']['traceback'])
+
+
+class LoggingMiddlewareTests(SimpleTestCase):
+    def test_request_context_stamped_and_cleared(self):
+        from django.contrib.auth.models import AnonymousUser
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from policy.structured_logging import LoggingMiddleware, StructuredLogger
+
+        logger = logging.getLogger('policy.tests.context')
+        seen = {}
+
+        def view(request):
+            seen['record'] = logger.makeRecord(logger.name, logging.INFO, __file__, 1, 'in view', (), None)
+            with self.assertLogs('security', level='INFO') as logs:
+                StructuredLogger('security').info('explicit', user_id=42)
+            seen['explicit'] = logs.records[0]
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/', REMOTE_ADDR='10.1.2.3')
+        request.user = AnonymousUser()
+        middleware = LoggingMiddleware(view)
+        installed_factory = logging.getLogRecordFactory()
+        middleware(request)
+        self.assertEqual(seen['record'].request_id, request.request_id)
+        self.assertEqual(seen['record'].ip_address, '10.1.2.3')
+        self.assertEqual(seen['explicit'].user_id, 42)
+        self.assertEqual(seen['explicit'].request_id, request.request_id)
+        after = logging.getLogger('policy.tests.context').makeRecord('x', logging.INFO, __file__, 1, 'after', (), None)
+        self.assertFalse(hasattr(after, 'request_id'))
+        self.assertIs(logging.getLogRecordFactory(), installed_factory)
+
+    def test_request_ids_unique(self):
+        from policy.structured_logging import new_request_id
+        ids = {new_request_id() for _ in range(1000)}
+        self.assertEqual(len(ids), 1000)
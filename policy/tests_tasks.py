@@ -0,0 +1,62 @@
+from unittest.mock import patch
+from django.test import TestCase
+from policy.models import Experiment, GroundTruthLabel, HumanLayerEvent
+
+
+class TrainModelTaskTests(TestCase):
+    def setUp(self):
+        self.experiment = Experiment.objects.create(name='labels')
+        self.events = [HumanLayerEvent.objects.create(summary=f'e{i}', details={}) for i in range(12)]
+        for i, event in enumerate(self.events):
+            GroundTruthLabel.objects.create(experiment=self.experiment, event=event, is_violation=i % 3 == 0)
+
+    @patch('policy.ml_scorer.MLRiskScorer')
+    def test_training_data_loaded_as_event_label_pairs(self, scorer_cls):
+        from policy.tasks import train_ml_model_async
+        scorer_cls.return_value.train.return_value = {'f1': 1.0}
+        with self.assertNumQueries(2):  # (event id, label) rows, events by id
+            result = train_ml_model_async(experiment_id=self.experiment.id)
+        self.assertEqual(result['samples'], 12)
+        training_data = scorer_cls.return_value.train.call_args.args[0]
+        expected = {label.event_id: int(label.is_violation) for label in GroundTruthLabel.objects.all()}
+        self.assertEqual({event.pk: int(label) for event, label in training_data}, expected)
+        self.assertTrue(all(isinstance(event, HumanLayerEvent) for event, _ in training_data))
+
+    @patch('policy.ml_scorer.MLRiskScorer')
+    def test_training_skipped_without_enough_labels(self, scorer_cls):
+        from policy.tasks import train_ml_model_async
+        GroundTruthLabel.objects.filter(event__in=self.events[:3]).delete()
+        result = train_ml_model_async(experiment_id=self.experiment.id)
+        self.assertEqual(result, {'status': 'skipped', 'reason': 'insufficient_data', 'samples': 9})
+        scorer_cls.return_value.train.assert_not_called()
+
+
+class AdminEmailTests(TestCase):
+    def test_recipients_follow_settings(self):
+        from django.test import override_settings
+        from policy.tasks import _admin_emails
+        with override_settings(ADMINS=[('Ops', 'ops@example.com'), ('Sec', 'sec@example.com')]):
+            self.assertEqual(_admin_emails(), ('ops@example.com', 'sec@example.com'))
+        with override_settings(ADMINS=[]):
+            self.assertEqual(_admin_emails(), ())
+
+
+class RetrainCheckTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from policy.telemetry_signals import RECENT_LABELS_CACHE_KEY
+        cache.delete(RECENT_LABELS_CACHE_KEY)
+        self.addCleanup(cache.delete, RECENT_LABELS_CACHE_KEY)
+
+    def test_new_labels_counted_without_querying(self):
+        from django.core.cache import cache
+        from policy.tasks import retrain_ml_model_if_needed
+        from policy.telemetry_signals import RECENT_LABELS_CACHE_KEY
+        experiment = Experiment.objects.create(name='labels')
+        for i in range(3):
+            event = HumanLayerEvent.objects.create(summary=f'e{i}', details={})
+            GroundTruthLabel.objects.create(experiment=experiment, event=event, is_violation=False)
+        self.assertEqual(cache.get(RECENT_LABELS_CACHE_KEY), 3)
+        with self.assertNumQueries(0):
+            result = retrain_ml_model_if_needed()
+        self.assertEqual(result, {'status': 'skipped', 'reason': 'insufficient_new_data'})